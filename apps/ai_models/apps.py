@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class AiModelsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ai_models'
+
+    def ready(self):
+        # 注册信号，清理特征矩阵文件、维护模型注册表
+        from ai_models import signals  # noqa: F401
+        # 特征集增删后失效列表计数缓存
+        from ai_models.models import SsqFeatureSet
+        from utils.counting import track_counts
+        track_counts(SsqFeatureSet)
+
+        # 开启 SSQ_MODEL_PRELOAD 时在后台预热激活模型
+        from ai_models.utils.preload import should_preload_on_startup, start_preload
+        if should_preload_on_startup():
+            start_preload()
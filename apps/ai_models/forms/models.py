@@ -0,0 +1,38 @@
+import os
+
+from django import forms
+from django.core.files.uploadedfile import UploadedFile
+
+from ai_models.models import SsqModel
+from ai_models.utils.registry import LOADERS
+from ai_models.utils.upload import file_digest
+from utils.bootstrap5 import Bootstrap5FormMixin
+
+
+class SsqModelForm(Bootstrap5FormMixin, forms.ModelForm):
+    """预测模型FORM"""
+    class Meta:
+        model = SsqModel
+        fields = [
+            'name', 'model_type', 'version', 'feature_set', 'train_period_start', 'train_period_end',
+            'model_file', 'config_file', 'ensemble_models', 'ensemble_weights', 'is_active',
+        ]
+
+    def clean_model_file(self):
+        """校验格式，并用上传时计算的摘要在保存文件前拒绝重复模型"""
+        model_file = self.cleaned_data.get('model_file')
+        if not isinstance(model_file, UploadedFile):
+            # 未上传新文件（编辑时保留原文件）
+            return model_file
+
+        extension = os.path.splitext(model_file.name)[1].lower()
+        if extension not in LOADERS:
+            raise forms.ValidationError(f'不支持的模型文件格式：{extension}')
+
+        model_hash = file_digest(model_file)
+        duplicate = SsqModel.objects.filter(model_hash=model_hash).exclude(pk=self.instance.pk).first()
+        if duplicate is not None:
+            raise forms.ValidationError(f'相同的模型文件已存在：{duplicate}')
+
+        self.instance.model_hash = model_hash
+        return model_file
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_models.models import SsqFeatureSet
+from ai_models.utils.feature_matrix import export_feature_columns, load_feature_matrix
+from utils.columnar import write_columnar
+
+
+class Command(BaseCommand):
+    help = '导出特征集列式二进制文件，可用 utils.columnar.read_columnar 零拷贝内存映射读取'
+
+    def add_arguments(self, parser):
+        parser.add_argument('feature_set', type=int, help='特征集ID')
+        parser.add_argument('path', help='输出文件路径')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        feature_set = SsqFeatureSet.objects.filter(pk=options['feature_set']).first()
+        if feature_set is None:
+            raise CommandError(f'特征集不存在：{options["feature_set"]}')
+        matrix = load_feature_matrix(feature_set)
+        if matrix is None:
+            raise CommandError('特征矩阵尚未生成')
+
+        columns, meta = export_feature_columns(feature_set, matrix)
+        try:
+            size = write_columnar(options['path'], columns, meta)
+        except OSError as e:
+            raise CommandError(f'无法写入文件：{e}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'导出完成：{meta["row_count"]} 个样本，{size} 字节，耗时 {time.perf_counter() - started:.3f}s'
+        ))
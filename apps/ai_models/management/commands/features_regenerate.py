@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ai_models.models import SsqFeatureSet
+from ai_models.tasks import generate_feature_set
+
+REGENERATE_STATUSES = (SsqFeatureSet.STATUS_FAILED, SsqFeatureSet.STATUS_PENDING)
+
+
+class Command(BaseCommand):
+    help = '重新投递生成失败或一直等待中的特征集任务'
+
+    def add_arguments(self, parser):
+        parser.add_argument('feature_sets', nargs='*', type=int, help='特征集ID，不指定时处理所有符合状态的特征集')
+        parser.add_argument('--status', nargs='+', choices=REGENERATE_STATUSES, default=list(REGENERATE_STATUSES),
+                            help='要重新生成的状态，默认 failed pending')
+        parser.add_argument('--dry-run', action='store_true', help='只列出特征集，不投递任务')
+
+    def handle(self, *args, **options):
+        queryset = SsqFeatureSet.objects.filter(status__in=options['status'])
+        if options['feature_sets']:
+            queryset = queryset.filter(pk__in=options['feature_sets'])
+
+        if options['dry_run']:
+            pks = list(queryset.order_by('pk').values_list('pk', flat=True))
+            self.stdout.write(f'待重新生成：{len(pks)} 个特征集 {pks}')
+            return
+
+        with transaction.atomic():
+            # 锁定选中的行，期间任务不会把它们改为生成中后又被重置
+            pks = list(queryset.select_for_update().order_by('pk').values_list('pk', flat=True))
+            SsqFeatureSet.objects.filter(pk__in=pks).update(
+                status=SsqFeatureSet.STATUS_PENDING, progress=0, error_message=''
+            )
+            for pk in pks:
+                transaction.on_commit(lambda pk=pk: generate_feature_set.delay(pk))
+
+        self.stdout.write(self.style.SUCCESS(f'已重新投递：{len(pks)} 个特征集'))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_models', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ssqfeatureset',
+            name='artifact_path',
+            field=models.CharField(blank=True, default='', help_text='相对 MEDIA_ROOT 的目录，内含 features/targets 等 .npy 文件', max_length=255, verbose_name='特征矩阵目录'),
+        ),
+        migrations.AddField(
+            model_name='ssqfeatureset',
+            name='artifact_version',
+            field=models.PositiveIntegerField(default=0, verbose_name='特征矩阵版本'),
+        ),
+    ]
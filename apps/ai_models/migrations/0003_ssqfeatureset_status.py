@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:54
+
+from django.db import migrations, models
+
+
+def mark_existing_success(apps, schema_editor):
+    """已有特征集在请求内同步生成，标记为已完成"""
+    SsqFeatureSet = apps.get_model('ai_models', 'SsqFeatureSet')
+    SsqFeatureSet.objects.update(status='success', progress=100)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_models', '0002_ssqfeatureset_artifact'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ssqfeatureset',
+            name='error_message',
+            field=models.TextField(blank=True, default='', verbose_name='错误信息'),
+        ),
+        migrations.AddField(
+            model_name='ssqfeatureset',
+            name='progress',
+            field=models.PositiveSmallIntegerField(default=0, help_text='0-100', verbose_name='生成进度'),
+        ),
+        migrations.AddField(
+            model_name='ssqfeatureset',
+            name='status',
+            field=models.CharField(choices=[('pending', '等待生成'), ('running', '生成中'), ('success', '已完成'), ('failed', '生成失败')], db_index=True, default='pending', max_length=20, verbose_name='生成状态'),
+        ),
+        migrations.RunPython(mark_existing_success, migrations.RunPython.noop),
+    ]
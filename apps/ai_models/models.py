@@ -1,11 +1,22 @@
-import hashlib
-
 from django.db import models
 from django.core.validators import MinLengthValidator
 
+from ai_models.utils.upload import file_digest
+
 # Create your models here.
 class SsqFeatureSet(models.Model):
     """特征数据集，直接训练出数据"""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCESS = 'success'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, '等待生成'),
+        (STATUS_RUNNING, '生成中'),
+        (STATUS_SUCCESS, '已完成'),
+        (STATUS_FAILED, '生成失败'),
+    ]
+
     name = models.CharField('特征集名称', max_length=100,
                             validators=[MinLengthValidator(1, '特征集名称不能为空')], db_index=True)
     description = models.TextField('描述', blank=True, null=True)
@@ -14,6 +25,12 @@ class SsqFeatureSet(models.Model):
     period_start = models.CharField('开始期号', max_length=20, db_index=True)
     period_end = models.CharField('结束期号', max_length=20, db_index=True)
     sample_count = models.IntegerField('样本数量', default=0)
+    artifact_path = models.CharField('特征矩阵目录', max_length=255, blank=True, default='',
+                                     help_text='相对 MEDIA_ROOT 的目录，内含 features/targets 等 .npy 文件')
+    artifact_version = models.PositiveIntegerField('特征矩阵版本', default=0)
+    status = models.CharField('生成状态', max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    progress = models.PositiveSmallIntegerField('生成进度', default=0, help_text='0-100')
+    error_message = models.TextField('错误信息', blank=True, default='')
     created_at = models.DateTimeField('创建时间', auto_now_add=True, db_index=True)
 
     class Meta:
@@ -152,15 +169,7 @@ class SsqModel(models.Model):
         return f"{self.name} v{self.version} ({self.model_type})"
 
     def calculate_file_hash(self):
-        """计算模型文件的MD5哈希值（防止重复）"""
+        """计算模型文件的MD5哈希值（防止重复），上传时已计算过的直接复用"""
         if not self.model_file:
             return ""
-        # 重置文件指针到开头
-        self.model_file.seek(0)
-        hash_obj = hashlib.md5()
-        # 分块读取文件，避免内存溢出
-        for chunk in self.model_file.chunks(chunk_size=4096):
-            hash_obj.update(chunk)
-        # 恢复文件指针
-        self.model_file.seek(0)
-        return hash_obj.hexdigest()
\ No newline at end of file
+        return file_digest(self.model_file)
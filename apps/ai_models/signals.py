@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from ai_models.models import SsqFeatureSet, SsqModel
+from ai_models.utils.feature_matrix import delete_feature_artifact
+from ai_models.utils.registry import model_registry
+
+
+@receiver(post_delete, sender=SsqFeatureSet, dispatch_uid='ssq_feature_set_deleted')
+def on_feature_set_deleted(sender, instance, **kwargs):
+    """特征集删除后，事务提交时清理矩阵文件（删除后实例主键会被置空，先取出）"""
+    pk = instance.pk
+    transaction.on_commit(lambda: delete_feature_artifact(pk))
+
+
+@receiver(post_save, sender=SsqModel, dispatch_uid='ssq_model_saved')
+def on_model_saved(sender, instance, **kwargs):
+    """模型停用后从本进程注册表移除（其他进程在下次读取模型时移除）"""
+    if not instance.is_active:
+        model_registry.evict(instance.model_hash)
+
+
+@receiver(post_delete, sender=SsqModel, dispatch_uid='ssq_model_deleted')
+def on_model_deleted(sender, instance, **kwargs):
+    """模型删除后从本进程注册表移除"""
+    model_registry.evict(instance.model_hash)
@@ -0,0 +1,40 @@
+from celery import shared_task
+
+from ai_models.models import SsqFeatureSet
+from ai_models.utils.feature_matrix import DEFAULT_CHUNK_SIZE, write_feature_artifact
+
+
+@shared_task
+def generate_feature_set(feature_set_id: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    后台生成特征集矩阵，分块写入并更新进度
+    :param feature_set_id: 特征集主键
+    :param chunk_size: 每块样本数
+    :return: 样本数量
+    """
+    feature_set = SsqFeatureSet.objects.filter(pk=feature_set_id).first()
+    if feature_set is None:
+        # 任务执行前特征集已被删除
+        return 0
+
+    queryset = SsqFeatureSet.objects.filter(pk=feature_set_id)
+    queryset.update(status=SsqFeatureSet.STATUS_RUNNING, progress=0, error_message='')
+
+    last_progress = 0
+
+    def _progress(done: int, total: int):
+        # 进度只在百分比变化时写库
+        nonlocal last_progress
+        percent = min(99, done * 100 // total) if total else 99
+        if percent != last_progress:
+            last_progress = percent
+            queryset.update(progress=percent)
+
+    try:
+        count = write_feature_artifact(feature_set, chunk_size=chunk_size, progress=_progress)
+    except Exception as e:
+        queryset.update(status=SsqFeatureSet.STATUS_FAILED, error_message=str(e))
+        raise
+
+    queryset.update(status=SsqFeatureSet.STATUS_SUCCESS, progress=100)
+    return count
@@ -1,3 +1,352 @@
-from django.test import TestCase
+import datetime
+import os
+import shutil
+import tempfile
+import threading
+import time
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+import numpy as np
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from ai_models import tasks
+from ai_models.models import SsqFeatureSet, SsqModel
+from ai_models.tasks import generate_feature_set
+from ai_models.utils import registry
+from ai_models.utils.inference import InferenceError, predict, predict_model
+from ai_models.utils.registry import ModelLoadError, ModelRegistry
+from ai_models.utils.feature_matrix import FEATURE_COLUMNS, load_feature_matrix
+from ssq.models import SsqDraw
+from ssq.utils.store import draw_store
+
+
+class FeatureSetTaskTests(TestCase):
+    """特征集后台生成：CELERY_TASK_ALWAYS_EAGER 下在当前进程执行任务"""
+
+    DRAW_COUNT = 40
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        overridden = override_settings(MEDIA_ROOT=media_root, CELERY_TASK_ALWAYS_EAGER=True)
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+
+        # 任务所属的 Celery 应用已读取过配置，eager 开关直接设置到应用上
+        conf = generate_feature_set.app.conf
+        self.addCleanup(setattr, conf, 'task_always_eager', conf.task_always_eager)
+        conf.task_always_eager = True
+
+        draw_date = datetime.date(2024, 1, 2)
+        draws = []
+        for i in range(self.DRAW_COUNT):
+            draw = SsqDraw(period=f'2024{i + 1:03d}', draw_date=draw_date + datetime.timedelta(days=i),
+                           red_balls=sorted({(i * 7 + k * 5) % 33 + 1 for k in range(6)}), blue_ball=i % 16 + 1)
+            draw._calculate_features()
+            draws.append(draw)
+        SsqDraw.objects.bulk_create(draws)
+        # bulk_create 不触发信号，进程内开奖存储需要重新加载
+        draw_store.invalidate()
+        self.addCleanup(draw_store.invalidate)
+
+    def create_feature_set(self, **kwargs) -> SsqFeatureSet:
+        """样本为 (第i期, 第i+1期)，默认范围 2024001-2024030 共29个样本"""
+        values = {'name': 'test', 'period_start': '2024001', 'period_end': '2024030', **kwargs}
+        return SsqFeatureSet.objects.create(**values)
+
+    def get_status(self, feature_set) -> dict:
+        response = self.client.get(reverse('ai_models:features_status', args=[feature_set.pk]))
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_create_runs_task_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('ai_models:features_create'), {
+                'name': 'eager', 'period_start': '2024001', 'period_end': '2024030',
+            })
+        feature_set = SsqFeatureSet.objects.get(name='eager')
+        self.assertRedirects(response, reverse('ai_models:features_detail', args=[feature_set.pk]),
+                             fetch_redirect_response=False)
+
+        self.assertEqual(self.get_status(feature_set), {
+            'id': feature_set.pk,
+            'status': SsqFeatureSet.STATUS_SUCCESS,
+            'status_display': '已完成',
+            'progress': 100,
+            'sample_count': 29,
+            'error_message': '',
+            'finished': True,
+        })
+        matrix = load_feature_matrix(feature_set)
+        self.assertEqual(matrix.features.shape, (29, len(FEATURE_COLUMNS)))
+
+    def test_pending_status(self):
+        data = self.get_status(self.create_feature_set())
+        self.assertEqual(data['status'], SsqFeatureSet.STATUS_PENDING)
+        self.assertEqual(data['progress'], 0)
+        self.assertFalse(data['finished'])
+
+    def test_progress_transitions(self):
+        feature_set = self.create_feature_set()
+        seen = []
+        write = tasks.write_feature_artifact
+
+        def recording_write(obj, chunk_size, progress):
+            # 每块写完后记录数据库中的状态和进度
+            def _progress(done, total):
+                progress(done, total)
+                seen.append(SsqFeatureSet.objects.values_list('status', 'progress').get(pk=obj.pk))
+            return write(obj, chunk_size=chunk_size, progress=_progress)
+
+        with mock.patch.object(tasks, 'write_feature_artifact', side_effect=recording_write):
+            result = generate_feature_set.delay(feature_set.pk, chunk_size=10)
+
+        self.assertEqual(result.get(), 29)
+        self.assertEqual(seen, [
+            (SsqFeatureSet.STATUS_RUNNING, 34),
+            (SsqFeatureSet.STATUS_RUNNING, 68),
+            (SsqFeatureSet.STATUS_RUNNING, 99),
+        ])
+        feature_set.refresh_from_db()
+        self.assertEqual((feature_set.status, feature_set.progress), (SsqFeatureSet.STATUS_SUCCESS, 100))
+
+    def test_failure_recorded(self):
+        feature_set = self.create_feature_set()
+        with mock.patch.object(tasks, 'write_feature_artifact', side_effect=OSError('磁盘已满')):
+            result = generate_feature_set.delay(feature_set.pk)
+
+        self.assertTrue(result.failed())
+        data = self.get_status(feature_set)
+        self.assertEqual(data['status'], SsqFeatureSet.STATUS_FAILED)
+        self.assertEqual(data['error_message'], '磁盘已满')
+        self.assertTrue(data['finished'])
+
+    def test_deleted_feature_set(self):
+        self.assertEqual(generate_feature_set.delay(0).get(), 0)
+
+    def test_regenerate_failed_feature_set(self):
+        feature_set = self.create_feature_set(status=SsqFeatureSet.STATUS_FAILED, error_message='磁盘已满')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('ai_models:features_regenerate', args=[feature_set.pk]))
+        self.assertRedirects(response, reverse('ai_models:features_detail', args=[feature_set.pk]),
+                             fetch_redirect_response=False)
+        data = self.get_status(feature_set)
+        self.assertEqual((data['status'], data['sample_count'], data['error_message']),
+                         (SsqFeatureSet.STATUS_SUCCESS, 29, ''))
+
+    def test_regenerate_skips_finished_feature_set(self):
+        feature_set = self.create_feature_set(status=SsqFeatureSet.STATUS_SUCCESS)
+        with mock.patch.object(generate_feature_set, 'delay') as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('ai_models:features_regenerate', args=[feature_set.pk]))
+            call_command('features_regenerate', stdout=StringIO())
+        delay.assert_not_called()
+        self.assertEqual(self.get_status(feature_set)['status'], SsqFeatureSet.STATUS_SUCCESS)
+
+    def test_regenerate_command(self):
+        failed = self.create_feature_set(name='failed', status=SsqFeatureSet.STATUS_FAILED)
+        pending = self.create_feature_set(name='pending')
+        with mock.patch.object(generate_feature_set, 'delay') as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            call_command('features_regenerate', '--status', 'failed', stdout=StringIO())
+        delay.assert_called_once_with(failed.pk)
+        self.assertEqual(self.get_status(failed)['status'], SsqFeatureSet.STATUS_PENDING)
+        self.assertEqual(self.get_status(pending)['status'], SsqFeatureSet.STATUS_PENDING)
+
+
+class ModelRegistryTests(SimpleTestCase):
+    """进程内模型注册表：用临时 .npy/.npz 文件代替上传的模型"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+
+    def make_model(self, name: str, array: np.ndarray, ext: str = '.npy'):
+        """与 SsqModel 接口一致的最小对象"""
+        path = f'{self.tmpdir}/{name}{ext}'
+        if ext == '.npz':
+            np.savez(path, weights=array)
+        else:
+            np.save(path, array)
+        return SimpleNamespace(model_hash=name, is_active=True, model_file=SimpleNamespace(path=path))
+
+    def test_failed_load_keeps_lock_until_published(self):
+        model = self.make_model('a', np.arange(4))
+        model_registry = ModelRegistry()
+        load = registry.load_model_file
+        active, peak, calls = [0], [0], []
+
+        def flaky_load(path):
+            # 第一次加载失败，并统计同时进行的加载数量
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            calls.append(path)
+            try:
+                time.sleep(0.05)
+                if len(calls) == 1:
+                    raise ModelLoadError('文件损坏')
+                return load(path)
+            finally:
+                active[0] -= 1
+
+        errors = []
+
+        def worker():
+            try:
+                model_registry.get(model)
+            except ModelLoadError as e:
+                errors.append(e)
+
+        with mock.patch.object(registry, 'load_model_file', side_effect=flaky_load):
+            threads = [threading.Thread(target=worker) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+                time.sleep(0.01)
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(peak[0], 1)
+        self.assertEqual((len(calls), len(errors)), (2, 1))
+        self.assertIn('a', model_registry)
+        self.assertEqual(model_registry._load_locks, {})
+
+        model_registry.clear()
+        with mock.patch.object(registry, 'load_model_file', side_effect=ModelLoadError('文件损坏')):
+            with self.assertRaises(ModelLoadError):
+                model_registry.get(model)
+        self.assertIn('a', model_registry._load_locks)
+
+    def test_lru_eviction(self):
+        # npz 整体读入内存，按数组字节数计入预算；每个 80000 字节
+        models = {name: self.make_model(name, np.full(10000, i, dtype=np.float64), '.npz')
+                  for i, name in enumerate('abcd')}
+        model_registry = ModelRegistry(max_bytes=250000)
+        for name in 'abc':
+            model_registry.get(models[name])
+        self.assertEqual(model_registry.total_bytes, 240000)
+
+        # 访问 a 后 b 成为最久未使用
+        self.assertEqual(model_registry.get(models['a'])['weights'][0], 0)
+        model_registry.get(models['d'])
+        self.assertNotIn('b', model_registry)
+        self.assertEqual([entry['model_hash'] for entry in model_registry.stats()['models']], ['c', 'a', 'd'])
+        self.assertEqual({key: model_registry.stats()[key] for key in ('hits', 'misses', 'evictions', 'total_bytes')},
+                         {'hits': 1, 'misses': 4, 'evictions': 1, 'total_bytes': 240000})
+
+        # 超出预算的模型本身仍然保留，其余全部淘汰
+        large = self.make_model('large', np.zeros(40000), '.npz')
+        model_registry.get(large)
+        self.assertEqual([entry['model_hash'] for entry in model_registry.stats()['models']], ['large'])
+
+    def test_mmap_and_inactive_models(self):
+        model_registry = ModelRegistry(max_bytes=registry.MMAP_ENTRY_BYTES)
+        mapped = self.make_model('mapped', np.zeros(100000))
+        weights = model_registry.get(mapped)
+        self.assertIsInstance(weights, np.memmap)
+        entry = model_registry.stats()['models'][0]
+        self.assertEqual((entry['nbytes'], entry['mmap']), (registry.MMAP_ENTRY_BYTES, True))
+
+        # 停用的模型不进入缓存，已缓存的条目被移除
+        mapped.is_active = False
+        model_registry.get(mapped)
+        self.assertNotIn('mapped', model_registry)
+        self.assertEqual(model_registry.total_bytes, 0)
+
+    def test_missing_or_unsupported_file(self):
+        model_registry = ModelRegistry()
+        for model_hash, model_file in (('x', None), ('y', SimpleNamespace(path='/nonexistent.npy')),
+                                       ('z', SimpleNamespace(path=f'{self.tmpdir}/model.txt'))):
+            with self.assertRaises(ModelLoadError):
+                model_registry.get(SimpleNamespace(model_hash=model_hash, is_active=True, model_file=model_file))
+        self.assertEqual(len(model_registry), 0)
+
+
+class InferenceTests(TestCase):
+    """批量推理：NumPy 线性模型作为组件，按集成权重合并"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        overridden = override_settings(MEDIA_ROOT=self.media_root)
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+
+        self.registry = ModelRegistry()
+        self.feature_set = SsqFeatureSet.objects.create(name='test', period_start='2024001', period_end='2024030')
+        rng = np.random.default_rng(12)
+        self.features = rng.random((5, len(FEATURE_COLUMNS)))
+        self.weights = {name: rng.normal(size=(len(FEATURE_COLUMNS), 49)) for name in 'abc'}
+
+    def create_model(self, name: str, model_type: str = 'NN', **kwargs) -> SsqModel:
+        model_file = ''
+        if name in self.weights:
+            model_file = f'models/{name}.npy'
+            os.makedirs(os.path.join(self.media_root, 'models'), exist_ok=True)
+            np.save(os.path.join(self.media_root, model_file), self.weights[name])
+        return SsqModel.objects.create(name=name, model_type=model_type, feature_set=self.feature_set,
+                                       train_period_start='2024001', train_period_end='2024030',
+                                       model_file=model_file, model_hash=name, **kwargs)
+
+    def create_ensemble(self, components, **kwargs) -> SsqModel:
+        ensemble = self.create_model('ensemble', 'Ensemble', **kwargs)
+        for name in components:
+            ensemble.ensemble_models.add(self.create_model(name))
+        return ensemble
+
+    def expected(self, name: str) -> tuple:
+        return predict_model(self.weights[name].astype(np.float32), self.features.astype(np.float32))
+
+    def test_weighted_ensemble(self):
+        # 权重按组件加入的先后顺序对应
+        ensemble = self.create_ensemble(['c', 'a', 'b'], ensemble_weights=[0, 3, 1])
+        prediction = predict(ensemble, self.features, registry=self.registry)
+
+        (a_red, a_blue), (b_red, b_blue) = self.expected('a'), self.expected('b')
+        np.testing.assert_allclose(prediction.red, 0.75 * a_red + 0.25 * b_red, rtol=1e-6)
+        np.testing.assert_allclose(prediction.blue, 0.75 * a_blue + 0.25 * b_blue, rtol=1e-6)
+        np.testing.assert_allclose(prediction.red.sum(axis=1), 1)
+        np.testing.assert_allclose(prediction.blue.sum(axis=1), 1)
+        self.assertEqual([(item['name'].split()[0], item['weight']) for item in prediction.components],
+                         [('c', 0), ('a', 0.75), ('b', 0.25)])
+        self.assertEqual(prediction.top_red().shape, (5, 6))
+        np.testing.assert_array_equal(prediction.top_blue(), prediction.blue.argmax(axis=1) + 1)
+        # 每个组件只加载一次
+        self.assertEqual(self.registry.misses, 3)
+
+    def test_equal_weights_and_single_model(self):
+        prediction = predict(self.create_ensemble(['a', 'b']), self.features, registry=self.registry)
+        (a_red, _), (b_red, _) = self.expected('a'), self.expected('b')
+        np.testing.assert_allclose(prediction.red, (a_red + b_red) / 2, rtol=1e-6)
+
+        single = predict(SsqModel.objects.get(name='a'), self.features, registry=self.registry)
+        np.testing.assert_allclose(single.red, a_red, rtol=1e-6)
+        self.assertEqual(len(single.components), 1)
+
+    def test_invalid_ensembles(self):
+        for weights in ([1], [-1, 2], [0, 0]):
+            SsqModel.objects.all().delete()
+            with self.assertRaises(InferenceError, msg=weights):
+                predict(self.create_ensemble(['a', 'b'], ensemble_weights=weights), self.features,
+                        registry=self.registry)
+        SsqModel.objects.all().delete()
+        with self.assertRaises(InferenceError):
+            predict(self.create_ensemble([]), self.features, registry=self.registry)
+
+    def test_model_outputs(self):
+        features = self.features.astype(np.float32)
+        weights = self.weights['a'].astype(np.float32)
+        red, blue = predict_model({'weights': weights, 'bias': np.ones(49, dtype=np.float32)}, features)
+        np.testing.assert_allclose(red, predict_model(np.vstack([weights, np.ones(49)]), features)[0], rtol=1e-6)
+        # 非 logits 输出：负值截为0，全0的行取均匀分布
+        output = np.zeros((5, 49))
+        output[:, 0], output[:, 33] = 2, -1
+        red, blue = predict_model(lambda x: output, features)
+        np.testing.assert_array_equal(red[:, 0], 1)
+        np.testing.assert_allclose(blue, 1 / 16)
+        for model in (weights[:-1], lambda x: np.zeros((5, 48)), lambda x: 1 / 0):
+            with self.assertRaises(InferenceError):
+                predict_model(model, features)
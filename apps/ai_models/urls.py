@@ -1,5 +1,5 @@
 from django.urls import path
-from ai_models.views import features
+from ai_models.views import features, health, models
 app_name = 'ai_models'
 
 urlpatterns = [
@@ -8,4 +8,14 @@ urlpatterns = [
     path('features/create/',features.features_create, name = 'features_create'),
     path('features/<int:pk>/', features.features_detail, name = 'features_detail'),
     path('features/delete/<int:pk>/', features.features_delete, name = 'features_delete'),
+    path('features/<int:pk>/regenerate/', features.features_regenerate, name = 'features_regenerate'),
+    path('features/<int:pk>/status/', features.features_status, name = 'features_status'),
+    path('features/<int:pk>/export/', features.features_export, name = 'features_export'),
+
+    #预测模型
+    path('models/create/', models.model_create, name = 'model_create'),
+    path('models/<int:pk>/predict/', models.model_predict, name = 'model_predict'),
+
+    #模型状态
+    path('health/', health.model_health, name = 'model_health'),
 ]
\ No newline at end of file
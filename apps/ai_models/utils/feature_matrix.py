@@ -0,0 +1,267 @@
+import datetime
+import json
+import os
+import shutil
+from dataclasses import dataclass
+
+import numpy as np
+from django.conf import settings
+
+from ssq.models import SsqDraw
+from ssq.utils.store import get_draw_store
+
+# 特征列：当期开奖的衍生特征 + 开奖日期特征
+FEATURE_COLUMNS = [
+    'red_sum', 'red_span', 'red_ac_value', 'red_tail_sum', 'red_odd_count', 'red_even_count',
+    'red_prime_count', 'zone_1_count', 'zone_2_count', 'zone_3_count', 'weekday', 'month', 'quarter',
+]
+# 目标列：下一期开奖的特征
+TARGET_COLUMNS = [
+    'next_red_sum', 'next_red_ac_value', 'next_red_odd_count', 'next_red_even_count',
+    'next_red_prime_count', 'next_blue_ball',
+]
+
+# 矩阵统一使用 int16，所有特征值都在该范围内
+MATRIX_DTYPE = np.int16
+
+# 特征矩阵根目录（相对 MEDIA_ROOT）
+ARTIFACT_ROOT = 'features'
+ARTIFACT_FILES = ('periods', 'next_periods', 'features', 'targets')
+
+# 构造矩阵用到的存储列
+_STORE_COLUMNS = (
+    'period', 'date_ordinal', 'red_sum', 'red_span', 'red_ac_value', 'red_tail_sum', 'red_odd_count',
+    'red_prime_count', 'zone_1_count', 'zone_2_count', 'zone_3_count', 'blue_ball',
+)
+
+# 分块生成时每块的样本数
+DEFAULT_CHUNK_SIZE = 5000
+
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+
+@dataclass
+class FeatureMatrix:
+    """特征集矩阵，从文件打开时各数组均为只读内存映射"""
+    periods: np.ndarray  # (N,) 样本期号
+    next_periods: np.ndarray  # (N,) 目标期号
+    features: np.ndarray  # (N, len(feature_columns))
+    targets: np.ndarray  # (N, len(target_columns))
+    feature_columns: list
+    target_columns: list
+    version: int = 0
+
+    def __len__(self) -> int:
+        return len(self.periods)
+
+    def rows(self, start: int = 0, stop: int = None):
+        """按行切片，对内存映射数组切片不会复制数据"""
+        index = slice(start, stop)
+        return self.periods[index], self.next_periods[index], self.features[index], self.targets[index]
+
+
+def _date_columns(date_ordinals: np.ndarray) -> dict:
+    """由日期序数向量化计算星期（0=周一，同 date.weekday()）、月份、季度"""
+    ordinals = np.asarray(date_ordinals, dtype=np.int64)
+    days = (ordinals - _EPOCH_ORDINAL).astype('datetime64[D]')
+    month = days.astype('datetime64[M]').astype(np.int64) % 12 + 1
+    return {
+        'weekday': (ordinals - 1) % 7,
+        'month': month,
+        'quarter': (month - 1) // 3 + 1,
+    }
+
+
+def _snapshot(period_start, period_end):
+    """
+    取出开奖存储的列视图快照及样本所在下标范围，后续存储追加或失效都不影响快照
+    每个样本为 (第i期特征, 第i+1期目标)，目标期也必须在范围内
+    :return: (列字典, 样本下标切片)
+    """
+    store = get_draw_store()
+    columns = {name: store.column(name) for name in _STORE_COLUMNS}
+    try:
+        rows = store.period_slice(period_start, period_end)
+    except ValueError:
+        rows = slice(0, 0)
+    return columns, slice(rows.start, max(rows.start, rows.stop - 1))
+
+
+def count_samples(period_start, period_end) -> int:
+    """期号范围内的样本数量，只做二分查找"""
+    _, current = _snapshot(period_start, period_end)
+    return current.stop - current.start
+
+
+def _build_rows(columns: dict, current: slice):
+    """
+    构造一段样本的特征矩阵和目标矩阵
+    :param columns: 存储列快照
+    :param current: 样本下标切片
+    :return: (features, targets)
+    """
+    following = slice(current.start + 1, current.stop + 1)
+
+    def _values(index: slice) -> dict:
+        values = {name: columns[name][index] for name in _STORE_COLUMNS}
+        odd = values['red_odd_count'].astype(MATRIX_DTYPE)
+        values['red_odd_count'] = odd
+        values['red_even_count'] = SsqDraw.RED_BALL_COUNT - odd
+        return values
+
+    current_values = _values(current)
+    current_values.update(_date_columns(columns['date_ordinal'][current]))
+    next_values = {f'next_{name}': values for name, values in _values(following).items()}
+
+    count = current.stop - current.start
+    features = np.empty((count, len(FEATURE_COLUMNS)), dtype=MATRIX_DTYPE)
+    for i, name in enumerate(FEATURE_COLUMNS):
+        features[:, i] = current_values[name]
+    targets = np.empty((count, len(TARGET_COLUMNS)), dtype=MATRIX_DTYPE)
+    for i, name in enumerate(TARGET_COLUMNS):
+        targets[:, i] = next_values[name]
+    return features, targets
+
+
+def build_feature_matrix(period_start, period_end, limit: int = None) -> FeatureMatrix:
+    """
+    从开奖存储按列构造期号范围内的特征矩阵和目标矩阵
+    :param period_start: 开始期号
+    :param period_end: 结束期号
+    :param limit: 只构造前 limit 个样本，None 表示全部
+    :return: FeatureMatrix（内存数组）
+    """
+    columns, current = _snapshot(period_start, period_end)
+    if limit is not None:
+        current = slice(current.start, min(current.stop, current.start + limit))
+    features, targets = _build_rows(columns, current)
+    return FeatureMatrix(
+        periods=columns['period'][current].copy(),
+        next_periods=columns['period'][current.start + 1:current.stop + 1].copy(),
+        features=features,
+        targets=targets,
+        feature_columns=list(FEATURE_COLUMNS),
+        target_columns=list(TARGET_COLUMNS),
+    )
+
+
+def _artifact_dir(relative_path: str) -> str:
+    return os.path.join(settings.MEDIA_ROOT, relative_path)
+
+
+def write_feature_artifact(feature_set, chunk_size: int = DEFAULT_CHUNK_SIZE, progress=None) -> int:
+    """
+    分块生成特征矩阵文件并更新特征集：写入新版本目录后再切换，旧版本随后删除
+    目录结构：features/<pk>/v<版本>/{periods,next_periods,features,targets}.npy + meta.json
+    :param feature_set: 已保存的 SsqFeatureSet
+    :param chunk_size: 每块样本数，逐块写入内存映射文件，内存占用只与块大小有关
+    :param progress: 进度回调 progress(已完成样本数, 样本总数)
+    :return: 样本数量
+    """
+    columns, current = _snapshot(feature_set.period_start, feature_set.period_end)
+    count = current.stop - current.start
+    chunk_size = max(1, chunk_size)
+
+    version = feature_set.artifact_version + 1
+    relative_path = os.path.join(ARTIFACT_ROOT, str(feature_set.pk), f'v{version}')
+    target = _artifact_dir(relative_path)
+    tmp = f'{target}.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    np.save(os.path.join(tmp, 'periods.npy'), columns['period'][current])
+    np.save(os.path.join(tmp, 'next_periods.npy'), columns['period'][current.start + 1:current.stop + 1])
+    features = np.lib.format.open_memmap(
+        os.path.join(tmp, 'features.npy'), mode='w+', dtype=MATRIX_DTYPE, shape=(count, len(FEATURE_COLUMNS)))
+    targets = np.lib.format.open_memmap(
+        os.path.join(tmp, 'targets.npy'), mode='w+', dtype=MATRIX_DTYPE, shape=(count, len(TARGET_COLUMNS)))
+    for start in range(0, count, chunk_size):
+        stop = min(start + chunk_size, count)
+        features[start:stop], targets[start:stop] = _build_rows(
+            columns, slice(current.start + start, current.start + stop))
+        if progress:
+            progress(stop, count)
+    features.flush()
+    targets.flush()
+    del features, targets
+
+    with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': version,
+            'period_start': feature_set.period_start,
+            'period_end': feature_set.period_end,
+            'sample_count': count,
+            'feature_columns': FEATURE_COLUMNS,
+            'target_columns': TARGET_COLUMNS,
+        }, f, ensure_ascii=False)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+
+    old_path = feature_set.artifact_path
+    feature_set.artifact_path = relative_path
+    feature_set.artifact_version = version
+    feature_set.feature_columns = list(FEATURE_COLUMNS)
+    feature_set.target_columns = list(TARGET_COLUMNS)
+    feature_set.sample_count = count
+    feature_set.save(update_fields=[
+        'artifact_path', 'artifact_version', 'feature_columns', 'target_columns', 'sample_count',
+    ])
+    if old_path and old_path != relative_path:
+        shutil.rmtree(_artifact_dir(old_path), ignore_errors=True)
+    return count
+
+
+def load_feature_matrix(feature_set, mmap_mode: str = 'r') -> FeatureMatrix:
+    """
+    以内存映射方式打开特征集矩阵，只按需读取访问到的页
+    :param feature_set: SsqFeatureSet
+    :param mmap_mode: np.load 的 mmap_mode，None 表示整体读入内存
+    :return: FeatureMatrix；尚未生成矩阵文件时返回 None
+    """
+    if not feature_set.artifact_path:
+        return None
+    path = _artifact_dir(feature_set.artifact_path)
+    try:
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode) for name in ARTIFACT_FILES}
+    except (OSError, ValueError):
+        return None
+    return FeatureMatrix(
+        feature_columns=meta['feature_columns'],
+        target_columns=meta['target_columns'],
+        version=meta['version'],
+        **arrays,
+    )
+
+
+def delete_feature_artifact(pk):
+    """
+    删除特征集的全部矩阵文件
+    :param pk: 特征集主键
+    """
+    shutil.rmtree(_artifact_dir(os.path.join(ARTIFACT_ROOT, str(pk))), ignore_errors=True)
+
+
+def export_feature_columns(feature_set, matrix: FeatureMatrix) -> tuple:
+    """
+    特征集样本按列展开（每个特征列、目标列各一列）及列式文件元数据
+    :param feature_set: SsqFeatureSet
+    :param matrix: 已打开的特征矩阵
+    :return: (列字典, 元数据)
+    """
+    columns = {'period': matrix.periods, 'next_period': matrix.next_periods}
+    columns.update({name: matrix.features[:, i] for i, name in enumerate(matrix.feature_columns)})
+    columns.update({name: matrix.targets[:, i] for i, name in enumerate(matrix.target_columns)})
+    meta = {
+        'source': 'ssq_feature_set',
+        'feature_set_id': feature_set.pk,
+        'name': feature_set.name,
+        'version': matrix.version,
+        'period_start': feature_set.period_start,
+        'period_end': feature_set.period_end,
+        'row_count': len(matrix),
+        'feature_columns': matrix.feature_columns,
+        'target_columns': matrix.target_columns,
+    }
+    return columns, meta
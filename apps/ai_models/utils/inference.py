@@ -0,0 +1,232 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+from django.conf import settings
+
+from ai_models.utils.registry import model_registry
+
+RED_NUMBERS = 33
+BLUE_NUMBERS = 16
+# 模型输出的列数：前33列为红球 1-33，后16列为蓝球 1-16
+OUTPUT_WIDTH = RED_NUMBERS + BLUE_NUMBERS
+
+# 模型推理使用的数值类型，整批只转换一次，各组件共享同一个只读数组
+INPUT_DTYPE = np.float32
+
+
+class InferenceError(Exception):
+    """模型无法推理（集成配置错误、输出形状不符合约定）"""
+
+
+@dataclass
+class Prediction:
+    """
+    一批样本的预测结果
+    - red: (N, 33)，每行为红球 1-33 的概率分布（和为1），乘以6即各号码的期望出现次数
+    - blue: (N, 16)，每行为蓝球 1-16 的概率分布（和为1）
+    """
+    red: np.ndarray
+    blue: np.ndarray
+    components: list
+
+    def __len__(self) -> int:
+        return len(self.red)
+
+    def top_red(self, count: int = 6) -> np.ndarray:
+        """每行概率最高的 count 个红球号码（升序）"""
+        return np.sort(np.argsort(-self.red, axis=1, kind='stable')[:, :count] + 1, axis=1)
+
+    def top_blue(self) -> np.ndarray:
+        """每行概率最高的蓝球号码"""
+        return np.argmax(self.blue, axis=1) + 1
+
+
+# ======================单个模型推理======================
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    values = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return values / values.sum(axis=1, keepdims=True)
+
+
+def _linear(model, features: np.ndarray):
+    """
+    NumPy 线性模型：.npy 为 (F, 49) 权重或 (F+1, 49)（最后一行为偏置），
+    .npz 为 {'weights': (F, 49), 'bias': (49,)}；输出为 logits
+    """
+    if isinstance(model, dict):
+        weights, bias = model['weights'], model.get('bias')
+    elif model.shape[0] == features.shape[1] + 1:
+        weights, bias = model[:-1], model[-1]
+    else:
+        weights, bias = model, None
+    if weights.shape[0] != features.shape[1]:
+        raise InferenceError(f'权重矩阵形状 {tuple(weights.shape)} 与特征列数 {features.shape[1]} 不匹配')
+    logits = features @ weights.astype(INPUT_DTYPE, copy=False)
+    if bias is not None:
+        logits += bias
+    return logits, True
+
+
+def _torch(model, features: np.ndarray):
+    import torch
+
+    # torch 算子执行期间释放 GIL，线程池可以并行
+    with torch.no_grad():
+        output = model(torch.from_numpy(features))
+    if isinstance(output, (tuple, list)):
+        return tuple(part.detach().cpu().numpy() for part in output), False
+    return output.detach().cpu().numpy(), False
+
+
+def _estimator(model, features: np.ndarray):
+    """sklearn/LightGBM/XGBoost 风格：优先 predict_proba，其次 predict（Keras 模型关闭进度输出）"""
+    if hasattr(model, 'predict_proba'):
+        return model.predict_proba(features), False
+    if type(model).__module__.startswith(('keras', 'tensorflow')):
+        return model.predict(features, verbose=0), False
+    return model.predict(features), False
+
+
+def _raw_output(model, features: np.ndarray):
+    """
+    调用模型，返回 (输出, 是否为 logits)
+    输出约定为 (N, 49) 数组，或 (红球 (N, 33), 蓝球 (N, 16)) 二元组，或 {'red': ..., 'blue': ...}
+    """
+    if isinstance(model, (np.ndarray, dict)):
+        return _linear(model, features)
+    if type(model).__module__.startswith('torch'):
+        return _torch(model, features)
+    if hasattr(model, 'predict_proba') or hasattr(model, 'predict'):
+        return _estimator(model, features)
+    if callable(model):
+        return model(features), False
+    raise InferenceError(f'无法调用的模型对象：{type(model).__name__}')
+
+
+def _normalize(values: np.ndarray) -> np.ndarray:
+    """每行归一化为概率分布；负值截为0，全0的行取均匀分布"""
+    values = np.clip(np.asarray(values, dtype=np.float64), 0, None)
+    totals = values.sum(axis=1, keepdims=True)
+    empty = totals[:, 0] == 0
+    if empty.any():
+        values[empty] = 1
+        totals[empty] = values.shape[1]
+    return values / totals
+
+
+def predict_model(model, features: np.ndarray) -> tuple:
+    """
+    用单个已加载的模型对象推理一批样本（整批一次调用）
+    :param model: 注册表中的模型对象
+    :param features: (N, F) 特征矩阵
+    :return: (红球概率 (N, 33), 蓝球概率 (N, 16))
+    :raise InferenceError: 模型调用失败（如特征列数与训练时不一致）或输出不符合约定
+    """
+    try:
+        output, logits = _raw_output(model, features)
+    except InferenceError:
+        raise
+    except Exception as e:
+        # 模型自身抛出的异常（sklearn 的 ValueError、torch 的 RuntimeError 等）统一转换
+        raise InferenceError(f'模型推理失败：{type(e).__name__}: {e}') from e
+    if isinstance(output, dict):
+        red, blue = output['red'], output['blue']
+    elif isinstance(output, (tuple, list)) and len(output) == 2:
+        red, blue = output
+    else:
+        output = np.asarray(output)
+        if output.ndim != 2 or output.shape[1] != OUTPUT_WIDTH:
+            raise InferenceError(f'模型输出形状应为 (N, {OUTPUT_WIDTH})，实际为 {tuple(output.shape)}')
+        red, blue = output[:, :RED_NUMBERS], output[:, RED_NUMBERS:]
+    red, blue = np.asarray(red, dtype=np.float64), np.asarray(blue, dtype=np.float64)
+    if red.shape != (len(features), RED_NUMBERS) or blue.shape != (len(features), BLUE_NUMBERS):
+        raise InferenceError(f'红球/蓝球输出形状不符合约定：{tuple(red.shape)} / {tuple(blue.shape)}')
+    if logits:
+        return _softmax(red), _softmax(blue)
+    return _normalize(red), _normalize(blue)
+
+
+# ======================集成推理======================
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """进程内共享的推理线程池，大小通过 SSQ_INFERENCE_WORKERS 配置"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = getattr(settings, 'SSQ_INFERENCE_WORKERS', None) or min(4, os.cpu_count() or 1)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ssq-inference')
+        return _executor
+
+
+def ensemble_components(ssq_model) -> list:
+    """
+    集成模型的组件及归一化后的权重，权重按组件加入的先后顺序（中间表主键）对应；
+    未配置权重时各组件等权，非集成模型视为权重为1的单组件
+    :param ssq_model: SsqModel
+    :return: [(组件模型, 权重), ...]
+    """
+    if ssq_model.model_type != 'Ensemble':
+        return [(ssq_model, 1.0)]
+
+    through = type(ssq_model).ensemble_models.through
+    components = [
+        row.to_ssqmodel for row in
+        through.objects.filter(from_ssqmodel=ssq_model).select_related('to_ssqmodel').order_by('pk')
+    ]
+    if not components:
+        raise InferenceError(f'集成模型 {ssq_model} 没有组件模型')
+    nested = [str(component) for component in components if component.model_type == 'Ensemble']
+    if nested:
+        raise InferenceError(f'不支持嵌套集成模型：{", ".join(nested)}')
+
+    weights = ssq_model.ensemble_weights or [1.0] * len(components)
+    if len(weights) != len(components):
+        raise InferenceError(f'集成权重数量 {len(weights)} 与组件模型数量 {len(components)} 不一致')
+    weights = np.asarray(weights, dtype=np.float64)
+    if (weights < 0).any() or weights.sum() <= 0:
+        raise InferenceError('集成权重必须非负且不能全为0')
+    return list(zip(components, (weights / weights.sum()).tolist()))
+
+
+def predict(ssq_model, features, registry=model_registry) -> Prediction:
+    """
+    批量推理：每个组件模型对整批样本只调用一次，组件在线程池中并行执行，
+    结果按集成权重加权合并为红球、蓝球概率
+    :param ssq_model: SsqModel（集成模型或单个模型）
+    :param features: (N, F) 特征矩阵，如 FeatureMatrix.features 的切片
+    :param registry: 模型注册表
+    :return: Prediction
+    """
+    features = np.ascontiguousarray(features, dtype=INPUT_DTYPE)
+    if features.ndim != 2:
+        raise InferenceError(f'特征矩阵应为二维，实际为 {features.ndim} 维')
+    # 只读视图交给各组件，避免某个模型原地修改输入影响其他组件
+    features = features.view()
+    features.setflags(write=False)
+    components = ensemble_components(ssq_model)
+
+    def _run(component):
+        return predict_model(registry.get(component), features)
+
+    if len(components) == 1 or len(features) == 0:
+        outputs = [_run(component) for component, _ in components]
+    else:
+        outputs = list(get_executor().map(_run, [component for component, _ in components]))
+
+    red = np.zeros((len(features), RED_NUMBERS), dtype=np.float64)
+    blue = np.zeros((len(features), BLUE_NUMBERS), dtype=np.float64)
+    for (component_red, component_blue), (_, weight) in zip(outputs, components):
+        red += weight * component_red
+        blue += weight * component_blue
+    return Prediction(
+        red=red,
+        blue=blue,
+        components=[{'id': component.pk, 'name': str(component), 'weight': weight} for component, weight in components],
+    )
@@ -0,0 +1,198 @@
+import logging
+import os
+import sys
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections
+
+from ai_models.utils.registry import model_registry
+
+logger = logging.getLogger(__name__)
+
+# 预热状态
+STATUS_DISABLED = 'disabled'
+STATUS_PENDING = 'pending'
+STATUS_RUNNING = 'running'
+STATUS_READY = 'ready'
+# 预热已完成但部分模型加载失败：进程仍可服务，失败的模型稍后重试
+STATUS_DEGRADED = 'degraded'
+# 读取待预热模型列表失败（如数据库不可用），稍后重试
+STATUS_FAILED = 'failed'
+# 可以接入流量的状态
+READY_STATUSES = (STATUS_READY, STATUS_DEGRADED)
+
+# 预热失败后的重试间隔（秒）
+DEFAULT_RETRY_SECONDS = 60
+
+
+class PreloadState:
+    """本进程模型预热状态，供健康检查读取"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.status = STATUS_DISABLED
+        self.pid = None
+        self.started_at = None
+        self.finished_at = None
+        self.models = []
+
+    def reset_after_fork(self):
+        # fork 时其他线程可能持有锁，子进程中重新创建
+        self._lock = threading.Lock()
+
+    def failed_models(self) -> list:
+        return [record for record in self.models if 'error' in record]
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                'status': self.status,
+                'pid': self.pid,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'seconds': round(self.finished_at - self.started_at, 4) if self.finished_at else None,
+                'models': list(self.models),
+            }
+
+
+preload_state = PreloadState()
+
+
+def preload_enabled() -> bool:
+    return getattr(settings, 'SSQ_MODEL_PRELOAD', False)
+
+
+def retry_seconds() -> float:
+    return getattr(settings, 'SSQ_MODEL_PRELOAD_RETRY', DEFAULT_RETRY_SECONDS)
+
+
+def models_to_preload() -> list:
+    """全部激活模型及其集成组件模型，按 model_hash 去重"""
+    from ai_models.models import SsqModel
+
+    models, seen = [], set()
+    for model in SsqModel.objects.filter(is_active=True).prefetch_related('ensemble_models'):
+        for candidate in [model, *model.ensemble_models.all()]:
+            if candidate.model_hash not in seen and candidate.model_file:
+                seen.add(candidate.model_hash)
+                models.append(candidate)
+    return models
+
+
+def preload_models(registry=model_registry) -> dict:
+    """
+    同步预热：逐个加载模型到注册表并记录耗时；已加载的模型直接命中注册表，重试时只有失败的模型会重新加载
+    部分模型失败时状态为 degraded（仍然就绪），读取模型列表失败时为 failed
+    :param registry: 模型注册表
+    :return: 预热状态字典
+    """
+    state = preload_state
+    with state._lock:
+        # 降级状态下重试期间保持就绪，不把进程移出负载均衡
+        if state.status != STATUS_DEGRADED:
+            state.status = STATUS_RUNNING
+        state.pid = os.getpid()
+        state.started_at = time.time()
+        state.finished_at = None
+        state.models = []
+
+    try:
+        candidates = models_to_preload()
+    except Exception as e:
+        logger.exception('读取待预热模型失败')
+        with state._lock:
+            state.models.append({'error': str(e)})
+            state.status = STATUS_FAILED
+            state.finished_at = time.time()
+        return state.to_dict()
+
+    degraded = False
+
+    for model in candidates:
+        started = time.perf_counter()
+        record = {'id': model.pk, 'name': str(model), 'model_hash': model.model_hash}
+        try:
+            registry.get_entry(model)
+            record['seconds'] = round(time.perf_counter() - started, 4)
+            logger.info('模型预热完成：%s，耗时 %.3fs', model, record['seconds'])
+        except Exception as e:
+            degraded = True
+            record['error'] = str(e)
+            logger.exception('模型预热失败：%s', model)
+        with state._lock:
+            state.models.append(record)
+
+    with state._lock:
+        state.status = STATUS_DEGRADED if degraded else STATUS_READY
+        state.finished_at = time.time()
+    return state.to_dict()
+
+
+def _run_in_background():
+    # 等待应用注册完成后再访问数据库
+    while not apps.ready:
+        time.sleep(0.05)
+    try:
+        preload_models()
+    finally:
+        close_old_connections()
+
+
+def _should_start(state: PreloadState) -> bool:
+    """本进程尚未预热（包括从已预热的父进程 fork 而来），或上次失败/降级且已到重试时间"""
+    if state.pid != os.getpid() or state.status == STATUS_DISABLED:
+        return True
+    if state.status in (STATUS_FAILED, STATUS_DEGRADED):
+        return time.time() - (state.finished_at or 0) >= retry_seconds()
+    return False
+
+
+def start_preload() -> bool:
+    """
+    在后台线程中预热模型；每个进程只启动一次，失败或降级后按 SSQ_MODEL_PRELOAD_RETRY 间隔重试
+    :return: 是否启动了新的预热线程
+    """
+    state = preload_state
+    with state._lock:
+        if not _should_start(state):
+            return False
+        if state.pid != os.getpid() or state.status != STATUS_DEGRADED:
+            state.status = STATUS_PENDING
+        state.pid = os.getpid()
+        # 防止重试间隔内重复启动
+        state.finished_at = None
+    threading.Thread(target=_run_in_background, name='ssq-model-preload', daemon=True).start()
+    return True
+
+
+def should_preload_on_startup() -> bool:
+    """
+    AppConfig.ready 中是否启动预热：
+    - 未开启 SSQ_MODEL_PRELOAD 时不预热
+    - manage.py 的管理命令（迁移、shell等）不预热，runserver 只在自动重载的子进程中预热
+    - Celery 由 worker_process_init 在每个子进程中预热，主进程不预热
+    """
+    if not preload_enabled():
+        return False
+    program = os.path.basename(sys.argv[0]) if sys.argv else ''
+    if program == 'manage.py':
+        return sys.argv[1:2] == ['runserver'] and (os.environ.get('RUN_MAIN') == 'true' or '--noreload' in sys.argv)
+    return 'celery' not in program
+
+
+def is_ready() -> bool:
+    """
+    未开启预热时始终就绪，开启后预热完成才就绪（部分模型失败为降级，仍然就绪）
+    fork 出的子进程（gunicorn --preload 等）继承了父进程的状态但没有预热线程，此处补启动；失败时按间隔重试
+    """
+    if not preload_enabled():
+        return True
+    start_preload()
+    return preload_state.status in READY_STATUSES
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=preload_state.reset_after_fork)
@@ -0,0 +1,328 @@
+import logging
+import mmap
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# 默认内存预算：512MB
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024
+
+# 内存映射的数组不计入预算：数据页在操作系统页缓存中，多进程共享，不占进程堆内存；
+# 模型至少按这么多字节计，覆盖对象本身的开销
+MMAP_ENTRY_BYTES = 64 * 1024
+
+# 统计内存占用时最多遍历的对象数，防止超大对象图拖慢加载
+FOOTPRINT_MAX_OBJECTS = 100000
+
+
+class ModelLoadError(Exception):
+    """模型文件无法加载（格式不支持、依赖未安装、文件缺失）"""
+
+
+@dataclass
+class LoadedModel:
+    """注册表中的一个已加载模型"""
+    model_hash: str
+    model: object
+    nbytes: int
+    mmap: bool
+    load_seconds: float
+    loaded_at: float = field(default_factory=time.time)
+
+
+# ======================各格式加载器======================
+
+def _load_numpy(path: str, mmap_mode):
+    if path.endswith('.npz'):
+        # npz 是 zip 包，无法内存映射，整体读入
+        with np.load(path, allow_pickle=False) as data:
+            return {name: data[name] for name in data.files}
+    return np.load(path, mmap_mode=mmap_mode, allow_pickle=False)
+
+
+def _load_pickle(path: str, mmap_mode):
+    # joblib 保存的 sklearn/LightGBM/XGBoost 模型可以把内部的 NumPy 数组内存映射（只有单独存储的大数组才会映射）
+    try:
+        import joblib
+    except ImportError:
+        joblib = None
+    if joblib is not None:
+        return joblib.load(path, mmap_mode=mmap_mode)
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def _load_torch(path: str, mmap_mode):
+    """
+    TorchScript 归档直接加载为可调用模块；其他文件只按 weights_only 加载张量和状态字典，
+    不反序列化任意 Python 对象（完整 pickle 的 nn.Module 需要先导出为 TorchScript）
+    """
+    try:
+        import torch
+    except ImportError:
+        raise ModelLoadError('加载 .pt 模型需要安装 torch')
+    try:
+        return torch.jit.load(path, map_location='cpu')
+    except RuntimeError:
+        # 不是 TorchScript 归档
+        pass
+    try:
+        return torch.load(path, map_location='cpu', mmap=mmap_mode is not None, weights_only=True)
+    except TypeError:
+        # 旧版本 torch 不支持 mmap 参数
+        return torch.load(path, map_location='cpu', weights_only=True)
+    except pickle.UnpicklingError as e:
+        raise ModelLoadError(f'.pt 文件包含张量以外的对象，请导出为 TorchScript：{e}')
+
+
+def _load_keras(path: str, mmap_mode):
+    try:
+        from tensorflow import keras
+    except ImportError:
+        raise ModelLoadError('加载 .h5 模型需要安装 tensorflow')
+    return keras.models.load_model(path, compile=False)
+
+
+# 扩展名 -> 加载器，加载器返回模型对象
+LOADERS = {
+    '.npy': _load_numpy,
+    '.npz': _load_numpy,
+    '.pkl': _load_pickle,
+    '.joblib': _load_pickle,
+    '.pt': _load_torch,
+    '.pth': _load_torch,
+    '.h5': _load_keras,
+    '.keras': _load_keras,
+}
+
+
+def load_model_file(path: str, mmap_mode: str = 'r'):
+    """
+    按扩展名反序列化模型文件
+    :param path: 本地文件路径
+    :param mmap_mode: NumPy 数组的内存映射模式，None 表示整体读入内存
+    :return: 模型对象
+    """
+    loader = LOADERS.get(os.path.splitext(path)[1].lower())
+    if loader is None:
+        raise ModelLoadError(f'不支持的模型文件格式：{path}')
+    if not os.path.exists(path):
+        raise ModelLoadError(f'模型文件不存在：{path}')
+    return loader(path, mmap_mode)
+
+
+def _is_mapped(array: np.ndarray) -> bool:
+    """数组的数据是否来自内存映射文件（沿 base 链查找）"""
+    base = array
+    while base is not None:
+        if isinstance(base, (np.memmap, mmap.mmap)):
+            return True
+        base = getattr(base, 'base', None)
+    return False
+
+
+def model_footprint(model, path: str) -> tuple:
+    """
+    估算模型占用的进程堆内存：遍历对象图中的 NumPy 数组，内存映射的数组不计
+    对象图中没有数组（如 torch/keras 模型、纯 Python 对象）时无法区分，按文件大小计
+    :param model: 已加载的模型对象
+    :param path: 模型文件路径
+    :return: (计入预算的字节数, 是否有内存映射的数组)
+    """
+    heap_bytes, mapped, found = 0, False, False
+    seen_arrays, seen = set(), set()
+    stack = [model]
+    while stack and len(seen) < FOOTPRINT_MAX_OBJECTS:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, np.ndarray):
+            found = True
+            if _is_mapped(obj):
+                mapped = True
+                continue
+            # 视图与原数组共享数据，只计一次
+            owner = obj
+            while isinstance(owner.base, np.ndarray):
+                owner = owner.base
+            if id(owner) not in seen_arrays:
+                seen_arrays.add(id(owner))
+                heap_bytes += owner.nbytes
+            if obj.dtype == object:
+                stack.extend(obj.ravel().tolist())
+        elif isinstance(obj, dict):
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif hasattr(obj, '__dict__') and not isinstance(obj, type):
+            stack.extend(vars(obj).values())
+    if not found:
+        return os.path.getsize(path), False
+    return max(heap_bytes, MMAP_ENTRY_BYTES), mapped
+
+
+# ======================注册表======================
+
+class ModelRegistry:
+    """
+    进程内模型注册表
+    - 首次使用时加载模型文件，按 model_hash 缓存
+    - 超出内存预算时按 LRU 淘汰，预算通过 SSQ_MODEL_CACHE_BYTES 配置
+    - NumPy 数组尽量内存映射加载，映射的数组不计入预算，其余按实际占用估算
+    - 模型停用（is_active=False）或删除时移除
+    """
+
+    def __init__(self, max_bytes: int = None):
+        self._max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        # 每个 model_hash 一把加载锁，并发请求同一模型时只加载一次
+        self._load_locks = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_bytes(self) -> int:
+        if self._max_bytes is not None:
+            return self._max_bytes
+        return getattr(settings, 'SSQ_MODEL_CACHE_BYTES', DEFAULT_CACHE_BYTES)
+
+    def __contains__(self, model_hash: str) -> bool:
+        return model_hash in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, model_hash: str):
+        with self._lock:
+            entry = self._entries.get(model_hash)
+            if entry is not None:
+                self._entries.move_to_end(model_hash)
+                self.hits += 1
+            return entry
+
+    def get(self, ssq_model):
+        """
+        获取已反序列化的模型对象
+        :param ssq_model: SsqModel 实例
+        :return: 模型对象
+        """
+        return self.get_entry(ssq_model).model
+
+    def get_entry(self, ssq_model) -> LoadedModel:
+        """
+        获取注册表条目，未命中时加载；停用的模型不进入缓存
+        :param ssq_model: SsqModel 实例
+        :return: LoadedModel
+        """
+        model_hash = ssq_model.model_hash
+        if not ssq_model.is_active:
+            # 其他进程停用模型后，本进程下次读取到最新状态时移除
+            self.evict(model_hash)
+            return self._load(ssq_model)
+
+        entry = self._lookup(model_hash)
+        if entry is not None:
+            return entry
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(model_hash, threading.Lock())
+        with load_lock:
+            # 等待期间其他线程可能已经加载完成
+            entry = self._lookup(model_hash)
+            if entry is not None:
+                return entry
+            entry = self._load(ssq_model)
+            self._put(entry)
+            # 条目发布后才移除加载锁，之后的请求直接命中缓存；
+            # 加载失败时保留，排队中的线程与新请求仍共用同一把锁依次重试，不会并发加载
+            with self._lock:
+                self._load_locks.pop(model_hash, None)
+        return entry
+
+    def _load(self, ssq_model) -> LoadedModel:
+        if not ssq_model.model_file:
+            raise ModelLoadError(f'模型 {ssq_model} 没有模型文件')
+        path = ssq_model.model_file.path
+        started = time.perf_counter()
+        model = load_model_file(path)
+        elapsed = time.perf_counter() - started
+        nbytes, mmapped = model_footprint(model, path)
+        with self._lock:
+            self.misses += 1
+        logger.info('加载模型 %s（%s），耗时 %.3fs', ssq_model, ssq_model.model_hash, elapsed)
+        return LoadedModel(
+            model_hash=ssq_model.model_hash,
+            model=model,
+            nbytes=nbytes,
+            mmap=mmapped,
+            load_seconds=elapsed,
+        )
+
+    def _put(self, entry: LoadedModel):
+        with self._lock:
+            old = self._entries.pop(entry.model_hash, None)
+            if old is not None:
+                self.total_bytes -= old.nbytes
+            self._entries[entry.model_hash] = entry
+            self.total_bytes += entry.nbytes
+            # 按 LRU 淘汰，刚加载的模型即使超出预算也保留
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def evict(self, model_hash: str) -> bool:
+        """
+        移除指定模型
+        :param model_hash: 模型文件Hash
+        :return: 是否存在并已移除
+        """
+        with self._lock:
+            entry = self._entries.pop(model_hash, None)
+            if entry is None:
+                return False
+            self.total_bytes -= entry.nbytes
+            return True
+
+    def clear(self):
+        """清空注册表"""
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self) -> dict:
+        """注册表统计信息"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'total_bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'models': [
+                    {
+                        'model_hash': entry.model_hash,
+                        'nbytes': entry.nbytes,
+                        'mmap': entry.mmap,
+                        'load_seconds': round(entry.load_seconds, 4),
+                    }
+                    for entry in self._entries.values()
+                ],
+            }
+
+
+# 进程级单例
+model_registry = ModelRegistry()
@@ -0,0 +1,49 @@
+import hashlib
+
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+# 与 SsqModel.model_hash 已有数据保持一致的摘要算法
+HASH_ALGORITHM = 'md5'
+
+# 上传分块大小：大块减少解析和系统调用次数
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class HashingFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    上传时边写临时文件边计算摘要，一次读写完成
+    - 摘要保存在上传文件的 content_hash 属性上，保存前即可校验重复
+    - 临时文件保存到 FileSystemStorage 时直接移动，不再复制
+    """
+    chunk_size = UPLOAD_CHUNK_SIZE
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.hasher = hashlib.new(HASH_ALGORITHM)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.content_hash = self.hasher.hexdigest()
+        return file
+
+
+def file_digest(file, chunk_size: int = UPLOAD_CHUNK_SIZE) -> str:
+    """
+    文件摘要：优先使用上传时已计算的 content_hash，否则分块读取计算一次
+    :param file: 上传文件或 FieldFile
+    :param chunk_size: 读取块大小
+    :return: 十六进制摘要
+    """
+    digest = getattr(file, 'content_hash', None) or getattr(getattr(file, 'file', None), 'content_hash', None)
+    if digest:
+        return digest
+    hasher = hashlib.new(HASH_ALGORITHM)
+    file.seek(0)
+    for chunk in file.chunks(chunk_size=chunk_size):
+        hasher.update(chunk)
+    file.seek(0)
+    return hasher.hexdigest()
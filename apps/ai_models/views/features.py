@@ -1,40 +1,49 @@
+import numpy as np
 from django.shortcuts import render, redirect, reverse, get_object_or_404
+from django.http import JsonResponse
 from django.conf import settings
 from django.contrib import messages
+from django.db import transaction
 
 from ai_models.forms.features import SsqFeatureSetForm
-from ssq.models import SsqDraw
 from ai_models.models import SsqFeatureSet
+from ai_models.tasks import generate_feature_set
+from ai_models.utils.feature_matrix import (
+    build_feature_matrix, count_samples, export_feature_columns, load_feature_matrix,
+)
 
-from utils.paginations import Bootstrap5Pagination
+from utils.counting import smart_count
+from utils.columnar import columnar_response
+from utils.paginations import Bootstrap5KeysetPagination
+from utils.streaming import EXPORT_FORMATS, parse_columns, streaming_export
 
 
 def features_list(request):
-    features_obj = SsqFeatureSet.objects.all().order_by('-created_at')
+    features_obj = SsqFeatureSet.objects.all()
 
-    all_count = features_obj.count()
+    # 总数按查询条件缓存，特征集增删后失效
+    all_count = smart_count(features_obj)
     base_url = request.path_info
-    current_page = request.GET.get('page', 1)
     query_params = request.GET.copy()
     per_page = settings.PAGE_SIZE
 
-    pager = Bootstrap5Pagination(
-        current_page=current_page,
-        all_count=all_count,
+    # created_at 可能重复，加 id 组成唯一排序键
+    pager = Bootstrap5KeysetPagination(
+        queryset=features_obj,
+        ordering=('-created_at', '-id'),
+        cursor=request.GET.get('cursor'),
         base_url=base_url,
         query_params=query_params,
         per_page=per_page,
-        pager_page_count=7,
+        all_count=all_count,
         show_info=True,
         size='sm',
         justify='center',
         aria_label='分页导航'
     )
 
-    # 获取最新一期
-
     context = {
-        'features': features_obj[pager.page_slice],
+        'features': pager.object_list,
         'pager': pager,
         'all_count': all_count,
         'per_page': per_page,
@@ -54,26 +63,18 @@ def features_create(request):
         if form.is_valid():
             f_obj = form.save(commit=False)
 
-            # 检查开奖记录
-            draws = SsqDraw.objects.filter(
-                period__gte=f_obj.period_start,
-                period__lte=f_obj.period_end
-            ).order_by('period')
-            if not draws:
-                raise ValueError(f'在期号范围 {f_obj.period_start}-{f_obj.period_end} 内没有找到开奖记录')
-
-            # 定义特征列和目标列
-            f_obj.feature_columns = [
-                'red_sum', 'red_span', 'red_ac_value', 'red_tail_sum','red_odd_count', 'red_even_count',
-                'red_prime_count','zone_1_count', 'zone_2_count', 'zone_3_count','weekday', 'month', 'quarter'
-            ]
-            f_obj.target_columns = ['next_red_sum', 'next_red_ac_value' 'next_red_odd_count', 'next_red_even_count',
-                                    'next_red_prime_count','next_blue_ball']
-            f_obj.sample_count = max(0, draws.count() - 1)
+            # 先做一次二分查找确认有样本，矩阵在后台任务中分块生成
+            if not count_samples(f_obj.period_start, f_obj.period_end):
+                messages.error(request, f'在期号范围 {f_obj.period_start}-{f_obj.period_end} 内没有足够的开奖记录')
+                return render(request, 'change.html', {'form': form})
+
+            f_obj.status = SsqFeatureSet.STATUS_PENDING
             f_obj.save()
+            # 事务提交后再投递，避免任务读不到特征集
+            transaction.on_commit(lambda: generate_feature_set.delay(f_obj.pk))
 
-            messages.success(request, '特征集生成成功！')
-            return redirect(reverse('ai_models:features_list'))
+            messages.success(request, '特征集已提交，正在后台生成！')
+            return redirect(reverse('ai_models:features_detail', args=[f_obj.pk]))
         else:
             error_msg = f"表单验证失败：{form.errors}"
             messages.error(request, f'表单验证错误！{error_msg}')
@@ -82,6 +83,31 @@ def features_create(request):
     return render(request, 'change.html', {'form': form})
 
 
+def features_regenerate(request, pk):
+    """
+    重新生成失败或一直等待中的特征集（POST），重置状态后重新投递后台任务
+    :param request:
+    :param pk:
+    :return:
+    """
+    feature_set = get_object_or_404(SsqFeatureSet.objects.only('pk', 'status'), pk=pk)
+    detail_url = reverse('ai_models:features_detail', args=[pk])
+    if request.method != 'POST':
+        return redirect(detail_url)
+
+    # 条件更新：并发请求或任务已开始执行时不会重复投递
+    updated = SsqFeatureSet.objects.filter(
+        pk=pk, status__in=(SsqFeatureSet.STATUS_FAILED, SsqFeatureSet.STATUS_PENDING)
+    ).update(status=SsqFeatureSet.STATUS_PENDING, progress=0, error_message='')
+    if not updated:
+        messages.error(request, f'特征集当前状态为「{feature_set.get_status_display()}」，无需重新生成')
+        return redirect(detail_url)
+
+    transaction.on_commit(lambda: generate_feature_set.delay(pk))
+    messages.success(request, '特征集已重新提交，正在后台生成！')
+    return redirect(detail_url)
+
+
 def features_delete(request, pk):
     """
     模型特征删除
@@ -109,47 +135,22 @@ def features_detail(request, pk):
 
     total_samples = feature_set.sample_count
 
-    # 获取相关双色球开奖记录
-    draws = SsqDraw.objects.filter(
-        period__gte=feature_set.period_start,
-        period__lte=feature_set.period_end
-    ).order_by('period')
-
-    # 生成记录
-    preview_data = []
-    if len(draws) >= 2:
-        for i in range(min(20, len(draws) - 1)):
-            current = draws[i]
-            next_draw = draws[i + 1]
-
-            features = {
-                'period': current.period,
-                'red_sum': current.red_sum,
-                'red_span': current.red_span,
-                'red_ac_value': current.red_ac_value,
-                'red_odd_count': current.red_odd_count,
-                'red_even_count': current.red_even_count,
-                'red_prime_count': current.red_prime_count,
-                'red_tail_sum': current.red_tail_sum,
-                'zone_1': current.red_zones[0] if current.red_zones else 0,
-                'zone_2': current.red_zones[1] if len(current.red_zones) > 1 else 0,
-                'zone_3': current.red_zones[2] if len(current.red_zones) > 2 else 0,
-            }
-
-            targets = {
-                'next_period': next_draw.period,
-                'next_red_sum': next_draw.red_sum,
-                'next_red_ac_value': next_draw.red_ac_value,
-                'next_red_odd_count': next_draw.red_odd_count,
-                'next_red_even_count': next_draw.red_even_count,
-                'next_red_prime_count': next_draw.red_even_count,
-                'next_blue_ball': next_draw.blue_ball,
-            }
-            preview_data.append({
-                'features': features,
-                'targets': targets,
-            })
-
+    # 优先内存映射读取已生成的矩阵文件，尚无文件（旧特征集或仍在生成）时只现场构造预览的行
+    matrix = load_feature_matrix(feature_set)
+    if matrix is None:
+        matrix = build_feature_matrix(feature_set.period_start, feature_set.period_end, limit=20)
+
+    # 生成记录：当期特征 + 下一期目标，最多预览20条（只读取前20行）
+    periods, next_periods, features, targets = matrix.rows(0, 20)
+    preview_data = [
+        {
+            'features': {'period': str(period), **dict(zip(matrix.feature_columns, feature_row))},
+            'targets': {'next_period': str(next_period), **dict(zip(matrix.target_columns, target_row))},
+        }
+        for period, next_period, feature_row, target_row in zip(
+            periods.tolist(), next_periods.tolist(), features.tolist(), targets.tolist()
+        )
+    ]
 
     context = {
         'feature_set': feature_set,
@@ -159,3 +160,72 @@ def features_detail(request, pk):
     return render(request, 'ai_models/features_detail.html', context)
 
 
+def features_status(request, pk):
+    """
+    特征集生成状态（JSON），供详情页轮询
+    :param request:
+    :param pk:
+    :return:
+    """
+    feature_set = get_object_or_404(
+        SsqFeatureSet.objects.only('pk', 'status', 'progress', 'sample_count', 'error_message'), pk=pk
+    )
+    return JsonResponse({
+        'id': feature_set.pk,
+        'status': feature_set.status,
+        'status_display': feature_set.get_status_display(),
+        'progress': feature_set.progress,
+        'sample_count': feature_set.sample_count,
+        'error_message': feature_set.error_message,
+        'finished': feature_set.status in (SsqFeatureSet.STATUS_SUCCESS, SsqFeatureSet.STATUS_FAILED),
+    })
+
+
+def features_export(request, pk):
+    """
+    特征集样本流式导出（CSV / NDJSON），从内存映射的矩阵文件分块读取
+    format=columnar 时导出全部列的列式二进制文件，用 utils.columnar.read_columnar 读取
+    参数：format=csv|ndjson|columnar，columns=逗号分隔列名，start/end=样本期号范围（含）
+    :param request:
+    :param pk:
+    :return:
+    """
+    feature_set = get_object_or_404(SsqFeatureSet, pk=pk)
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS and fmt != 'columnar':
+        return JsonResponse({'status': 'error', 'message': f'不支持的导出格式：{fmt}'}, status=400)
+
+    matrix = load_feature_matrix(feature_set)
+    if matrix is None:
+        return JsonResponse({'status': 'error', 'message': '特征矩阵尚未生成'}, status=409)
+    if fmt == 'columnar':
+        columns, meta = export_feature_columns(feature_set, matrix)
+        return columnar_response(columns, meta, filename=f'features_{feature_set.pk}_v{matrix.version}')
+
+    allowed = ['period', 'next_period', *matrix.feature_columns, *matrix.target_columns]
+    try:
+        columns = parse_columns(request.GET.get('columns'), allowed)
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    # 样本按期号升序，期号范围二分定位
+    lo, hi = 0, len(matrix)
+    try:
+        if request.GET.get('start'):
+            lo = int(np.searchsorted(matrix.periods, int(request.GET['start']), side='left'))
+        if request.GET.get('end'):
+            hi = int(np.searchsorted(matrix.periods, int(request.GET['end']), side='right'))
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': '期号必须是数字'}, status=400)
+
+    def _rows(chunk_size: int = 2000):
+        feature_index = {name: i for i, name in enumerate(matrix.feature_columns)}
+        target_index = {name: i for i, name in enumerate(matrix.target_columns)}
+        for start in range(lo, hi, chunk_size):
+            periods, next_periods, features, targets = matrix.rows(start, min(start + chunk_size, hi))
+            chunk = {'period': periods, 'next_period': next_periods}
+            chunk.update({name: features[:, i] for name, i in feature_index.items()})
+            chunk.update({name: targets[:, i] for name, i in target_index.items()})
+            yield from zip(*(chunk[name].tolist() for name in columns))
+
+    return streaming_export(columns, _rows(), fmt, filename=f'features_{feature_set.pk}_v{matrix.version}')
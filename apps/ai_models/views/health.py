@@ -0,0 +1,20 @@
+from django.http import JsonResponse
+
+from ai_models.utils.preload import is_ready, preload_enabled, preload_state
+from ai_models.utils.registry import model_registry
+
+
+def model_health(request):
+    """
+    模型健康检查：开启预热时，本进程预热完成前返回503，负载均衡据此判断是否接入流量
+    部分模型加载失败时状态为 degraded，仍返回200，失败的模型在后台重试
+    :param request:
+    :return:
+    """
+    ready = is_ready()
+    return JsonResponse({
+        'status': preload_state.status if preload_enabled() else 'ready',
+        'preload_enabled': preload_enabled(),
+        'preload': preload_state.to_dict(),
+        'registry': model_registry.stats(),
+    }, status=200 if ready else 503)
@@ -0,0 +1,97 @@
+import numpy as np
+from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from django.shortcuts import render, redirect, reverse, get_object_or_404
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+
+from ai_models.forms.models import SsqModelForm
+from ai_models.models import SsqModel
+from ai_models.utils.feature_matrix import load_feature_matrix
+from ai_models.utils.inference import InferenceError, predict
+from ai_models.utils.registry import ModelLoadError
+from ai_models.utils.upload import HashingFileUploadHandler
+
+# 单次预测接口最多返回的样本数
+PREDICT_MAX_ROWS = 5000
+
+
+@csrf_exempt
+@staff_member_required
+def model_create(request):
+    """
+    上传预测模型，仅管理员可用（模型文件加载时会反序列化）
+    上传处理器必须在读取 request.POST 之前替换，而 CSRF 中间件会提前读取 POST，所以外层免检、内层再做 CSRF 校验
+    :param request:
+    :return:
+    """
+    request.upload_handlers = [HashingFileUploadHandler(request)]
+    return _model_create(request)
+
+
+@csrf_protect
+def _model_create(request):
+    if request.method == 'POST':
+        form = SsqModelForm(request.POST, request.FILES)
+        if form.is_valid():
+            ssq_model = form.save()
+            messages.success(request, f'模型 {ssq_model} 上传成功！')
+            return redirect(reverse('ai_models:features_detail', args=[ssq_model.feature_set_id]))
+        else:
+            error_msg = f"表单验证失败：{form.errors}"
+            messages.error(request, f'表单验证错误！{error_msg}')
+    else:
+        form = SsqModelForm()
+    return render(request, 'change.html', {'form': form})
+
+
+@staff_member_required
+def model_predict(request, pk):
+    """
+    用模型（集成模型按权重合并各组件）批量预测关联特征集的样本，返回红球、蓝球概率（JSON）
+    会加载（反序列化）模型文件，仅管理员可访问
+    参数：start/end=样本期号范围（含），limit=最多样本数，默认最近20个
+    :param request:
+    :param pk:
+    :return:
+    """
+    ssq_model = get_object_or_404(SsqModel.objects.select_related('feature_set'), pk=pk)
+    matrix = load_feature_matrix(ssq_model.feature_set)
+    if matrix is None:
+        return JsonResponse({'status': 'error', 'message': '特征矩阵尚未生成'}, status=409)
+
+    try:
+        limit = int(request.GET.get('limit', 20))
+        lo, hi = 0, len(matrix)
+        if request.GET.get('start'):
+            lo = int(np.searchsorted(matrix.periods, int(request.GET['start']), side='left'))
+        if request.GET.get('end'):
+            hi = int(np.searchsorted(matrix.periods, int(request.GET['end']), side='right'))
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': '期号和数量必须是数字'}, status=400)
+    if limit < 1:
+        return JsonResponse({'status': 'error', 'message': '数量必须大于0'}, status=400)
+    limit = min(limit, PREDICT_MAX_ROWS)
+    if request.GET.get('start'):
+        hi = min(hi, lo + limit)
+    else:
+        # 未指定开始期号时取范围内最近的样本
+        lo = max(lo, hi - limit)
+
+    periods, next_periods, features, _ = matrix.rows(lo, max(lo, hi))
+    try:
+        prediction = predict(ssq_model, features)
+    except (InferenceError, ModelLoadError) as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=422)
+
+    return JsonResponse({
+        'status': 'success',
+        'model': str(ssq_model),
+        'components': prediction.components,
+        'periods': periods.tolist(),
+        'next_periods': next_periods.tolist(),
+        'red': np.round(prediction.red, 6).tolist(),
+        'blue': np.round(prediction.blue, 6).tolist(),
+        'top_red': prediction.top_red().tolist(),
+        'top_blue': prediction.top_blue().tolist(),
+    })
@@ -1,3 +1,21 @@
 from django.contrib import admin
 
-# Register your models here.
+from backsets.models import BacktestResult, BacktestRun
+
+
+@admin.register(BacktestRun)
+class BacktestRunAdmin(admin.ModelAdmin):
+    list_display = ['name', 'strategy', 'ssq_model', 'period_start', 'period_end', 'window', 'status',
+                    'period_count', 'avg_red_hits', 'blue_hit_count', 'prize_counts', 'elapsed_seconds', 'created_at']
+    list_filter = ['strategy', 'status']
+    search_fields = ['name']
+    readonly_fields = ['status', 'error_message', 'period_count', 'red_hit_total', 'avg_red_hits', 'blue_hit_count',
+                       'hit_distribution', 'prize_counts', 'elapsed_seconds', 'finished_at']
+
+
+@admin.register(BacktestResult)
+class BacktestResultAdmin(admin.ModelAdmin):
+    list_display = ['run', 'period', 'predicted_reds', 'predicted_blue', 'red_hits', 'blue_hit', 'prize_level']
+    list_filter = ['prize_level', 'blue_hit', 'red_hits']
+    search_fields = ['period']
+    list_select_related = ['run']
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_models.models import SsqModel
+from backsets.models import BacktestRun
+from backsets.utils.runner import run_backtest
+
+
+class Command(BaseCommand):
+    help = '逐期回测预测策略（热号、冷号、随机、预测模型），保存逐期命中和汇总结果'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--strategy', default=BacktestRun.STRATEGY_HOT,
+                            choices=[value for value, _ in BacktestRun.STRATEGY_CHOICES], help='预测策略')
+        parser.add_argument('--start', required=True, help='开始期号（含）')
+        parser.add_argument('--end', required=True, help='结束期号（含）')
+        parser.add_argument('--window', type=int, default=30, help='热号/冷号统计窗口（期）')
+        parser.add_argument('--seed', type=int, default=0, help='随机种子')
+        parser.add_argument('--model', type=int, help='预测模型ID（策略为 model 时必填）')
+        parser.add_argument('--workers', type=int, help='进程数，默认 SSQ_BACKTEST_WORKERS')
+        parser.add_argument('--name', help='回测名称')
+
+    def handle(self, *args, **options):
+        ssq_model = None
+        if options['model']:
+            ssq_model = SsqModel.objects.filter(pk=options['model']).first()
+            if ssq_model is None:
+                raise CommandError(f'预测模型不存在：{options["model"]}')
+        if options['window'] < 1:
+            raise CommandError('统计窗口必须大于0')
+
+        run = BacktestRun.objects.create(
+            name=options['name'] or f'{options["strategy"]} {options["start"]}-{options["end"]}',
+            strategy=options['strategy'],
+            ssq_model=ssq_model,
+            period_start=options['start'],
+            period_end=options['end'],
+            window=options['window'],
+            seed=options['seed'],
+        )
+        try:
+            run_backtest(run, workers=options['workers'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'回测完成：{run}，{run.period_count} 期，平均红球命中 {run.avg_red_hits}，'
+            f'蓝球命中 {run.blue_hit_count} 期，耗时 {run.elapsed_seconds:.3f}s'
+        ))
+        self.stdout.write(f'红球命中分布：{run.hit_distribution}')
+        self.stdout.write(f'中奖统计：{run.prize_counts}')
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('ai_models', '0003_ssqfeatureset_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BacktestRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(db_index=True, max_length=100, verbose_name='回测名称')),
+                ('strategy', models.CharField(choices=[('hot', '热号（窗口内出现最多）'), ('cold', '冷号（窗口内出现最少）'), ('random', '随机'), ('model', '预测模型')], db_index=True, max_length=20, verbose_name='预测策略')),
+                ('period_start', models.CharField(db_index=True, max_length=20, verbose_name='开始期号')),
+                ('period_end', models.CharField(db_index=True, max_length=20, verbose_name='结束期号')),
+                ('window', models.PositiveIntegerField(default=30, help_text='热号/冷号策略统计的历史期数', verbose_name='统计窗口（期）')),
+                ('seed', models.IntegerField(default=0, verbose_name='随机种子')),
+                ('status', models.CharField(choices=[('pending', '等待回测'), ('running', '回测中'), ('success', '已完成'), ('failed', '回测失败')], db_index=True, default='pending', max_length=20, verbose_name='回测状态')),
+                ('error_message', models.TextField(blank=True, default='', verbose_name='错误信息')),
+                ('period_count', models.IntegerField(default=0, verbose_name='回测期数')),
+                ('red_hit_total', models.IntegerField(default=0, verbose_name='红球命中总数')),
+                ('avg_red_hits', models.FloatField(default=0, verbose_name='平均红球命中')),
+                ('blue_hit_count', models.IntegerField(default=0, verbose_name='蓝球命中期数')),
+                ('hit_distribution', models.JSONField(blank=True, default=dict, help_text='命中个数 -> 期数', verbose_name='红球命中分布')),
+                ('prize_counts', models.JSONField(blank=True, default=dict, help_text='奖级 -> 期数，0 为未中奖', verbose_name='中奖统计')),
+                ('elapsed_seconds', models.FloatField(default=0, verbose_name='耗时（秒）')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='创建时间')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='完成时间')),
+                ('ssq_model', models.ForeignKey(blank=True, help_text='策略为预测模型时必填', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='backtests', to='ai_models.ssqmodel', verbose_name='预测模型')),
+            ],
+            options={
+                'verbose_name': '回测任务',
+                'verbose_name_plural': '回测任务',
+                'db_table': 'ssq_backtest_runs',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BacktestResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(max_length=20, verbose_name='期号')),
+                ('predicted_reds', models.JSONField(default=list, verbose_name='预测红球')),
+                ('predicted_blue', models.IntegerField(default=0, verbose_name='预测蓝球')),
+                ('red_hits', models.PositiveSmallIntegerField(default=0, verbose_name='红球命中数')),
+                ('blue_hit', models.BooleanField(default=False, verbose_name='蓝球命中')),
+                ('prize_level', models.PositiveSmallIntegerField(choices=[(0, '未中奖'), (1, '一等奖'), (2, '二等奖'), (3, '三等奖'), (4, '四等奖'), (5, '五等奖'), (6, '六等奖')], db_index=True, default=0, verbose_name='奖级')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='results', to='backsets.backtestrun', verbose_name='回测任务')),
+            ],
+            options={
+                'verbose_name': '回测结果',
+                'verbose_name_plural': '回测结果',
+                'db_table': 'ssq_backtest_results',
+                'ordering': ['run', 'period'],
+                'constraints': [models.UniqueConstraint(fields=('run', 'period'), name='unique_backtest_run_period')],
+            },
+        ),
+    ]
@@ -1,3 +1,93 @@
 from django.db import models
 
-# Create your models here.
+
+class BacktestRun(models.Model):
+    """一次回测：在期号范围内逐期用此前数据预测并对照开奖结果"""
+    STRATEGY_HOT = 'hot'
+    STRATEGY_COLD = 'cold'
+    STRATEGY_RANDOM = 'random'
+    STRATEGY_MODEL = 'model'
+    STRATEGY_CHOICES = [
+        (STRATEGY_HOT, '热号（窗口内出现最多）'),
+        (STRATEGY_COLD, '冷号（窗口内出现最少）'),
+        (STRATEGY_RANDOM, '随机'),
+        (STRATEGY_MODEL, '预测模型'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCESS = 'success'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, '等待回测'),
+        (STATUS_RUNNING, '回测中'),
+        (STATUS_SUCCESS, '已完成'),
+        (STATUS_FAILED, '回测失败'),
+    ]
+
+    name = models.CharField('回测名称', max_length=100, db_index=True)
+    strategy = models.CharField('预测策略', max_length=20, choices=STRATEGY_CHOICES, db_index=True)
+    ssq_model = models.ForeignKey('ai_models.SsqModel', on_delete=models.SET_NULL, null=True, blank=True,
+                                  related_name='backtests', verbose_name='预测模型',
+                                  help_text='策略为预测模型时必填')
+    period_start = models.CharField('开始期号', max_length=20, db_index=True)
+    period_end = models.CharField('结束期号', max_length=20, db_index=True)
+    window = models.PositiveIntegerField('统计窗口（期）', default=30, help_text='热号/冷号策略统计的历史期数')
+    seed = models.IntegerField('随机种子', default=0)
+
+    status = models.CharField('回测状态', max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    error_message = models.TextField('错误信息', blank=True, default='')
+
+    # 汇总结果
+    period_count = models.IntegerField('回测期数', default=0)
+    red_hit_total = models.IntegerField('红球命中总数', default=0)
+    avg_red_hits = models.FloatField('平均红球命中', default=0)
+    blue_hit_count = models.IntegerField('蓝球命中期数', default=0)
+    hit_distribution = models.JSONField('红球命中分布', default=dict, blank=True, help_text='命中个数 -> 期数')
+    prize_counts = models.JSONField('中奖统计', default=dict, blank=True, help_text='奖级 -> 期数，0 为未中奖')
+    elapsed_seconds = models.FloatField('耗时（秒）', default=0)
+
+    created_at = models.DateTimeField('创建时间', auto_now_add=True, db_index=True)
+    finished_at = models.DateTimeField('完成时间', null=True, blank=True)
+
+    class Meta:
+        db_table = 'ssq_backtest_runs'
+        verbose_name = '回测任务'
+        verbose_name_plural = verbose_name
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.name}（{self.get_strategy_display()} {self.period_start}-{self.period_end}）"
+
+
+class BacktestResult(models.Model):
+    """回测中单期的预测号码与命中情况"""
+    PRIZE_CHOICES = [
+        (0, '未中奖'),
+        (1, '一等奖'),
+        (2, '二等奖'),
+        (3, '三等奖'),
+        (4, '四等奖'),
+        (5, '五等奖'),
+        (6, '六等奖'),
+    ]
+
+    run = models.ForeignKey(BacktestRun, on_delete=models.CASCADE, related_name='results', verbose_name='回测任务')
+    period = models.CharField('期号', max_length=20)
+    predicted_reds = models.JSONField('预测红球', default=list)
+    predicted_blue = models.IntegerField('预测蓝球', default=0)
+    red_hits = models.PositiveSmallIntegerField('红球命中数', default=0)
+    blue_hit = models.BooleanField('蓝球命中', default=False)
+    prize_level = models.PositiveSmallIntegerField('奖级', choices=PRIZE_CHOICES, default=0, db_index=True)
+
+    class Meta:
+        db_table = 'ssq_backtest_results'
+        verbose_name = '回测结果'
+        verbose_name_plural = verbose_name
+        ordering = ['run', 'period']
+        constraints = [
+            models.UniqueConstraint(fields=['run', 'period'], name='unique_backtest_run_period'),
+        ]
+
+    def __str__(self):
+        return f"第{self.period}期: {self.predicted_reds} + [{self.predicted_blue}] 命中{self.red_hits}+{int(self.blue_hit)}"
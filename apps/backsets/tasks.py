@@ -0,0 +1,18 @@
+from celery import shared_task
+
+from backsets.models import BacktestRun
+from backsets.utils.runner import run_backtest
+
+
+@shared_task
+def run_backtest_task(run_id: int) -> int:
+    """
+    后台执行回测
+    :param run_id: BacktestRun 主键
+    :return: 回测期数
+    """
+    run = BacktestRun.objects.select_related('ssq_model').filter(pk=run_id).first()
+    if run is None:
+        # 任务执行前回测已被删除
+        return 0
+    return run_backtest(run).period_count
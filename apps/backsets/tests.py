@@ -1,3 +1,118 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.test import SimpleTestCase
+
+from backsets.utils import engine
+from backsets.utils.engine import (
+    PRIZE_TABLE, STRATEGY_COLD, STRATEGY_HOT, STRATEGY_RANDOM, evaluate, onehot_to_masks, red_onehot,
+    run_strategy, strategy_picks, summarize, window_counts,
+)
+
+
+def random_draws(count: int, seed: int = 1) -> tuple:
+    """随机开奖数据：(红球位掩码, 蓝球, 期号)"""
+    rng = np.random.default_rng(seed)
+    onehot = np.zeros((count, engine.RED_NUMBERS), dtype=bool)
+    reds = np.argsort(rng.random((count, engine.RED_NUMBERS)), axis=1)[:, :engine.PICK_COUNT]
+    np.put_along_axis(onehot, reds, True, axis=1)
+    blues = rng.integers(1, engine.BLUE_NUMBERS + 1, count).astype(np.uint8)
+    periods = np.arange(2003001, 2003001 + count, dtype=np.int64)
+    return onehot_to_masks(onehot), blues, periods
+
+
+def pick(*numbers) -> np.ndarray:
+    """号码 -> (33,) 布尔向量"""
+    row = np.zeros(engine.RED_NUMBERS, dtype=bool)
+    row[np.array(numbers) - 1] = True
+    return row
+
+
+class PrizeTableTests(SimpleTestCase):
+
+    def test_prize_table(self):
+        expected = {
+            (6, 1): 1, (6, 0): 2, (5, 1): 3, (5, 0): 4, (4, 1): 4, (4, 0): 5, (3, 1): 5,
+            (2, 1): 6, (1, 1): 6, (0, 1): 6,
+        }
+        for red_hits in range(engine.PICK_COUNT + 1):
+            for blue_hit in (0, 1):
+                self.assertEqual(PRIZE_TABLE[red_hits, blue_hit], expected.get((red_hits, blue_hit), 0),
+                                 (red_hits, blue_hit))
+
+    def test_evaluate(self):
+        actual = onehot_to_masks(np.array([pick(1, 2, 3, 4, 5, 6)] * 4))
+        red_pick = np.array([
+            pick(1, 2, 3, 4, 5, 6),
+            pick(1, 2, 3, 4, 5, 33),
+            pick(1, 2, 3, 31, 32, 33),
+            pick(28, 29, 30, 31, 32, 33),
+        ])
+        result = evaluate(red_pick, np.array([7, 8, 7, 7]), actual, np.array([7, 7, 8, 7]))
+
+        np.testing.assert_array_equal(result['red_hits'], [6, 5, 3, 0])
+        np.testing.assert_array_equal(result['blue_hit'], [True, False, False, True])
+        np.testing.assert_array_equal(result['prize'], [1, 4, 0, 6])
+        np.testing.assert_array_equal(red_onehot(result['red_mask']), red_pick)
+
+    def test_summarize(self):
+        result = evaluate(np.array([pick(1, 2, 3, 4, 5, 6)] * 2), np.array([1, 2]),
+                          onehot_to_masks(np.array([pick(1, 2, 3, 4, 5, 6), pick(1, 2, 3, 7, 8, 9)])),
+                          np.array([1, 1]))
+        summary = summarize(result)
+        self.assertEqual(summary['period_count'], 2)
+        self.assertEqual(summary['red_hit_total'], 9)
+        self.assertEqual(summary['blue_hit_count'], 1)
+        self.assertEqual(summary['prize_counts']['1'], 1)
+        self.assertEqual(summary['prize_counts']['0'], 1)
+
+
+class WindowLeakageTests(SimpleTestCase):
+    """选号只能使用待测期之前的数据"""
+
+    def setUp(self):
+        self.masks, self.blues, self.periods = random_draws(200)
+        self.targets = np.arange(30, 200)
+
+    def test_window_counts_excludes_target(self):
+        onehot = red_onehot(self.masks)
+        counts = window_counts(onehot, self.targets, 30)
+        expected = np.array([onehot[t - 30:t].sum(axis=0) for t in self.targets])
+        np.testing.assert_array_equal(counts, expected)
+
+    def test_picks_ignore_target_and_later_periods(self):
+        target = 120
+        changed_masks = self.masks.copy()
+        changed_blues = self.blues.copy()
+        changed_masks[target:] = onehot_to_masks(np.array([pick(1, 2, 3, 4, 5, 6)] * (200 - target)))
+        changed_blues[target:] = 16
+
+        for strategy in (STRATEGY_HOT, STRATEGY_COLD, STRATEGY_RANDOM):
+            before = strategy_picks(strategy, self.masks, self.blues, self.periods, [target], seed=7)
+            after = strategy_picks(strategy, changed_masks, changed_blues, self.periods, [target], seed=7)
+            np.testing.assert_array_equal(before[0], after[0], strategy)
+            np.testing.assert_array_equal(before[1], after[1], strategy)
+
+
+class RunStrategyTests(SimpleTestCase):
+
+    def setUp(self):
+        self.masks, self.blues, self.periods = random_draws(600)
+
+    def test_workers_match_single_process(self):
+        for strategy in (STRATEGY_HOT, STRATEGY_COLD, STRATEGY_RANDOM):
+            single = run_strategy(strategy, self.masks, self.blues, self.periods, 30, 600, seed=3, workers=1)
+            # 调低每块最少期数，570 期切分为 3 块在进程池中计算
+            with mock.patch.object(engine, 'MIN_CHUNK_PERIODS', 100):
+                chunked = run_strategy(strategy, self.masks, self.blues, self.periods, 30, 600, seed=3, workers=3)
+            self.assertEqual(single.keys(), chunked.keys())
+            for name in single:
+                np.testing.assert_array_equal(single[name], chunked[name], f'{strategy}: {name}')
+
+    def test_rejects_short_history(self):
+        with self.assertRaises(ValueError):
+            run_strategy(STRATEGY_HOT, self.masks, self.blues, self.periods, 10, 600, window=30, workers=1)
+
+    def test_rejects_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            run_strategy('model', self.masks, self.blues, self.periods, 30, 600, workers=1)
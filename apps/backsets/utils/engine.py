@@ -0,0 +1,226 @@
+"""
+回测计算内核：只依赖 NumPy，不访问数据库，可以在进程池的子进程中执行
+
+所有计算按期向量化：
+- 红球用 (N, 33) 布尔矩阵表示，窗口内出现次数 = 累计和之差，一次算出所有待测期
+- 随机策略的号码由 (种子, 期号, 号码) 哈希排序得到，与分块方式无关，结果可复现
+- 命中数 = 预测矩阵与开奖矩阵按位与后按行求和，奖级查表得到
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+RED_NUMBERS = 33
+BLUE_NUMBERS = 16
+PICK_COUNT = 6
+
+STRATEGY_HOT = 'hot'
+STRATEGY_COLD = 'cold'
+STRATEGY_RANDOM = 'random'
+# 只依赖开奖数据、可以在子进程中计算的策略
+VECTOR_STRATEGIES = (STRATEGY_HOT, STRATEGY_COLD, STRATEGY_RANDOM)
+# 需要历史窗口的策略
+WINDOW_STRATEGIES = (STRATEGY_HOT, STRATEGY_COLD)
+
+# 奖级表：PRIZE_TABLE[红球命中数, 蓝球是否命中]，0 为未中奖
+PRIZE_LEVELS = 6
+PRIZE_TABLE = np.zeros((PICK_COUNT + 1, 2), dtype=np.uint8)
+PRIZE_TABLE[6, 1] = 1
+PRIZE_TABLE[6, 0] = 2
+PRIZE_TABLE[5, 1] = 3
+PRIZE_TABLE[5, 0] = PRIZE_TABLE[4, 1] = 4
+PRIZE_TABLE[4, 0] = PRIZE_TABLE[3, 1] = 5
+PRIZE_TABLE[2, 1] = PRIZE_TABLE[1, 1] = PRIZE_TABLE[0, 1] = 6
+
+# 每个子进程至少处理的期数，期数太少时进程启动开销超过计算本身
+MIN_CHUNK_PERIODS = 1000
+
+_RED_SHIFTS = np.arange(RED_NUMBERS, dtype=np.uint64)
+
+
+def red_onehot(masks: np.ndarray) -> np.ndarray:
+    """红球位掩码 -> (N, 33) 布尔矩阵，第 n-1 列表示号码 n"""
+    masks = np.asarray(masks, dtype=np.uint64)
+    return ((masks[:, None] >> _RED_SHIFTS) & np.uint64(1)).astype(bool)
+
+
+def onehot_to_masks(onehot: np.ndarray) -> np.ndarray:
+    """(N, 33) 布尔矩阵 -> 红球位掩码"""
+    return (onehot.astype(np.uint64) << _RED_SHIFTS).sum(axis=1, dtype=np.uint64)
+
+
+def blue_onehot(blues: np.ndarray) -> np.ndarray:
+    """蓝球号码 -> (N, 16) 布尔矩阵"""
+    blues = np.asarray(blues, dtype=np.int64)
+    onehot = np.zeros((len(blues), BLUE_NUMBERS), dtype=bool)
+    valid = (blues >= 1) & (blues <= BLUE_NUMBERS)
+    onehot[np.flatnonzero(valid), blues[valid] - 1] = True
+    return onehot
+
+
+def window_counts(onehot: np.ndarray, targets: np.ndarray, window: int) -> np.ndarray:
+    """
+    每个待测期之前 window 期内各号码的出现次数（不含待测期本身）
+    :param onehot: (N, K) 布尔矩阵，按期号升序
+    :param targets: 待测期下标，要求 targets >= window
+    :param window: 窗口期数
+    :return: (len(targets), K) 出现次数
+    """
+    cumulative = np.zeros((len(onehot) + 1, onehot.shape[1]), dtype=np.int32)
+    np.cumsum(onehot, axis=0, out=cumulative[1:])
+    return cumulative[targets] - cumulative[targets - window]
+
+
+def top_numbers(scores: np.ndarray, count: int, largest: bool = True) -> np.ndarray:
+    """
+    每行得分最高（或最低）的 count 个号码下标，得分相同时号码小的优先
+    :return: (N, count) 列下标
+    """
+    order = np.argsort(-scores if largest else scores, axis=1, kind='stable')
+    return order[:, :count]
+
+
+def _splitmix64(values: np.ndarray) -> np.ndarray:
+    values = values + np.uint64(0x9E3779B97F4A7C15)
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def random_scores(seed: int, periods: np.ndarray, width: int, salt: int = 0) -> np.ndarray:
+    """
+    (种子, 期号, 号码) 的伪随机得分，同一期号得到的号码与分块、进程无关
+    :return: (len(periods), width) uint64 得分
+    """
+    with np.errstate(over='ignore'):
+        base = _splitmix64((np.uint64(seed & 0xFFFFFFFF) << np.uint64(32)) | np.asarray(periods, dtype=np.uint64))
+        numbers = np.arange(width, dtype=np.uint64) + np.uint64(salt * 64)
+        return _splitmix64(base[:, None] ^ _splitmix64(numbers)[None, :])
+
+
+def strategy_picks(strategy: str, masks: np.ndarray, blues: np.ndarray, periods: np.ndarray,
+                   targets: np.ndarray, window: int = 30, seed: int = 0) -> tuple:
+    """
+    按策略为每个待测期选号，只使用待测期之前的数据
+    :param strategy: hot / cold / random
+    :param masks: 红球位掩码，按期号升序
+    :param blues: 蓝球
+    :param periods: 期号
+    :param targets: 待测期下标
+    :param window: 热号/冷号统计窗口
+    :param seed: 随机种子
+    :return: (预测红球 (n, 33) 布尔矩阵, 预测蓝球 (n,))
+    """
+    targets = np.asarray(targets, dtype=np.int64)
+    if strategy in WINDOW_STRATEGIES:
+        largest = strategy == STRATEGY_HOT
+        red_scores = window_counts(red_onehot(masks), targets, window)
+        blue_scores = window_counts(blue_onehot(blues), targets, window)
+        red_index = top_numbers(red_scores, PICK_COUNT, largest)
+        blue_index = top_numbers(blue_scores, 1, largest)[:, 0]
+    elif strategy == STRATEGY_RANDOM:
+        target_periods = np.asarray(periods)[targets]
+        red_index = top_numbers(random_scores(seed, target_periods, RED_NUMBERS), PICK_COUNT, largest=False)
+        blue_index = top_numbers(random_scores(seed, target_periods, BLUE_NUMBERS, salt=1), 1, largest=False)[:, 0]
+    else:
+        raise ValueError(f'不支持的回测策略：{strategy}')
+
+    red_pick = np.zeros((len(targets), RED_NUMBERS), dtype=bool)
+    np.put_along_axis(red_pick, red_index, True, axis=1)
+    return red_pick, (blue_index + 1).astype(np.uint8)
+
+
+def evaluate(red_pick: np.ndarray, blue_pick: np.ndarray, actual_masks: np.ndarray, actual_blues: np.ndarray) -> dict:
+    """
+    对照开奖结果计算命中数和奖级
+    :param red_pick: (n, 33) 预测红球布尔矩阵
+    :param blue_pick: (n,) 预测蓝球
+    :param actual_masks: (n,) 开奖红球位掩码
+    :param actual_blues: (n,) 开奖蓝球
+    :return: {'red_mask', 'blue', 'red_hits', 'blue_hit', 'prize'}
+    """
+    red_hits = np.count_nonzero(red_pick & red_onehot(actual_masks), axis=1).astype(np.uint8)
+    blue_hit = np.asarray(blue_pick) == np.asarray(actual_blues)
+    return {
+        'red_mask': onehot_to_masks(red_pick),
+        'blue': np.asarray(blue_pick, dtype=np.uint8),
+        'red_hits': red_hits,
+        'blue_hit': blue_hit,
+        'prize': PRIZE_TABLE[red_hits, blue_hit.astype(np.int64)],
+    }
+
+
+def evaluate_range(strategy: str, masks: np.ndarray, blues: np.ndarray, periods: np.ndarray,
+                   lo: int, hi: int, window: int = 30, seed: int = 0) -> dict:
+    """
+    回测下标 [lo, hi) 内的各期，子进程的执行单元
+    :return: evaluate 的结果，另加 'index'（待测期下标）
+    """
+    targets = np.arange(lo, hi, dtype=np.int64)
+    red_pick, blue_pick = strategy_picks(strategy, masks, blues, periods, targets, window, seed)
+    result = evaluate(red_pick, blue_pick, masks[lo:hi], blues[lo:hi])
+    result['index'] = targets
+    return result
+
+
+def _evaluate_chunk(strategy, masks, blues, periods, offset, lo, hi, window, seed):
+    # 子进程只收到 [lo - window, hi) 这一段，下标换算回整体
+    result = evaluate_range(strategy, masks, blues, periods, lo - offset, hi - offset, window, seed)
+    result['index'] += offset
+    return result
+
+
+def concat_results(results: list) -> dict:
+    """按下标顺序合并多个分块结果"""
+    if len(results) == 1:
+        return results[0]
+    return {name: np.concatenate([result[name] for result in results]) for name in results[0]}
+
+
+def run_strategy(strategy: str, masks: np.ndarray, blues: np.ndarray, periods: np.ndarray,
+                 lo: int, hi: int, window: int = 30, seed: int = 0, workers: int = None) -> dict:
+    """
+    回测下标 [lo, hi)，期数足够多时按期号范围切分到进程池并行
+    :param workers: 进程数，None 表示 CPU 核数，1 表示在当前进程计算
+    :return: evaluate_range 的结果
+    """
+    if strategy not in VECTOR_STRATEGIES:
+        raise ValueError(f'不支持的回测策略：{strategy}')
+    if strategy in WINDOW_STRATEGIES and lo < window:
+        raise ValueError(f'开始下标 {lo} 之前不足 {window} 期历史数据')
+    workers = workers or os.cpu_count() or 1
+    chunks = max(1, min(workers, (hi - lo) // MIN_CHUNK_PERIODS))
+    if chunks == 1:
+        return evaluate_range(strategy, masks, blues, periods, lo, hi, window, seed)
+
+    bounds = np.linspace(lo, hi, chunks + 1).astype(np.int64).tolist()
+    history = window if strategy in WINDOW_STRATEGIES else 0
+    with ProcessPoolExecutor(max_workers=chunks) as executor:
+        futures = []
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            offset = start - history
+            futures.append(executor.submit(
+                _evaluate_chunk, strategy, masks[offset:stop], blues[offset:stop], periods[offset:stop],
+                offset, start, stop, window, seed,
+            ))
+        return concat_results([future.result() for future in futures])
+
+
+def summarize(result: dict) -> dict:
+    """
+    回测结果汇总
+    :return: {'period_count', 'red_hit_total', 'avg_red_hits', 'blue_hit_count', 'hit_distribution', 'prize_counts'}
+    """
+    count = len(result['red_hits'])
+    red_hit_total = int(result['red_hits'].sum(dtype=np.int64))
+    hits = np.bincount(result['red_hits'], minlength=PICK_COUNT + 1)
+    prizes = np.bincount(result['prize'], minlength=PRIZE_LEVELS + 1)
+    return {
+        'period_count': count,
+        'red_hit_total': red_hit_total,
+        'avg_red_hits': round(red_hit_total / count, 4) if count else 0,
+        'blue_hit_count': int(np.count_nonzero(result['blue_hit'])),
+        'hit_distribution': {str(i): int(n) for i, n in enumerate(hits)},
+        'prize_counts': {str(i): int(n) for i, n in enumerate(prizes)},
+    }
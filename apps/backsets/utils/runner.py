@@ -0,0 +1,125 @@
+import multiprocessing
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from backsets.models import BacktestResult, BacktestRun
+from backsets.utils.engine import WINDOW_STRATEGIES, evaluate, run_strategy, summarize
+from ssq.utils.features import masks_to_reds
+from ssq.utils.store import get_draw_store
+
+# 回测结果每批写入的行数
+RESULT_BATCH_SIZE = 1000
+
+
+def _target_range(run: BacktestRun) -> tuple:
+    """
+    回测期号范围对应的存储下标 [lo, hi)，保证每一期之前都有足够的历史数据
+    """
+    store = get_draw_store()
+    try:
+        rows = store.period_slice(run.period_start, run.period_end)
+    except ValueError:
+        raise ValueError('期号必须是数字')
+    if run.strategy in WINDOW_STRATEGIES:
+        history = run.window
+    elif run.strategy == BacktestRun.STRATEGY_MODEL:
+        # 模型用上一期的特征预测下一期
+        history = 1
+    else:
+        history = 0
+    lo = max(rows.start, history)
+    if lo >= rows.stop:
+        raise ValueError('期号范围内没有可回测的开奖记录（需要先有足够的历史数据）')
+    return lo, rows.stop
+
+
+def _model_picks(run: BacktestRun, periods: np.ndarray, lo: int, hi: int) -> tuple:
+    """
+    预测模型策略：用第 i-1 期特征批量预测第 i 期，每个组件模型整段只调用一次；
+    模型依赖本进程的模型注册表，不进入进程池
+    """
+    from ai_models.utils.feature_matrix import build_feature_matrix
+    from ai_models.utils.inference import predict
+
+    ssq_model = run.ssq_model
+    if ssq_model is None:
+        raise ValueError('预测模型策略必须选择模型')
+    if ssq_model.train_period_end.isdigit() and int(periods[lo]) <= int(ssq_model.train_period_end):
+        # 只能回测训练数据之后的期号，否则结果包含训练时见过的数据
+        raise ValueError(f'回测开始期号必须晚于模型训练结束期号 {ssq_model.train_period_end}')
+
+    matrix = build_feature_matrix(int(periods[lo - 1]), int(periods[hi - 1]))
+    prediction = predict(ssq_model, matrix.features)
+    red_pick = np.zeros((len(prediction), prediction.red.shape[1]), dtype=bool)
+    np.put_along_axis(red_pick, prediction.top_red() - 1, True, axis=1)
+    return red_pick, prediction.top_blue().astype(np.uint8)
+
+
+def _default_workers() -> int:
+    # Celery prefork 子进程是守护进程，不能再创建子进程
+    if multiprocessing.current_process().daemon:
+        return 1
+    return getattr(settings, 'SSQ_BACKTEST_WORKERS', None)
+
+
+def run_backtest(run: BacktestRun, workers: int = None) -> BacktestRun:
+    """
+    执行回测并保存逐期结果和汇总：逐期只使用该期之前的开奖数据选号，全部期一次向量化计算
+    :param run: 已保存的 BacktestRun
+    :param workers: 进程数，None 取 SSQ_BACKTEST_WORKERS（默认 CPU 核数）
+    :return: 更新后的 BacktestRun
+    """
+    queryset = BacktestRun.objects.filter(pk=run.pk)
+    queryset.update(status=BacktestRun.STATUS_RUNNING, error_message='')
+    started = time.perf_counter()
+    try:
+        store = get_draw_store()
+        periods = store.column('period')
+        masks = store.column('red_mask')
+        blues = store.column('blue_ball')
+        lo, hi = _target_range(run)
+
+        if run.strategy == BacktestRun.STRATEGY_MODEL:
+            red_pick, blue_pick = _model_picks(run, periods, lo, hi)
+            result = evaluate(red_pick, blue_pick, masks[lo:hi], blues[lo:hi])
+            result['index'] = np.arange(lo, hi)
+        else:
+            result = run_strategy(run.strategy, masks, blues, periods, lo, hi, run.window, run.seed,
+                                  workers=workers or _default_workers())
+
+        summary = summarize(result)
+        reds = masks_to_reds(result['red_mask']).tolist()
+        result_periods = periods[result['index']].tolist()
+        rows = [
+            BacktestResult(
+                run_id=run.pk,
+                period=str(period),
+                predicted_reds=predicted_reds,
+                predicted_blue=predicted_blue,
+                red_hits=red_hits,
+                blue_hit=blue_hit,
+                prize_level=prize_level,
+            )
+            for period, predicted_reds, predicted_blue, red_hits, blue_hit, prize_level in zip(
+                result_periods, reds, result['blue'].tolist(), result['red_hits'].tolist(),
+                result['blue_hit'].tolist(), result['prize'].tolist(),
+            )
+        ]
+        with transaction.atomic():
+            BacktestResult.objects.filter(run_id=run.pk).delete()
+            BacktestResult.objects.bulk_create(rows, batch_size=RESULT_BATCH_SIZE)
+            for name, value in summary.items():
+                setattr(run, name, value)
+            run.status = BacktestRun.STATUS_SUCCESS
+            run.error_message = ''
+            run.elapsed_seconds = round(time.perf_counter() - started, 4)
+            run.finished_at = timezone.now()
+            run.save()
+    except Exception as e:
+        queryset.update(status=BacktestRun.STATUS_FAILED, error_message=str(e), finished_at=timezone.now())
+        raise
+    return run
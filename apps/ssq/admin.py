@@ -1,3 +1,61 @@
-from django.contrib import admin
+import io
 
-# Register your models here.
+from django.contrib import admin, messages
+from django.shortcuts import redirect, render
+from django.urls import path, reverse
+
+from ssq.forms import SsqDrawImportForm
+from ssq.models import SsqDraw
+from ssq.utils.importer import SsqDrawImporter, guess_format
+
+
+@admin.register(SsqDraw)
+class SsqDrawAdmin(admin.ModelAdmin):
+    list_display = ['period', 'draw_date', 'red_balls', 'blue_ball', 'red_sum', 'red_ac_value', 'feature_group']
+    list_filter = ['feature_group']
+    search_fields = ['period']
+    date_hierarchy = 'draw_date'
+    change_list_template = 'admin/ssq/ssqdraw/change_list.html'
+
+    def get_urls(self):
+        urls = [
+            path('import/', self.admin_site.admin_view(self.import_view), name='ssq_ssqdraw_import'),
+        ]
+        return urls + super().get_urls()
+
+    def import_view(self, request):
+        """
+        批量导入开奖记录
+        :param request:
+        :return:
+        """
+        if request.method == 'POST':
+            form = SsqDrawImportForm(request.POST, request.FILES)
+            if form.is_valid():
+                upload = form.cleaned_data['file']
+                fmt = form.cleaned_data['format'] or guess_format(upload.name)
+                importer = SsqDrawImporter(batch_size=form.cleaned_data['batch_size'])
+                # 上传文件是二进制流，包装为文本流后逐行读取
+                stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+                try:
+                    result = importer.run(stream, fmt)
+                finally:
+                    stream.detach()
+
+                for error in result['errors']:
+                    messages.warning(request, error)
+                messages.success(
+                    request,
+                    f'导入完成：共 {result["total"]} 行，成功 {result["imported"]} 条，失败 {result["error_count"]} 条'
+                )
+                return redirect(reverse('admin:ssq_ssqdraw_changelist'))
+        else:
+            form = SsqDrawImportForm()
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': '批量导入开奖记录',
+            'form': form,
+        }
+        return render(request, 'admin/ssq/ssqdraw/import.html', context)
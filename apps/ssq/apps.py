@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class SsqConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ssq'
+
+    def ready(self):
+        # 注册信号，维护统计物化表
+        from ssq import signals  # noqa: F401
+        # 开奖记录写入后失效列表计数缓存
+        from ssq.models import SsqDraw
+        from utils.counting import track_counts
+        track_counts(SsqDraw)
+        # 注册部署检查：跨进程失效需要共享缓存
+        from ssq import checks  # noqa: F401
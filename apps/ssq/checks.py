@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# 只在本进程内可见的缓存后端
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    开奖存储、计数缓存的跨进程失效依赖共享缓存，进程内缓存下其他 Web/Celery 进程看不到变更
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        f'默认缓存 {backend} 只在本进程内可见，多进程部署时其他进程的开奖存储和计数缓存不会失效',
+        hint='在 local_settings.py 中将 CACHES["default"] 配置为 Redis、Memcached 等共享缓存',
+        id='ssq.W001',
+    )]
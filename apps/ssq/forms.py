@@ -1,5 +1,6 @@
 from django import forms
 from ssq.models import SsqDraw
+from ssq.utils.importer import IMPORT_FORMATS
 from utils.bootstrap5 import Bootstrap5FormMixin
 
 class SsqDrawForm(Bootstrap5FormMixin, forms.ModelForm):
@@ -62,4 +63,19 @@ class SsqDrawForm(Bootstrap5FormMixin, forms.ModelForm):
         blue_ball = self.cleaned_data['blue_ball']
         if not (self.Meta.model.BLUE_BALL_RANGE[0] <= blue_ball <= self.Meta.model.BLUE_BALL_RANGE[1]):
             raise forms.ValidationError(f'蓝球必须在{self.Meta.model.BLUE_BALL_RANGE}之间')
-        return blue_ball
\ No newline at end of file
+        return blue_ball
+
+class SsqDrawImportForm(Bootstrap5FormMixin, forms.Form):
+    """
+    双色球批量导入Form
+    """
+    file = forms.FileField(
+        label='数据文件',
+        help_text='CSV需包含 period,draw_date,red_balls,blue_ball 列；JSON Lines 每行一个对象',
+    )
+    format = forms.ChoiceField(
+        label='文件格式',
+        required=False,
+        choices=[('', '根据扩展名推断'), *IMPORT_FORMATS],
+    )
+    batch_size = forms.IntegerField(label='批大小', min_value=1, initial=1000)
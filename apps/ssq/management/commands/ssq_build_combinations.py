@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ssq.utils.combination_filter import build_filter_index, default_index_path
+from ssq.utils.combinations import COMBINATION_COUNT, build_combination_table, default_table_path
+
+
+class Command(BaseCommand):
+    help = f'生成全部 {COMBINATION_COUNT} 个红球组合及衍生特征的列式文件和过滤索引，各进程内存映射共享'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help='输出文件路径，默认 SSQ_COMBINATION_TABLE')
+
+    def handle(self, *args, **options):
+        path = options['path'] or default_table_path()
+        started = time.perf_counter()
+        try:
+            size = build_combination_table(path)
+        except OSError as e:
+            raise CommandError(f'无法写入文件：{e}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'组合表生成完成：{COMBINATION_COUNT} 个组合，{size} 字节，{path}，耗时 {time.perf_counter() - started:.3f}s'
+        ))
+
+        index_path = default_index_path(path)
+        started = time.perf_counter()
+        try:
+            size = build_filter_index(index_path, path)
+        except OSError as e:
+            raise CommandError(f'无法写入文件：{e}')
+        self.stdout.write(self.style.SUCCESS(
+            f'过滤索引生成完成：{size} 字节，{index_path}，耗时 {time.perf_counter() - started:.3f}s'
+        ))
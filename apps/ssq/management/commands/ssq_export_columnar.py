@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ssq.utils.store import export_draw_columns
+from utils.columnar import write_columnar
+
+
+class Command(BaseCommand):
+    help = '导出开奖记录列式二进制文件，可用 utils.columnar.read_columnar 零拷贝内存映射读取'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='输出文件路径')
+        parser.add_argument('--start', help='开始期号（含）')
+        parser.add_argument('--end', help='结束期号（含）')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            columns, meta = export_draw_columns(options['start'], options['end'])
+        except ValueError:
+            raise CommandError('期号必须是数字')
+
+        try:
+            size = write_columnar(options['path'], columns, meta)
+        except OSError as e:
+            raise CommandError(f'无法写入文件：{e}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'导出完成：{meta["row_count"]} 期，{size} 字节，耗时 {time.perf_counter() - started:.3f}s'
+        ))
@@ -0,0 +1,41 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ssq.utils.importer import IMPORT_FORMATS, SsqDrawImporter, guess_format
+
+
+class Command(BaseCommand):
+    help = '从 CSV / JSON Lines 文件流式导入双色球开奖记录（按期号覆盖已有记录）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='文件路径，- 表示标准输入')
+        parser.add_argument('--format', choices=[fmt for fmt, _ in IMPORT_FORMATS],
+                            help='文件格式，默认根据扩展名推断')
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批写库的记录数量')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or guess_format(path)
+        importer = SsqDrawImporter(batch_size=options['batch_size'])
+        started = time.perf_counter()
+
+        try:
+            if path == '-':
+                result = importer.run(sys.stdin, fmt)
+            else:
+                with open(path, encoding='utf-8-sig', newline='') as f:
+                    result = importer.run(f, fmt)
+        except OSError as e:
+            raise CommandError(f'无法读取文件：{e}')
+
+        for error in result['errors']:
+            self.stderr.write(error)
+        if result['error_count'] > len(result['errors']):
+            self.stderr.write(f'……其余 {result["error_count"] - len(result["errors"])} 条错误未显示')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'导入完成：共 {result["total"]} 行，成功 {result["imported"]} 条，'
+            f'失败 {result["error_count"]} 条，耗时 {time.perf_counter() - started:.3f}s'
+        ))
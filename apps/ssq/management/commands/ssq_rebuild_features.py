@@ -0,0 +1,60 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ssq.models import SsqDraw
+from ssq.utils.features import FEATURE_FIELDS, calculate_features, iter_feature_rows
+from ssq.utils.store import draw_store
+from utils.counting import invalidate_count
+
+
+class Command(BaseCommand):
+    help = '使用向量化特征引擎重算全部开奖记录的衍生字段，并分批写回数据库'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='每批 bulk_update 的记录数量')
+        parser.add_argument('--dry-run', action='store_true', help='只计算不写库')
+
+    def handle(self, *args, **options):
+        chunk_size = max(1, options['chunk_size'])
+        started = time.perf_counter()
+
+        # 只取主键、红球和现有特征值，避免实例化完整模型
+        rows = [
+            row for row in SsqDraw.objects.order_by('period').values_list('pk', 'red_balls', *FEATURE_FIELDS)
+            if isinstance(row[1], (list, tuple)) and len(row[1]) == SsqDraw.RED_BALL_COUNT
+        ]
+        if not rows:
+            self.stdout.write(self.style.WARNING('没有可计算的开奖记录'))
+            return
+
+        features = calculate_features(np.array([row[1] for row in rows]))
+        self.stdout.write(f'特征计算完成：{len(rows)} 条，耗时 {time.perf_counter() - started:.3f}s')
+
+        # 只写回发生变化的记录和字段，规则未变时不产生任何UPDATE
+        changed = []
+        changed_fields = set()
+        for row, values in zip(rows, iter_feature_rows(features)):
+            diff = [name for name, old in zip(FEATURE_FIELDS, row[2:]) if values[name] != old]
+            if diff:
+                changed.append(SsqDraw(pk=row[0], **values))
+                changed_fields.update(diff)
+
+        self.stdout.write(f'需要更新：{len(changed)} 条，字段：{sorted(changed_fields) or "无"}')
+        if options['dry_run'] or not changed:
+            return
+
+        fields = [name for name in FEATURE_FIELDS if name in changed_fields]
+        with transaction.atomic():
+            for start in range(0, len(changed), chunk_size):
+                SsqDraw.objects.bulk_update(changed[start:start + chunk_size], fields)
+            # bulk_update 不触发信号：与批量导入相同，事务提交后让计数缓存和各进程的开奖存储失效
+            # 衍生字段不影响遗漏、频次统计，不发送 draws_imported，避免无谓的整表重建
+            invalidate_count(SsqDraw)
+            draw_store.invalidate()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'写回完成：{len(changed)} 条，总耗时 {time.perf_counter() - started:.3f}s'
+        ))
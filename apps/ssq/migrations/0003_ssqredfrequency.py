@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ssq', '0002_alter_ssqdraw_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SsqRedFrequency',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(max_length=20, verbose_name='期号')),
+                ('window', models.PositiveSmallIntegerField(verbose_name='统计窗口')),
+                ('draw_count', models.PositiveSmallIntegerField(default=0, verbose_name='实际统计期数')),
+                ('counts', models.JSONField(default=list, help_text='33个红球的出现次数，下标0对应1号', verbose_name='出现次数')),
+                ('last_updated', models.DateTimeField(auto_now=True, verbose_name='最后更新时间')),
+            ],
+            options={
+                'verbose_name': '红球滚动频次',
+                'verbose_name_plural': '红球滚动频次',
+                'ordering': ['-period', 'window'],
+                'indexes': [models.Index(fields=['window', 'period'], name='ssq_ssqredf_window_163c61_idx')],
+                'constraints': [models.UniqueConstraint(fields=('period', 'window'), name='unique_frequency_period_window')],
+            },
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:44
+
+import numpy as np
+from django.db import migrations, models
+
+RED_MAX = 33
+BLUE_MAX = 16
+RED_BALL_COUNT = 6
+
+
+def _last_seen(one_hot):
+    """(n, size) 出现矩阵 -> 每期各号码最后出现的序号，未出现为0"""
+    ordinals = np.arange(1, one_hot.shape[0] + 1, dtype=np.int32)[:, None]
+    return np.maximum.accumulate(one_hot * ordinals, axis=0)
+
+
+def populate_omission(apps, schema_editor):
+    """
+    已有开奖数据时生成遗漏索引，否则详情页遗漏为空，直到执行 ssq_rebuild_stats
+    只使用历史模型和本迁移内的计算，与 ssq.utils.omission.rebuild_omission_index 结果一致
+    """
+    SsqDraw = apps.get_model('ssq', 'SsqDraw')
+    SsqOmission = apps.get_model('ssq', 'SsqOmission')
+    if not SsqDraw.objects.exists() or SsqOmission.objects.exists():
+        return
+
+    periods, reds, blues = [], [], []
+    for period, red_balls, blue_ball in SsqDraw.objects.order_by('period').values_list(
+            'period', 'red_balls', 'blue_ball'):
+        if isinstance(red_balls, (list, tuple)) and len(red_balls) == RED_BALL_COUNT:
+            periods.append(period)
+            reds.append(red_balls)
+            blues.append(blue_ball)
+    count = len(periods)
+    red_hot = np.zeros((count, RED_MAX), dtype=np.int32)
+    np.put_along_axis(red_hot, np.array(reds, dtype=np.intp).reshape(-1, RED_BALL_COUNT) - 1, 1, axis=1)
+    blues = np.array(blues, dtype=np.intp)
+    valid = (blues >= 1) & (blues <= BLUE_MAX)
+    blue_hot = np.zeros((count, BLUE_MAX), dtype=np.int32)
+    blue_hot[np.flatnonzero(valid), blues[valid] - 1] = 1
+
+    red_last = _last_seen(red_hot).tolist()
+    blue_last = _last_seen(blue_hot).tolist()
+    SsqOmission.objects.bulk_create([
+        SsqOmission(
+            period=period, ordinal=index + 1,
+            red_last_ordinal=red_last[index],
+            red_last_period=[periods[o - 1] if o else None for o in red_last[index]],
+            blue_last_ordinal=blue_last[index],
+            blue_last_period=[periods[o - 1] if o else None for o in blue_last[index]],
+        )
+        for index, period in enumerate(periods)
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ssq', '0003_ssqredfrequency'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SsqOmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(max_length=20, unique=True, verbose_name='期号')),
+                ('ordinal', models.PositiveIntegerField(db_index=True, help_text='按期号排序的第几期，从1开始', verbose_name='序号')),
+                ('red_last_ordinal', models.JSONField(default=list, verbose_name='红球最后出现序号')),
+                ('red_last_period', models.JSONField(default=list, verbose_name='红球最后出现期号')),
+                ('blue_last_ordinal', models.JSONField(default=list, verbose_name='蓝球最后出现序号')),
+                ('blue_last_period', models.JSONField(default=list, verbose_name='蓝球最后出现期号')),
+                ('last_updated', models.DateTimeField(auto_now=True, verbose_name='最后更新时间')),
+            ],
+            options={
+                'verbose_name': '号码遗漏索引',
+                'verbose_name_plural': '号码遗漏索引',
+                'ordering': ['-period'],
+            },
+        ),
+        migrations.RunPython(populate_omission, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:45
+
+from django.db import migrations, models
+
+
+def fill_red_mask(apps, schema_editor):
+    """为已有开奖记录回填红球位掩码"""
+    SsqDraw = apps.get_model('ssq', 'SsqDraw')
+    objs = []
+    for obj in SsqDraw.objects.only('pk', 'red_balls').iterator(chunk_size=2000):
+        if isinstance(obj.red_balls, list) and len(obj.red_balls) == 6:
+            obj.red_mask = sum(1 << (int(n) - 1) for n in set(obj.red_balls))
+            objs.append(obj)
+    SsqDraw.objects.bulk_update(objs, ['red_mask'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ssq', '0004_ssqomission'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ssqdraw',
+            name='red_mask',
+            field=models.BigIntegerField(default=0, help_text='第n-1位表示红球n是否出现', verbose_name='红球位掩码'),
+        ),
+        migrations.RunPython(fill_red_mask, migrations.RunPython.noop),
+    ]
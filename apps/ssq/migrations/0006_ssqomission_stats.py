@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ssq', '0005_ssqdraw_red_mask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ssqomission',
+            name='blue_appear_count',
+            field=models.JSONField(default=list, verbose_name='蓝球出现次数'),
+        ),
+        migrations.AddField(
+            model_name='ssqomission',
+            name='blue_max_omission',
+            field=models.JSONField(default=list, verbose_name='蓝球最大遗漏'),
+        ),
+        migrations.AddField(
+            model_name='ssqomission',
+            name='red_appear_count',
+            field=models.JSONField(default=list, verbose_name='红球出现次数'),
+        ),
+        migrations.AddField(
+            model_name='ssqomission',
+            name='red_max_omission',
+            field=models.JSONField(default=list, verbose_name='红球最大遗漏'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+import numpy as np
+from django.conf import settings
+from django.db import migrations
+
+RED_MAX = 33
+RED_BALL_COUNT = 6
+# 与 ssq.utils.frequency.DEFAULT_HOT_WINDOWS 一致（迁移中固定下来，不随代码变化）
+DEFAULT_HOT_WINDOWS = [10, 30, 50, 100]
+
+
+def populate_red_frequency(apps, schema_editor):
+    """
+    已有开奖数据时生成红球滚动频次表，否则热号统计为空，直到执行 ssq_rebuild_stats
+    只使用历史模型和本迁移内的计算，与 ssq.utils.frequency.rebuild_frequency_table 结果一致
+    """
+    SsqDraw = apps.get_model('ssq', 'SsqDraw')
+    SsqRedFrequency = apps.get_model('ssq', 'SsqRedFrequency')
+    if not SsqDraw.objects.exists() or SsqRedFrequency.objects.exists():
+        return
+
+    periods, reds = [], []
+    for period, red_balls in SsqDraw.objects.order_by('period').values_list('period', 'red_balls'):
+        if isinstance(red_balls, (list, tuple)) and len(red_balls) == RED_BALL_COUNT:
+            periods.append(period)
+            reds.append(red_balls)
+    reds = np.array(reds, dtype=np.intp).reshape(-1, RED_BALL_COUNT)
+
+    one_hot = np.zeros((len(periods), RED_MAX), dtype=np.int32)
+    np.put_along_axis(one_hot, reds - 1, 1, axis=1)
+    prefix = np.zeros((len(periods) + 1, RED_MAX), dtype=np.int32)
+    np.cumsum(one_hot, axis=0, out=prefix[1:])
+    ends = np.arange(1, len(periods) + 1)
+
+    objs = []
+    for window in sorted(set(getattr(settings, 'SSQ_HOT_WINDOWS', DEFAULT_HOT_WINDOWS))):
+        starts = np.maximum(ends - window, 0)
+        objs.extend(
+            SsqRedFrequency(period=period, window=window, draw_count=draw_count, counts=counts)
+            for period, draw_count, counts in zip(periods, (ends - starts).tolist(), (prefix[ends] - prefix[starts]).tolist())
+        )
+    SsqRedFrequency.objects.bulk_create(objs, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ssq', '0006_ssqomission_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_red_frequency, migrations.RunPython.noop),
+    ]
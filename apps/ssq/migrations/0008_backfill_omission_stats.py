@@ -0,0 +1,72 @@
+import numpy as np
+from django.db import migrations
+
+RED_MAX = 33
+BLUE_MAX = 16
+RED_BALL_COUNT = 6
+
+
+def _omission_stats(one_hot):
+    """(n, size) 出现矩阵 -> 每期各号码的最后出现序号、累计出现次数、历史最大遗漏"""
+    ordinals = np.arange(1, one_hot.shape[0] + 1, dtype=np.int32)[:, None]
+    last = np.maximum.accumulate(one_hot * ordinals, axis=0)
+    return {
+        'last_ordinal': last,
+        'appear_count': np.cumsum(one_hot, axis=0, dtype=np.int32),
+        'max_omission': np.maximum.accumulate(ordinals - last, axis=0),
+    }
+
+
+def backfill_omission_stats(apps, schema_editor):
+    """
+    0006 新增的出现次数、最大遗漏字段对已有快照为空，重建整张遗漏索引补齐
+    只使用历史模型和本迁移内的计算，与 ssq.utils.omission.rebuild_omission_index 结果一致
+    """
+    SsqDraw = apps.get_model('ssq', 'SsqDraw')
+    SsqOmission = apps.get_model('ssq', 'SsqOmission')
+    if not SsqDraw.objects.exists():
+        return
+    if SsqOmission.objects.exists() and not SsqOmission.objects.filter(red_appear_count=[]).exists():
+        return
+
+    periods, reds, blues = [], [], []
+    for period, red_balls, blue_ball in SsqDraw.objects.order_by('period').values_list(
+            'period', 'red_balls', 'blue_ball'):
+        if isinstance(red_balls, (list, tuple)) and len(red_balls) == RED_BALL_COUNT:
+            periods.append(period)
+            reds.append(red_balls)
+            blues.append(blue_ball)
+    count = len(periods)
+    red_hot = np.zeros((count, RED_MAX), dtype=np.int32)
+    np.put_along_axis(red_hot, np.array(reds, dtype=np.intp).reshape(-1, RED_BALL_COUNT) - 1, 1, axis=1)
+    blues = np.array(blues, dtype=np.intp)
+    valid = (blues >= 1) & (blues <= BLUE_MAX)
+    blue_hot = np.zeros((count, BLUE_MAX), dtype=np.int32)
+    blue_hot[np.flatnonzero(valid), blues[valid] - 1] = 1
+
+    stats = {}
+    for color, one_hot in (('red', red_hot), ('blue', blue_hot)):
+        for name, values in _omission_stats(one_hot).items():
+            stats[f'{color}_{name}'] = values.tolist()
+
+    SsqOmission.objects.all().delete()
+    SsqOmission.objects.bulk_create([
+        SsqOmission(
+            period=period, ordinal=index + 1,
+            red_last_period=[periods[o - 1] if o else None for o in stats['red_last_ordinal'][index]],
+            blue_last_period=[periods[o - 1] if o else None for o in stats['blue_last_ordinal'][index]],
+            **{name: values[index] for name, values in stats.items()},
+        )
+        for index, period in enumerate(periods)
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ssq', '0007_populate_red_frequency'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_omission_stats, migrations.RunPython.noop),
+    ]
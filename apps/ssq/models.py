@@ -18,6 +18,7 @@ class SsqDraw(models.Model):
     red_span = models.IntegerField('红球跨度', default=0)
     red_ac_value = models.IntegerField('红球AC值', default=0)
     red_tail_sum = models.IntegerField('红球尾数和', default=0)
+    red_mask = models.BigIntegerField('红球位掩码', default=0, help_text='第n-1位表示红球n是否出现')
 
     # 技术指标
     hot_numbers = models.JSONField(verbose_name='热号', default=list)
@@ -97,6 +98,9 @@ class SsqDraw(models.Model):
             # 尾数和
             self.red_tail_sum = sum(n % 10 for n in reds)
 
+            # 位掩码，用于相似度计算
+            self.red_mask = sum(1 << (n - 1) for n in set(reds))
+
             # AC值计算
             self.red_ac_value = self._calculate_ac_value(reds)
 
@@ -173,4 +177,51 @@ class SsqDraw(models.Model):
         if len(set(diffs)) == 1:  # 所有差值相同
             return True
         return False
-    
\ No newline at end of file
+    
+
+class SsqRedFrequency(models.Model):
+    """红球滚动频次（热号物化表）：截至某期（含）最近 window 期内每个红球的出现次数"""
+    period = models.CharField('期号', max_length=20)
+    window = models.PositiveSmallIntegerField('统计窗口')
+    draw_count = models.PositiveSmallIntegerField('实际统计期数', default=0)
+    counts = models.JSONField(verbose_name='出现次数', default=list, help_text='33个红球的出现次数，下标0对应1号')
+    last_updated = models.DateTimeField('最后更新时间', auto_now=True)
+
+    class Meta:
+        verbose_name = '红球滚动频次'
+        verbose_name_plural = verbose_name
+        ordering = ['-period', 'window']
+        indexes = [models.Index(fields=['window', 'period'])]
+        constraints = [models.UniqueConstraint(
+            fields=['period', 'window'],
+            name='unique_frequency_period_window')
+        ]
+
+    def __str__(self):
+        return f"第{self.period}期 近{self.window}期红球频次"
+
+
+class SsqOmission(models.Model):
+    """
+    号码遗漏索引：截至某期（含）每个红球、蓝球最后一次出现的序号和期号，序号0表示从未出现；
+    同时记录各号码的出现次数和最大遗漏，当前遗漏、平均遗漏由此推算
+    """
+    period = models.CharField('期号', max_length=20, unique=True)
+    ordinal = models.PositiveIntegerField('序号', db_index=True, help_text='按期号排序的第几期，从1开始')
+    red_last_ordinal = models.JSONField(verbose_name='红球最后出现序号', default=list)
+    red_last_period = models.JSONField(verbose_name='红球最后出现期号', default=list)
+    blue_last_ordinal = models.JSONField(verbose_name='蓝球最后出现序号', default=list)
+    blue_last_period = models.JSONField(verbose_name='蓝球最后出现期号', default=list)
+    red_appear_count = models.JSONField(verbose_name='红球出现次数', default=list)
+    red_max_omission = models.JSONField(verbose_name='红球最大遗漏', default=list)
+    blue_appear_count = models.JSONField(verbose_name='蓝球出现次数', default=list)
+    blue_max_omission = models.JSONField(verbose_name='蓝球最大遗漏', default=list)
+    last_updated = models.DateTimeField('最后更新时间', auto_now=True)
+
+    class Meta:
+        verbose_name = '号码遗漏索引'
+        verbose_name_plural = verbose_name
+        ordering = ['-period']
+
+    def __str__(self):
+        return f"第{self.period}期 号码遗漏索引"
@@ -0,0 +1,58 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from ssq.models import SsqDraw
+from ssq.utils.frequency import rebuild_frequency_table, update_frequency_for
+from ssq.utils.omission import rebuild_omission_index, update_omission_for
+from ssq.utils.store import draw_store
+from utils.counting import invalidate_count
+
+# 批量导入完成（bulk_create 不触发 post_save），参数：count
+draws_imported = Signal()
+
+
+def _rebuild_stats():
+    rebuild_frequency_table()
+    rebuild_omission_index()
+
+
+def schedule_rebuild():
+    """
+    在事务提交后重建统计表，同一事务内多次触发只执行一次
+    去重依据是连接上已登记的提交回调，事务回滚时回调随之丢弃，不留任何状态
+    """
+    connection = transaction.get_connection()
+    if any(entry[1] is _rebuild_stats for entry in connection.run_on_commit):
+        return
+    transaction.on_commit(_rebuild_stats)
+
+
+@receiver(post_save, sender=SsqDraw, dispatch_uid='ssq_draw_saved')
+def on_draw_saved(sender, instance, raw=False, **kwargs):
+    """开奖记录保存后增量维护统计表"""
+    if raw:
+        draw_store.invalidate()
+        return
+    # 事务提交后再追加，回滚时不会留下脏数据
+    transaction.on_commit(lambda: draw_store.append(instance))
+    if len(instance.red_balls or []) != SsqDraw.RED_BALL_COUNT:
+        return
+    # 插入或修改历史期时后续各期都受影响，改为事务提交后整表重建
+    if not update_frequency_for(instance) or not update_omission_for(instance):
+        schedule_rebuild()
+
+
+@receiver(post_delete, sender=SsqDraw, dispatch_uid='ssq_draw_deleted')
+def on_draw_deleted(sender, instance, **kwargs):
+    """删除开奖记录后，后续各期统计都会变化，直接重建"""
+    draw_store.invalidate()
+    schedule_rebuild()
+
+
+@receiver(draws_imported, dispatch_uid='ssq_draws_imported')
+def on_draws_imported(sender, **kwargs):
+    """批量导入后重建统计表"""
+    invalidate_count(SsqDraw)
+    draw_store.invalidate()
+    schedule_rebuild()
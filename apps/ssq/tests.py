@@ -1,3 +1,1026 @@
-from django.test import TestCase
+import csv
+import datetime
+import functools
+import itertools
+import json
+import os
+import shutil
+import tempfile
+from collections import Counter
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.template import engines
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import resolve, reverse
+
+from ssq.models import SsqDraw, SsqOmission, SsqRedFrequency
+from ssq.signals import draws_imported
+from ssq.utils.blue import BlueBallIndex, get_blue_stats
+from ssq.utils.combination_filter import (
+    bitmap_count, bitmap_iter, bitmap_select, get_filter_index, parse_query,
+)
+from ssq.utils.combinations import get_combination_table, rank
+from ssq.utils.cooccurrence import TRIPLES, CooccurrenceIndex, get_cooccurrence
+from ssq.utils.features import FEATURE_FIELDS, FEATURE_GROUPS, calculate_features, iter_feature_rows
+from ssq.utils.frequency import get_hot_numbers, hot_windows, rebuild_frequency_table
+from ssq.utils.importer import SsqDrawImporter
+from ssq.utils.omission import get_cold_numbers, omission_matrix, omission_snapshot, rebuild_omission_index
+from ssq.utils.similarity import find_similar_draws
+from ssq.utils.store import draw_store
+from utils.columnar import read_columnar, write_columnar
+from utils.counting import invalidate_count, smart_count
+from utils.middleware import RequestProfilingMiddleware, get_request_stats, request_stats, reset_request_stats
+from utils.paginations import Bootstrap5KeysetPagination, Bootstrap5Pagination
+from utils.streaming import safe_filename, streaming_export
+
+
+def random_reds(count: int, seed: int = 1) -> np.ndarray:
+    """随机生成 count 注不重复的红球，(count, 6)"""
+    rng = np.random.default_rng(seed)
+    keys = rng.random((count, SsqDraw.RED_BALL_RANGE[1]))
+    return np.sort(np.argsort(keys, axis=1)[:, :SsqDraw.RED_BALL_COUNT] + 1, axis=1)
+
+
+def row_features(red_balls) -> dict:
+    """逐行规则：SsqDraw._calculate_features 计算的衍生字段"""
+    draw = SsqDraw(red_balls=red_balls)
+    draw._calculate_features()
+    return {name: getattr(draw, name) for name in FEATURE_FIELDS}
+
+
+class FeatureEngineTests(SimpleTestCase):
+    """向量化特征引擎与模型逐行计算结果一致"""
+
+    def assertMatchesModel(self, reds):
+        for red_balls, values in zip(reds.tolist(), iter_feature_rows(calculate_features(reds))):
+            self.assertEqual(values, row_features(red_balls), red_balls)
+
+    def test_matches_model_on_synthetic_rows(self):
+        self.assertMatchesModel(random_reds(100000))
+
+    def test_matches_model_on_edge_cases(self):
+        reds = np.array([
+            [1, 3, 5, 7, 9, 11],        # 全奇数
+            [2, 4, 6, 8, 10, 12],       # 全偶数
+            [1, 2, 3, 4, 5, 6],         # 连号
+            [3, 8, 13, 18, 23, 28],     # 等差
+            [1, 2, 3, 31, 32, 33],      # 跨度最大
+            [5, 11, 12, 22, 23, 33],    # 三区边界
+        ])
+        self.assertMatchesModel(reds)
+
+    def test_unsorted_input(self):
+        reds = random_reds(100, seed=2)
+        shuffled = np.random.default_rng(3).permuted(reds, axis=1)
+        for name in FEATURE_FIELDS:
+            np.testing.assert_array_equal(calculate_features(shuffled)[name], calculate_features(reds)[name])
+
+
+class RebuildFeaturesCommandTests(TestCase):
+
+    def setUp(self):
+        draw_date = datetime.date(2024, 1, 2)
+        SsqDraw.objects.bulk_create([
+            SsqDraw(period=f'2024{i + 1:03d}', draw_date=draw_date + datetime.timedelta(days=i),
+                    red_balls=red_balls, blue_ball=i % 16 + 1)
+            for i, red_balls in enumerate(random_reds(50, seed=4).tolist())
+        ])
+        draw_store.invalidate()
+        self.addCleanup(draw_store.invalidate)
+
+    def test_rebuild_writes_model_features(self):
+        call_command('ssq_rebuild_features', chunk_size=7, stdout=StringIO())
+        for draw in SsqDraw.objects.all():
+            self.assertEqual({name: getattr(draw, name) for name in FEATURE_FIELDS}, row_features(draw.red_balls))
+
+    def test_dry_run_does_not_write(self):
+        call_command('ssq_rebuild_features', dry_run=True, stdout=StringIO())
+        self.assertFalse(SsqDraw.objects.exclude(red_sum=0).exists())
+
+    def test_unchanged_rules_write_nothing(self):
+        call_command('ssq_rebuild_features', stdout=StringIO())
+        out = StringIO()
+        call_command('ssq_rebuild_features', stdout=out)
+        self.assertIn('需要更新：0 条', out.getvalue())
+
+    def test_rebuild_invalidates_store_and_counts(self):
+        stale = draw_store.snapshot()
+        with mock.patch('ssq.management.commands.ssq_rebuild_features.invalidate_count') as invalidate, \
+                self.captureOnCommitCallbacks(execute=True):
+            call_command('ssq_rebuild_features', stdout=StringIO())
+        invalidate.assert_called_once_with(SsqDraw)
+        snapshot = draw_store.snapshot()
+        self.assertIsNot(snapshot, stale)
+        np.testing.assert_array_equal(
+            snapshot.column('red_sum'),
+            list(SsqDraw.objects.order_by('period').values_list('red_sum', flat=True)),
+        )
+
+
+class ImporterTests(TestCase):
+
+    CSV = (
+        'period,draw_date,red_balls,blue_ball\n'
+        '2024001,2024-01-02,"5 1 9 20 33 12",7\n'
+        '2024002,2024-01-04,"1,2,3,4,5,6",16\n'
+        '2024003,2024-01-07,"1 2 3 4 5",3\n'
+        '2024002,2024-01-04,"7 8 9 10 11 12",1\n'
+        '2024004,2024-01-09,"1 2 3 4 5 6",17\n'
+    )
+
+    def run_import(self, text: str, fmt: str = 'csv', **kwargs) -> dict:
+        with self.captureOnCommitCallbacks(execute=True):
+            return SsqDrawImporter(**kwargs).run(StringIO(text), fmt)
+
+    def test_import_validates_and_computes_features(self):
+        result = self.run_import(self.CSV, batch_size=1)
+        self.assertEqual((result['total'], result['imported'], result['error_count']), (5, 2, 3))
+        self.assertEqual([error.split('：')[0] for error in result['errors']], ['第4行', '第5行', '第6行'])
+
+        draw = SsqDraw.objects.get(period='2024001')
+        self.assertEqual((draw.red_balls, draw.blue_ball), ([1, 5, 9, 12, 20, 33], 7))
+        self.assertEqual({name: getattr(draw, name) for name in FEATURE_FIELDS}, row_features(draw.red_balls))
+
+    def test_upsert_overwrites_existing_period(self):
+        self.run_import(self.CSV)
+        result = self.run_import('{"period": "2024002", "draw_date": "2024-01-04", '
+                                 '"red_1": 10, "red_2": 11, "red_3": 12, "red_4": 13, "red_5": 14, "red_6": 15, '
+                                 '"blue_ball": 9}\n', fmt='jsonl')
+        self.assertEqual(result['imported'], 1)
+        self.assertEqual(SsqDraw.objects.count(), 2)
+        draw = SsqDraw.objects.get(period='2024002')
+        self.assertEqual((draw.red_balls, draw.blue_ball, draw.red_sum), ([10, 11, 12, 13, 14, 15], 9, 75))
+
+    def test_signal_rebuilds_stats_after_commit(self):
+        received = []
+        draws_imported.connect(lambda sender, **kwargs: received.append(kwargs['count']),
+                               weak=False, dispatch_uid='test_importer')
+        self.addCleanup(draws_imported.disconnect, dispatch_uid='test_importer')
+
+        self.run_import(self.CSV)
+        self.assertEqual(received, [2])
+        self.assertEqual(list(SsqOmission.objects.order_by('ordinal').values_list('period', flat=True)),
+                         ['2024001', '2024002'])
+        self.assertEqual(SsqRedFrequency.objects.filter(period='2024002').count(), len(hot_windows()))
+
+        # 没有成功导入的记录时不发送信号
+        self.run_import('period,draw_date,red_balls,blue_ball\n')
+        self.assertEqual(received, [2])
+
+
+class KeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        # 3 天各 7 期，draw_date 有重复，用于测试组合键
+        SsqDraw.objects.bulk_create([
+            SsqDraw(period=f'2024{i + 1:03d}', draw_date=datetime.date(2024, 1, 2 + i // 7),
+                    red_balls=[1, 2, 3, 4, 5, 6], blue_ball=1)
+            for i in range(21)
+        ])
+
+    def paginate(self, ordering, cursor=None, **kwargs) -> Bootstrap5KeysetPagination:
+        return Bootstrap5KeysetPagination(SsqDraw.objects.all(), ordering, cursor, '/ssq/', {'q': '1'},
+                                          per_page=5, **kwargs)
+
+    def walk(self, ordering) -> list:
+        """从第一页依次翻到最后一页，再依次翻回第一页"""
+        pages = [self.paginate(ordering)]
+        while pages[-1].next_cursor:
+            pages.append(self.paginate(ordering, pages[-1].next_cursor))
+        backward = [pages[-1]]
+        while backward[-1].previous_cursor:
+            backward.append(self.paginate(ordering, backward[-1].previous_cursor))
+        return pages, backward
+
+    def test_forward_and_backward_match_offset_pages(self):
+        for ordering in (('-period',), ('draw_date', '-id')):
+            expected = list(SsqDraw.objects.order_by(*ordering).values_list('pk', flat=True))
+            pages, backward = self.walk(ordering)
+            self.assertEqual([[draw.pk for draw in page.object_list] for page in pages],
+                             [expected[i:i + 5] for i in range(0, len(expected), 5)], ordering)
+            self.assertEqual([[draw.pk for draw in page.object_list] for page in reversed(backward[1:])],
+                             [[draw.pk for draw in page.object_list] for page in pages[:-1]], ordering)
+            self.assertFalse(pages[0].has_previous)
+            self.assertFalse(backward[-1].previous_cursor)
+
+    def test_each_page_is_one_query(self):
+        first = self.paginate(('-period',))
+        with self.assertNumQueries(1):
+            page = self.paginate(('-period',), first.next_cursor)
+        self.assertEqual([draw.period for draw in page.object_list], [f'2024{i:03d}' for i in range(16, 11, -1)])
+
+    def test_invalid_cursor_is_first_page(self):
+        first = [draw.pk for draw in self.paginate(('-period',)).object_list]
+        for cursor in ('garbage', 'e30', Bootstrap5KeysetPagination._encode_cursor(
+                self.paginate(('draw_date', '-id')), {'draw_date': 'x', 'id': 1}, 'next')):
+            page = self.paginate(('-period',), cursor)
+            self.assertEqual([draw.pk for draw in page.object_list], first, cursor)
+            self.assertIsNone(page.cursor)
+
+    def test_urls_keep_query_params(self):
+        page = self.paginate(('-period',), all_count=21)
+        data = page.to_dict()
+        self.assertEqual(data['first_url'], '/ssq/?q=1')
+        self.assertEqual(data['next_url'], f'/ssq/?q=1&cursor={page.next_cursor}')
+        self.assertIsNone(data['previous_url'])
+        self.assertIn('共 21 条记录', page.html)
+
+
+class LazyPaginationHtmlTests(SimpleTestCase):
+
+    def test_html_rendered_once_on_demand(self):
+        pager = Bootstrap5Pagination(3, 95, '/ssq/', {'q': 'a b', 'page': '9'}, per_page=10)
+        with mock.patch.object(Bootstrap5Pagination, 'generate_html', autospec=True,
+                               side_effect=Bootstrap5Pagination.generate_html) as generate:
+            self.assertEqual(pager.page_slice, slice(20, 30))
+            data = pager.to_dict()
+            generate.assert_not_called()
+
+            html = str(pager)
+            self.assertEqual(f'{pager}', html)
+            self.assertEqual(pager.html, html)
+            generate.assert_called_once()
+
+        self.assertEqual(data['next_url'], '/ssq/?q=a+b&page=4')
+        self.assertIn('href="/ssq/?q=a+b&page=10"', html)
+        self.assertEqual([page and page['page'] for page in data['pages']], list(range(1, 11)))
+
+
+class CountCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.draws = SsqDraw.objects.bulk_create([
+            SsqDraw(period=f'2024{i + 1:03d}', draw_date=datetime.date(2024, 1, 2),
+                    red_balls=[1, 2, 3, 4, 5, 6], blue_ball=i % 2 + 1)
+            for i in range(6)
+        ])
+
+    def test_count_cached_per_filter(self):
+        self.assertEqual(smart_count(SsqDraw.objects.all()), 6)
+        self.assertEqual(smart_count(SsqDraw.objects.filter(blue_ball=1)), 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(smart_count(SsqDraw.objects.all()), 6)
+            self.assertEqual(smart_count(SsqDraw.objects.filter(blue_ball=1)), 3)
+            self.assertEqual(smart_count(SsqDraw.objects.none()), 0)
+
+    def test_save_and_delete_invalidate_after_commit(self):
+        self.assertEqual(smart_count(SsqDraw.objects.filter(blue_ball=1)), 3)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            SsqDraw.objects.create(period='2024100', draw_date=datetime.date(2024, 2, 1),
+                                   red_balls=[1, 2, 3, 4, 5, 6], blue_ball=1)
+            self.draws[1].delete()
+            # 提交前仍是旧值
+            self.assertEqual(smart_count(SsqDraw.objects.filter(blue_ball=1)), 3)
+        # 同一事务内多次写入只登记一次失效回调
+        self.assertEqual(sum(isinstance(callback, functools.partial) for callback in callbacks), 1)
+        self.assertEqual(smart_count(SsqDraw.objects.filter(blue_ball=1)), 4)
+        self.assertEqual(smart_count(SsqDraw.objects.all()), 6)
+
+    def test_rollback_keeps_cached_count(self):
+        self.assertEqual(smart_count(SsqDraw.objects.all()), 6)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            invalidate_count(SsqDraw)
+        self.assertEqual(len(callbacks), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(smart_count(SsqDraw.objects.all()), 6)
+
+    @override_settings(PAGINATION_ESTIMATED_COUNT_MODELS=['ssq.SsqDraw'])
+    def test_estimate_falls_back_to_exact_count(self):
+        with mock.patch('utils.counting.estimated_count', return_value=500000) as estimate:
+            self.assertEqual(smart_count(SsqDraw.objects.all()), 500000)
+            self.assertEqual(smart_count(SsqDraw.objects.filter(blue_ball=2)), 3)
+        estimate.assert_called_once()
+        # 估算值低于阈值（或数据库不支持估算）时使用精确计数
+        cache.clear()
+        with mock.patch('utils.counting.estimated_count', return_value=10):
+            self.assertEqual(smart_count(SsqDraw.objects.all()), 6)
+
+
+class IncrementalStatsTestCase(TransactionTestCase):
+    """
+    逐条保存开奖记录，由信号增量维护统计表；与整表重建、暴力计算对比
+    统计表在事务提交后维护，使用真实提交的 TransactionTestCase
+    """
+
+    DRAW_COUNT = 40
+
+    def setUp(self):
+        # 清空数据库不触发信号，进程内开奖存储需要重新加载
+        draw_store.invalidate()
+        self.addCleanup(draw_store.invalidate)
+        self.reds = random_reds(self.DRAW_COUNT, seed=5).tolist()
+        self.blues = [(i * 5) % 16 + 1 for i in range(self.DRAW_COUNT)]
+        self.periods = [f'2024{i + 1:03d}' for i in range(self.DRAW_COUNT)]
+        for period, red_balls, blue_ball in zip(self.periods, self.reds, self.blues):
+            self.save_draw(period, red_balls, blue_ball)
+
+    def save_draw(self, period: str, red_balls: list, blue_ball: int):
+        SsqDraw.objects.create(period=period, draw_date=datetime.date(2024, 1, 1), red_balls=red_balls,
+                               blue_ball=blue_ball)
+
+    def change_history(self):
+        """插入、修改、删除历史期，均需整表重建"""
+        self.save_draw('2024000', [1, 2, 3, 4, 5, 6], 1)
+        with transaction.atomic():
+            draw = SsqDraw.objects.get(period='2024020')
+            draw.red_balls, draw.blue_ball = [28, 29, 30, 31, 32, 33], 16
+            draw.save()
+            SsqDraw.objects.get(period='2024021').delete()
+
+
+@override_settings(SSQ_HOT_WINDOWS=[3, 10])
+class RedFrequencyTests(IncrementalStatsTestCase):
+
+    def rows(self) -> list:
+        return list(SsqRedFrequency.objects.order_by('period', 'window').values_list(
+            'period', 'window', 'draw_count', 'counts'))
+
+    def test_incremental_matches_brute_force_and_rebuild(self):
+        incremental = self.rows()
+        expected = []
+        for index, period in enumerate(self.periods):
+            for window in (3, 10):
+                counts = [0] * 33
+                for red_balls in self.reds[max(0, index + 1 - window):index + 1]:
+                    for number in red_balls:
+                        counts[number - 1] += 1
+                expected.append((period, window, min(index + 1, window), counts))
+        self.assertEqual(incremental, expected)
+
+        rebuild_frequency_table()
+        self.assertEqual(self.rows(), incremental)
+
+    def test_history_change_rebuilds(self):
+        self.change_history()
+        after_signals = self.rows()
+        rebuild_frequency_table()
+        self.assertEqual(after_signals, self.rows())
+        self.assertEqual(after_signals[0], ('2024000', 3, 1, [1] * 6 + [0] * 27))
+
+    def test_hot_numbers_use_previous_period(self):
+        hot = get_hot_numbers('2024011', window=10, top=33)
+        counts = np.zeros(33, dtype=int)
+        for red_balls in self.reds[:10]:
+            counts[np.array(red_balls) - 1] += 1
+        self.assertEqual(hot['draw_count'], 10)
+        expected = sorted((n for n in range(1, 34) if counts[n - 1]), key=lambda n: (-counts[n - 1], n))
+        self.assertEqual([item['number'] for item in hot['hot_numbers_info']], expected)
+        self.assertEqual(hot['hot_numbers'], sorted(expected))
+
+
+def brute_force_omission(numbers: list, size: int) -> dict:
+    """逐期逐号码暴力计算：最后出现序号、出现次数、最大遗漏、当前遗漏（序号从1开始）"""
+    last, count, max_omission = [0] * size, [0] * size, [0] * size
+    result = {'last_ordinal': [], 'appear_count': [], 'max_omission': [], 'omission': []}
+    for ordinal, drawn in enumerate(numbers, start=1):
+        for number in drawn:
+            last[number - 1] = ordinal
+            count[number - 1] += 1
+        omission = [ordinal - value for value in last]
+        max_omission = [max(a, b) for a, b in zip(max_omission, omission)]
+        for name, values in (('last_ordinal', last), ('appear_count', count),
+                             ('max_omission', max_omission), ('omission', omission)):
+            result[name].append(list(values))
+    return result
+
+
+class OmissionIndexTests(IncrementalStatsTestCase):
+
+    FIELDS = ('period', 'ordinal', 'red_last_ordinal', 'red_last_period', 'blue_last_ordinal', 'blue_last_period')
+
+    def rows(self) -> list:
+        return list(SsqOmission.objects.order_by('period').values_list(*self.FIELDS))
+
+    def test_incremental_matches_brute_force_and_rebuild(self):
+        incremental = self.rows()
+        red = brute_force_omission(self.reds, 33)['last_ordinal']
+        blue = brute_force_omission([[blue] for blue in self.blues], 16)['last_ordinal']
+        to_period = lambda ordinals: [self.periods[o - 1] if o else None for o in ordinals]
+        self.assertEqual(incremental, [
+            (period, index + 1, red[index], to_period(red[index]), blue[index], to_period(blue[index]))
+            for index, period in enumerate(self.periods)
+        ])
+
+        rebuild_omission_index()
+        self.assertEqual(self.rows(), incremental)
+
+    def test_cold_numbers(self):
+        cold = get_cold_numbers('2024041', recent=5, top=33)
+        last = brute_force_omission(self.reds, 33)['last_ordinal'][-1]
+        missing = {number: 41 - last[number - 1] for number in range(1, 34)}
+        expected = sorted((n for n in missing if missing[n] > 5), key=lambda n: (-missing[n], n))
+        self.assertEqual([item['number'] for item in cold], expected)
+        for item in cold:
+            self.assertEqual(item['missing_periods'], missing[item['number']])
+            self.assertEqual(item['last_appear'], self.periods[last[item['number'] - 1] - 1]
+                             if last[item['number'] - 1] else '从未出现')
+        self.assertEqual(get_cold_numbers('2024001'), [])
+
+
+class OmissionStatsTests(IncrementalStatsTestCase):
+
+    FIELDS = ('period', 'ordinal', 'red_last_ordinal', 'red_appear_count', 'red_max_omission',
+              'blue_last_ordinal', 'blue_appear_count', 'blue_max_omission', 'red_last_period', 'blue_last_period')
+
+    def rows(self) -> list:
+        return list(SsqOmission.objects.order_by('period').values_list(*self.FIELDS))
+
+    def test_stats_match_brute_force(self):
+        # 蓝球缺失（0）的一期不计入蓝球统计
+        self.save_draw('2024041', [1, 2, 3, 4, 5, 6], 0)
+        blues = [[blue] for blue in self.blues] + [[]]
+        red = brute_force_omission(self.reds + [[1, 2, 3, 4, 5, 6]], 33)
+        blue = brute_force_omission(blues, 16)
+        for index, row in enumerate(self.rows()):
+            self.assertEqual(row[2:8], (
+                red['last_ordinal'][index], red['appear_count'][index], red['max_omission'][index],
+                blue['last_ordinal'][index], blue['appear_count'][index], blue['max_omission'][index],
+            ), row[0])
+
+        snapshot = omission_snapshot(SsqOmission.objects.get(period='2024041'))
+        self.assertEqual(snapshot['red']['current'], red['omission'][-1])
+        self.assertEqual(snapshot['blue']['current'], blue['omission'][-1])
+        self.assertEqual(sum(snapshot['blue']['count']), 40)
+
+    def test_history_change_rebuilds(self):
+        self.change_history()
+        after_signals = self.rows()
+        rebuild_omission_index()
+        self.assertEqual(after_signals, self.rows())
+        self.assertEqual(len(after_signals), self.DRAW_COUNT)
+        self.assertEqual(after_signals[0][:2], ('2024000', 1))
+
+    def test_stale_index_falls_back_to_rebuild(self):
+        # 旧版本索引没有出现次数和最大遗漏时，新开奖触发整表重建
+        SsqOmission.objects.update(red_appear_count=[], red_max_omission=[])
+        self.save_draw('2024041', [1, 2, 3, 4, 5, 6], 1)
+        after_signals = self.rows()
+        rebuild_omission_index()
+        self.assertEqual(after_signals, self.rows())
+
+    def test_omission_matrix(self):
+        matrix = omission_matrix(end='2024030', limit=10)
+        red = brute_force_omission(self.reds[:30], 33)['omission']
+        blue = brute_force_omission([[blue] for blue in self.blues[:30]], 16)['omission']
+        self.assertEqual(matrix['periods'].tolist(), [int(period) for period in self.periods[20:30]])
+        np.testing.assert_array_equal(matrix['red'], red[20:])
+        np.testing.assert_array_equal(matrix['blue'], blue[20:])
+
+
+class CombinationTableTestCase(SimpleTestCase):
+    """在临时目录生成一次组合表和过滤索引"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        tmpdir = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+        overridden = override_settings(SSQ_COMBINATION_TABLE=os.path.join(tmpdir, 'red_combinations.ssqcol'))
+        overridden.enable()
+        cls.addClassCleanup(overridden.disable)
+        call_command('ssq_build_combinations', stdout=StringIO())
+        cls.table = get_combination_table()
+
+
+class CombinationTableTests(CombinationTableTestCase):
+
+    def test_lexicographic_order_and_rank(self):
+        reds = self.table.red_balls()
+        self.assertEqual(len(self.table), 1107568)
+        self.assertEqual(reds[0].tolist(), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(reds[-1].tolist(), [28, 29, 30, 31, 32, 33])
+        # 字典序严格递增：相邻两行第一个不同的号码递增
+        diff = reds[1:].astype(np.int16) - reds[:-1]
+        first = diff[np.arange(len(diff)), (diff != 0).argmax(axis=1)]
+        self.assertTrue((first > 0).all())
+        np.testing.assert_array_equal(rank(reds), np.arange(len(self.table)))
+        self.assertEqual(self.table.index_of([33, 1, 2, 3, 4, 5]).tolist(), [rank([1, 2, 3, 4, 5, 33])[0]])
+        for invalid in ([1, 1, 2, 3, 4, 5], [0, 1, 2, 3, 4, 5], [1, 2, 3, 4, 5, 34]):
+            with self.assertRaises(ValueError):
+                rank(invalid)
+
+    def test_features_match_model(self):
+        indices = np.random.default_rng(6).choice(len(self.table), 3000, replace=False)
+        rows = self.table.rows(indices)
+        for i, red_balls in enumerate(rows['red_balls'].tolist()):
+            expected = row_features(red_balls)
+            actual = {name: int(rows[name][i]) for name in (
+                'red_sum', 'red_span', 'red_ac_value', 'red_odd_count', 'red_prime_count', 'red_tail_sum')}
+            actual['red_zones'] = [int(rows[f'zone_{zone}_count'][i]) for zone in (1, 2, 3)]
+            actual['red_mask'] = int(rows['red_mask'][i])
+            actual['feature_group'] = FEATURE_GROUPS[rows['feature_group'][i]]
+            self.assertEqual(actual, {name: expected[name] for name in actual}, red_balls)
+
+    def test_columns_are_read_only(self):
+        with self.assertRaises(ValueError):
+            self.table.column('red_sum')[0] = 0
+
+
+class CombinationFilterTests(CombinationTableTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.index = get_filter_index()
+        cls.columns = cls.table.rows(slice(None))
+
+    def brute_force(self, query, recent_draws=()) -> np.ndarray:
+        """直接在组合表各列上逐条件比较"""
+        columns = self.columns
+        selected = np.ones(len(self.table), dtype=bool)
+        for name, value_range in (('red_sum', query.sum_range), ('red_span', query.span_range),
+                                  ('red_tail_sum', query.tail_sum_range), ('red_ac_value', query.ac_range)):
+            if value_range is not None:
+                selected &= (columns[name] >= value_range[0]) & (columns[name] <= value_range[1])
+        for name, values in (('red_odd_count', query.odd_counts), ('red_prime_count', query.prime_counts)):
+            if values is not None:
+                selected &= np.isin(columns[name], values)
+        if query.zone_ratios is not None:
+            zones = np.stack([columns[f'zone_{zone}_count'] for zone in (1, 2, 3)], axis=1)
+            selected &= (zones[:, None, :] == np.array(query.zone_ratios)).all(axis=2).any(axis=1)
+        if query.feature_groups is not None:
+            selected &= np.isin(FEATURE_GROUPS[columns['feature_group']], query.feature_groups)
+        reds = columns['red_balls']
+        for number in query.include:
+            selected &= (reds == number).any(axis=1)
+        for number in query.exclude:
+            selected &= ~(reds == number).any(axis=1)
+        for draw in recent_draws:
+            selected &= np.isin(reds, draw).sum(axis=1) <= query.max_overlap
+        return np.flatnonzero(selected)
+
+    def assertMatchesBruteForce(self, params: dict, recent_draws=()):
+        query = parse_query(params)
+        bitmap = self.index.evaluate(query, np.array(recent_draws) if len(recent_draws) else None)
+        expected = self.brute_force(query, recent_draws)
+        self.assertEqual(bitmap_count(bitmap), len(expected), params)
+        np.testing.assert_array_equal(np.concatenate(list(bitmap_iter(bitmap, words=1000)) or [[]]), expected,
+                                      str(params))
+        return bitmap, expected
+
+    def test_filters_match_brute_force(self):
+        for params in (
+            {},
+            {'sum': '90-110'},
+            {'sum': '21', 'span': '5'},
+            {'span': '20-25', 'tail': '20-30', 'ac': '6-10'},
+            {'odd': '2,3', 'prime': '0,1'},
+            {'zones': '2:2:2,3:2:1', 'group': 'normal,random'},
+            {'include': '7,18', 'exclude': '1,2,33'},
+            {'sum': '300-400'},
+        ):
+            self.assertMatchesBruteForce(params)
+
+    def test_overlap_matches_brute_force(self):
+        recent = random_reds(5, seed=8)
+        for max_overlap in range(0, 7):
+            self.assertMatchesBruteForce({'max_overlap': str(max_overlap), 'recent': '5', 'odd': '3'}, recent)
+
+    def test_select_pages(self):
+        bitmap, expected = self.assertMatchesBruteForce({'sum': '100-102', 'include': '5'})
+        for offset, limit in ((0, 50), (63, 64), (len(expected) - 10, 50), (len(expected), 5)):
+            np.testing.assert_array_equal(bitmap_select(bitmap, offset, limit), expected[offset:offset + limit])
+
+    def test_invalid_params(self):
+        for params in ({'sum': '110-90'}, {'odd': 'a'}, {'zones': '3:3:1'}, {'group': 'unknown'},
+                       {'include': '34'}, {'include': '1', 'exclude': '1'}, {'include': '1,2,3,4,5,6,7'},
+                       {'max_overlap': '7'}):
+            with self.assertRaises(ValueError, msg=params):
+                parse_query(params)
+
+    def test_api(self):
+        _, expected = self.assertMatchesBruteForce({'sum': '60-62', 'odd': '0'})
+        response = self.client.get(reverse('ssq:ssq_combinations'),
+                                   {'sum': '60-62', 'odd': '0', 'per_page': 3, 'page': 2})
+        data = response.json()
+        self.assertEqual((data['count'], data['page']), (len(expected), 2))
+        self.assertEqual([row['index'] for row in data['results']], expected[3:6].tolist())
+        self.assertEqual(self.client.get(reverse('ssq:ssq_combinations'), {'sum': 'x'}).status_code, 400)
+
+
+class StreamingExportTests(TestCase):
+
+    DRAW_COUNT = 1200
+
+    def setUp(self):
+        draw_date = datetime.date(2024, 1, 2)
+        reds = random_reds(self.DRAW_COUNT, seed=9).tolist()
+        SsqDraw.objects.bulk_create([
+            SsqDraw(period=f'{2003001 + i}', draw_date=draw_date + datetime.timedelta(days=i),
+                    red_balls=red_balls, blue_ball=i % 16 + 1, red_sum=sum(red_balls))
+            for i, red_balls in enumerate(reds)
+        ])
+
+    def export(self, **params):
+        response = self.client.get(reverse('ssq:ssq_export'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        return response, chunks
+
+    def test_csv(self):
+        response, chunks = self.export(start='2003101', end='2003900', columns='period,red_balls,red_sum')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="ssq_2003101_2003900.csv"')
+        # 表头一块，其后每块最多 STREAM_BATCH_ROWS 行
+        self.assertEqual([chunk.count('\n') for chunk in chunks], [1, 500, 300])
+
+        rows = list(csv.reader(StringIO(''.join(chunks))))
+        expected = SsqDraw.objects.filter(period__range=('2003101', '2003900')).order_by('period')
+        self.assertEqual(rows[0], ['period', 'red_balls', 'red_sum'])
+        self.assertEqual(rows[1:], [
+            [draw.period, ' '.join(map(str, draw.red_balls)), str(draw.red_sum)] for draw in expected
+        ])
+
+    def test_ndjson(self):
+        response, chunks = self.export(format='ndjson', columns=' , ')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="ssq_first_latest.ndjson"')
+        rows = [json.loads(line) for line in ''.join(chunks).splitlines()]
+        self.assertEqual(len(rows), self.DRAW_COUNT)
+        first = SsqDraw.objects.order_by('period').first()
+        self.assertEqual(rows[0], {'period': first.period, 'draw_date': first.draw_date.isoformat(),
+                                   'red_balls': first.red_balls, 'blue_ball': first.blue_ball})
+
+    def test_invalid_params(self):
+        for params in ({'format': 'xml'}, {'columns': 'period,password'}):
+            response = self.client.get(reverse('ssq:ssq_export'), params)
+            self.assertEqual(response.status_code, 400, params)
+
+    def test_safe_filename(self):
+        self.assertEqual(safe_filename('ssq_2024"\r\nX-Injected: 1;.csv'), 'ssq_2024_X-Injected_1_.csv')
+        self.assertEqual(safe_filename('特征集 2024/01'), '_2024_01')
+        response, _ = self.export(start='2003001"; x=1', end='2003002')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="ssq_2003001_x_1_2003002.csv"')
+
+
+class ColumnarTests(TestCase):
+
+    def test_round_trip(self):
+        columns = {
+            'period': np.arange(2003001, 2003101, dtype=np.int64),
+            'red_balls': random_reds(100, seed=10).astype(np.uint8),
+            'ratio': np.linspace(0, 1, 100, dtype=np.float32),
+            'flag': np.arange(100) % 3 == 0,
+            'empty': np.empty((0, 4), dtype='<u2'),
+        }
+        meta = {'source': '测试', 'row_count': 100}
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+        path = os.path.join(tmpdir, 'data.ssqcol')
+        size = write_columnar(path, columns, meta)
+        self.assertEqual(os.path.getsize(path), size)
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        for source in (path, data):
+            loaded, loaded_meta = read_columnar(source)
+            self.assertEqual(loaded_meta, meta)
+            self.assertEqual(list(loaded), list(columns))
+            for name, array in columns.items():
+                self.assertEqual((loaded[name].dtype, loaded[name].shape), (array.dtype, array.shape), name)
+                np.testing.assert_array_equal(loaded[name], array, name)
+            self.assertFalse(loaded['period'].flags.writeable)
+        # 各列数据按 64 字节对齐
+        loaded, _ = read_columnar(path)
+        for name in ('period', 'red_balls', 'ratio', 'flag'):
+            self.assertEqual(loaded[name].ctypes.data % 64, 0, name)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            write_columnar(BytesIO(), {'names': np.array(['a', None], dtype=object)})
+        with self.assertRaises(ValueError):
+            read_columnar(b'NOTACOLUMNARFILE' + b'\0' * 64)
+
+    def test_draw_export(self):
+        reds = random_reds(30, seed=11).tolist()
+        SsqDraw.objects.bulk_create([
+            SsqDraw(period=f'{2003001 + i}', draw_date=datetime.date(2024, 1, 1), red_balls=red_balls,
+                    blue_ball=i % 16 + 1, **row)
+            for i, (red_balls, row) in enumerate(zip(reds, iter_feature_rows(calculate_features(np.array(reds)))))
+        ])
+        draw_store.invalidate()
+        self.addCleanup(draw_store.invalidate)
+
+        response = self.client.get(reverse('ssq:ssq_export'), {'format': 'columnar', 'start': '2003011'})
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="ssq_2003011_latest.ssqcol"')
+        columns, meta = read_columnar(response.content)
+        draws = list(SsqDraw.objects.filter(period__gte='2003011').order_by('period'))
+        self.assertEqual(meta['row_count'], 20)
+        self.assertEqual(columns['period'].tolist(), [int(draw.period) for draw in draws])
+        self.assertEqual(columns['red_balls'].tolist(), [draw.red_balls for draw in draws])
+        self.assertEqual(columns['blue_ball'].tolist(), [draw.blue_ball for draw in draws])
+        self.assertEqual(columns['red_sum'].tolist(), [draw.red_sum for draw in draws])
+        self.assertEqual(self.client.get(reverse('ssq:ssq_export'), {'format': 'columnar', 'end': 'x'}).status_code,
+                         400)
+
+
+def bulk_create_draws(reds: list, blues: list, first_period: int = 2003001):
+    """批量写入开奖记录（含衍生特征），不触发信号"""
+    features = iter_feature_rows(calculate_features(np.array(reds)))
+    SsqDraw.objects.bulk_create([
+        SsqDraw(period=str(first_period + i), draw_date=datetime.date(2024, 1, 1), red_balls=red_balls,
+                blue_ball=blue_ball, **values)
+        for i, (red_balls, blue_ball, values) in enumerate(zip(reds, blues, features))
+    ])
+
+
+class DrawIndexTestCase(TestCase):
+    """开奖存储上的进程内索引：先批量写入历史，再逐期保存新开奖验证增量同步"""
+
+    DRAW_COUNT = 80
+
+    def setUp(self):
+        rng = np.random.default_rng(13)
+        self.reds = random_reds(self.DRAW_COUNT + 5, seed=13).tolist()
+        self.blues = rng.integers(1, 17, self.DRAW_COUNT + 5).tolist()
+        bulk_create_draws(self.reds[:self.DRAW_COUNT], self.blues[:self.DRAW_COUNT])
+        draw_store.invalidate()
+        self.addCleanup(draw_store.invalidate)
+
+    def append_draws(self):
+        """逐期保存最后5期，事务提交后开奖存储原地追加"""
+        for i in range(self.DRAW_COUNT, self.DRAW_COUNT + 5):
+            with self.captureOnCommitCallbacks(execute=True):
+                SsqDraw.objects.create(period=str(2003001 + i), draw_date=datetime.date(2024, 1, 1),
+                                       red_balls=self.reds[i], blue_ball=self.blues[i])
+
+
+class DrawStoreTests(DrawIndexTestCase):
+
+    def assertMatchesDatabase(self, snapshot):
+        draws = list(SsqDraw.objects.order_by('period'))
+        self.assertEqual(len(snapshot), len(draws))
+        self.assertEqual(snapshot.column('period').tolist(), [int(d.period) for d in draws])
+        self.assertEqual(snapshot.column('pk').tolist(), [d.pk for d in draws])
+        self.assertEqual(snapshot.red_balls().tolist(), [sorted(d.red_balls) for d in draws])
+        self.assertEqual(snapshot.column('blue_ball').tolist(), [d.blue_ball for d in draws])
+        self.assertEqual(snapshot.draw_dates(), [d.draw_date for d in draws])
+
+    def test_load_matches_database(self):
+        self.assertMatchesDatabase(draw_store.snapshot())
+
+    def test_append_keeps_old_snapshot(self):
+        before = draw_store.snapshot()
+        self.append_draws()
+        after = draw_store.snapshot()
+
+        self.assertEqual(len(before), self.DRAW_COUNT)
+        self.assertEqual(before.column('period')[-1], 2003000 + self.DRAW_COUNT)
+        self.assertEqual(after.generation, before.generation)
+        self.assertGreater(after.version, before.version)
+        self.assertMatchesDatabase(after)
+        with self.assertRaises(ValueError):
+            after.column('blue_ball')[0] = 0
+
+    def test_out_of_order_change_reloads(self):
+        before = draw_store.snapshot()
+        draw = SsqDraw.objects.get(period='2003010')
+        draw.blue_ball = 16 if draw.blue_ball != 16 else 1
+        with self.captureOnCommitCallbacks(execute=True):
+            draw.save()
+        SsqDraw.objects.filter(period='2003020').delete()
+
+        after = draw_store.snapshot()
+        self.assertGreater(after.generation, before.generation)
+        self.assertEqual(len(before), self.DRAW_COUNT)
+        self.assertMatchesDatabase(after)
+
+
+class SimilarityTests(DrawIndexTestCase):
+
+    def brute_force(self, target, k: int, threshold: int) -> list:
+        matches = []
+        for draw in SsqDraw.objects.filter(period__lt=target.period).order_by('-period'):
+            common = len(set(draw.red_balls) & set(target.red_balls))
+            if common >= threshold:
+                matches.append((draw.period, common))
+        return sorted(matches, key=lambda m: -m[1])[:k]
+
+    def test_matches_brute_force(self):
+        self.append_draws()
+        for period in ('2003040', '2003085'):
+            target = SsqDraw.objects.get(period=period)
+            for k, threshold in ((5, 2), (10, 1), (3, 0)):
+                found = find_similar_draws(target, k=k, threshold=threshold)
+                self.assertEqual([(d['period'], d['common_count']) for d in found],
+                                 self.brute_force(target, k, threshold), (period, k, threshold))
+
+    def test_details_from_store(self):
+        target = SsqDraw.objects.get(period='2003080')
+        found = find_similar_draws(target, k=3, threshold=0)
+        for item in found:
+            draw = SsqDraw.objects.get(pk=item['pk'])
+            self.assertEqual((item['period'], item['red_balls'], item['blue_ball'], item['draw_date']),
+                             (draw.period, sorted(draw.red_balls), draw.blue_ball, draw.draw_date))
+
+    def test_full_history_skips_self(self):
+        target = SsqDraw.objects.get(period='2003001')
+        self.assertEqual(find_similar_draws(target, threshold=0), [])
+        found = find_similar_draws(target, k=200, threshold=0, history_only=False)
+        self.assertEqual(len(found), self.DRAW_COUNT - 1)
+        self.assertNotIn(target.period, [item['period'] for item in found])
+
+
+class CooccurrenceTests(DrawIndexTestCase):
+
+    def brute_force(self, lo: int, hi: int) -> tuple:
+        matrix = np.zeros((33, 33), dtype=int)
+        triples = Counter()
+        for red_balls in self.reds[lo:hi]:
+            for a in red_balls:
+                for b in red_balls:
+                    matrix[a - 1, b - 1] += 1
+            triples.update(itertools.combinations(red_balls, 3))
+        return matrix, triples
+
+    def assertMatchesBruteForce(self, snapshot, hi: int):
+        for window, end in ((None, None), (20, None), (1, None), (30, str(2003001 + hi - 11)), (500, '2003010')):
+            end_index = hi if end is None else int(end) - 2003001 + 1
+            lo = 0 if window is None else max(0, end_index - window)
+            matrix, triples = self.brute_force(lo, end_index)
+            np.testing.assert_array_equal(snapshot.pair_matrix(window, end), matrix, str((window, end)))
+
+            counts = snapshot.triple_counts(window, end)
+            self.assertEqual(counts.sum(), 20 * (end_index - lo))
+            self.assertEqual({tuple(TRIPLES[i].tolist()): int(counts[i]) for i in np.flatnonzero(counts)},
+                             dict(triples))
+
+            partners = snapshot.top_partners(7, window, top=32, end=end)
+            self.assertEqual([item['count'] for item in partners],
+                             sorted((matrix[6, n] for n in range(33) if n != 6), reverse=True))
+            top = snapshot.top_triples(number=7, window=window, top=5, end=end)
+            self.assertEqual([item['count'] for item in top],
+                             sorted((c for t, c in triples.items() if 7 in t), reverse=True)[:5])
+
+    def test_matches_brute_force(self):
+        self.assertMatchesBruteForce(get_cooccurrence(), self.DRAW_COUNT)
+
+    def test_incremental_snapshots(self):
+        old = get_cooccurrence()
+        old_matrix, old_totals = old.pair_matrix(), old.triple_totals.copy()
+        self.append_draws()
+
+        new = get_cooccurrence()
+        self.assertEqual((len(old), len(new)), (self.DRAW_COUNT, self.DRAW_COUNT + 5))
+        self.assertEqual(new.generation, old.generation)
+        self.assertMatchesBruteForce(new, self.DRAW_COUNT + 5)
+        # 增量同步与重新构建一致，旧快照不变且只读
+        rebuilt = CooccurrenceIndex().snapshot()
+        np.testing.assert_array_equal(new.pair_matrix(), rebuilt.pair_matrix())
+        np.testing.assert_array_equal(new.triple_totals, rebuilt.triple_totals)
+        np.testing.assert_array_equal(old.pair_matrix(), old_matrix)
+        np.testing.assert_array_equal(old.triple_totals, old_totals)
+        with self.assertRaises(ValueError):
+            old.triple_totals[0] = 1
+
+
+class BlueBallStatsTests(DrawIndexTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # 第10期蓝球缺失（默认值0），不计入任何统计
+        SsqDraw.objects.filter(period='2003010').update(blue_ball=0)
+        self.blues[9] = 0
+        draw_store.invalidate()
+
+    def brute_force(self, lo: int, hi: int) -> dict:
+        blues = self.blues[:hi]
+        counts = np.zeros(16, dtype=int)
+        transitions = np.zeros((16, 16), dtype=int)
+        for t in range(lo, hi):
+            if 1 <= blues[t] <= 16:
+                counts[blues[t] - 1] += 1
+                if t > lo and 1 <= blues[t - 1] <= 16:
+                    transitions[blues[t - 1] - 1, blues[t] - 1] += 1
+        omission = [next((hi - 1 - t for t in range(hi - 1, -1, -1) if blues[t] == n), hi) for n in range(1, 17)]
+        return {'counts': counts, 'transitions': transitions, 'omission': omission}
+
+    def assertMatchesBruteForce(self, stats, hi: int):
+        for window, end in ((None, None), (20, None), (1, None), (30, str(2003001 + hi - 11)), (500, '2003012')):
+            end_index = hi if end is None else int(end) - 2003001 + 1
+            lo = 0 if window is None else max(0, end_index - window)
+            expected = self.brute_force(lo, end_index)
+            np.testing.assert_array_equal(stats.frequency(window, end), expected['counts'], str((window, end)))
+            np.testing.assert_array_equal(stats.transition_matrix(window, end), expected['transitions'],
+                                          str((window, end)))
+            np.testing.assert_array_equal(stats.omission(end), expected['omission'], str(end))
+            distribution = stats.distribution(window, end)
+            self.assertEqual(distribution['odd'], expected['counts'][0::2].sum())
+            self.assertEqual(distribution['small'], expected['counts'][:8].sum())
+            self.assertEqual(distribution['odd'] + distribution['even'], expected['counts'].sum())
+
+        gaps = [
+            t - next((s for s in range(t - 1, -1, -1) if self.blues[s] == self.blues[t]), -1) - 1
+            if 1 <= self.blues[t] <= 16 else -1
+            for t in range(hi)
+        ]
+        self.assertEqual(stats.gaps().tolist(), gaps)
+
+    def test_matches_brute_force(self):
+        stats = get_blue_stats()
+        self.assertMatchesBruteForce(stats, self.DRAW_COUNT)
+
+        summary = stats.summary(end='2003010')
+        self.assertEqual((summary['blue_ball'], summary['next_after']), (0, []))
+        last = self.blues[self.DRAW_COUNT - 1]
+        row = self.brute_force(self.DRAW_COUNT - 30, self.DRAW_COUNT)['transitions'][last - 1]
+        expected = sorted((n for n in range(1, 17) if row[n - 1]), key=lambda n: (-row[n - 1], n))[:5]
+        summary = stats.summary(window=30)
+        self.assertEqual(summary['blue_ball'], last)
+        self.assertEqual([(item['number'], item['count']) for item in summary['next_after']],
+                         [(n, row[n - 1]) for n in expected])
+        self.assertEqual([item['count'] for item in summary['numbers']],
+                         self.brute_force(self.DRAW_COUNT - 30, self.DRAW_COUNT)['counts'].tolist())
+
+    def test_incremental_snapshots(self):
+        old = get_blue_stats()
+        old_frequency, old_gaps = old.frequency(), old.gaps().copy()
+        self.append_draws()
+
+        new = get_blue_stats()
+        self.assertEqual((len(old), len(new), new.generation), (self.DRAW_COUNT, self.DRAW_COUNT + 5, old.generation))
+        self.assertMatchesBruteForce(new, self.DRAW_COUNT + 5)
+        # 增量同步与重新构建一致，旧快照不变且只读
+        rebuilt = BlueBallIndex().snapshot()
+        np.testing.assert_array_equal(new.transition_matrix(), rebuilt.transition_matrix())
+        np.testing.assert_array_equal(new.gaps(), rebuilt.gaps())
+        np.testing.assert_array_equal(new.omission(), rebuilt.omission())
+        np.testing.assert_array_equal(old.frequency(), old_frequency)
+        np.testing.assert_array_equal(old.gaps(), old_gaps)
+        with self.assertRaises(ValueError):
+            old.gaps()[0] = 1
+
+
+@override_settings(SSQ_REQUEST_PROFILING=True, SSQ_PROFILING_SLOW_QUERIES=2)
+class RequestProfilingTests(TestCase):
+
+    def setUp(self):
+        reset_request_stats()
+        self.addCleanup(reset_request_stats)
+        bulk_create_draws(random_reds(30, seed=14).tolist(), [1] * 30)
+        self.factory = RequestFactory()
+
+    def get(self, get_response, path: str = '/ssq/export/'):
+        request = self.factory.get(path)
+        request.resolver_match = resolve(path)
+        return RequestProfilingMiddleware(get_response)(request)
+
+    def test_regular_response(self):
+        def view(request):
+            for period in ('2003001', '2003002', '2003003'):
+                SsqDraw.objects.filter(period=period).exists()
+            return HttpResponse(engines['django'].from_string('{{ value }}').render({'value': 1}))
+
+        response = self.get(view)
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="3 queries", tpl;dur=[\d.]+')
+        stats = get_request_stats()['ssq:ssq_export']
+        self.assertEqual((stats['requests'], stats['max_queries'], len(stats['slow_queries'])), (1, 3, 2))
+        self.assertGreater(stats['avg_template_ms'], 0)
+
+    def test_streaming_response(self):
+        def view(request):
+            rows = SsqDraw.objects.order_by('period').values_list('period', 'red_balls').iterator(chunk_size=10)
+            return streaming_export(['period', 'red_balls'], rows, 'csv', filename='ssq')
+
+        response = self.get(view)
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(get_request_stats(), {})
+
+        lines = 0
+        for chunk in response.streaming_content:
+            lines += chunk.count(b'\n')
+            # 块之间不保留连接包装，其他代码的查询不计入
+            self.assertEqual(connection.execute_wrappers, [])
+            SsqDraw.objects.exists()
+        self.assertEqual(lines, 31)
+        response.close()
+
+        stats = get_request_stats()['ssq:ssq_export']
+        self.assertEqual(stats['requests'], 1)
+        self.assertGreaterEqual(stats['max_queries'], 1)
+        self.assertLess(stats['max_queries'], 4)
+
+    def test_disabled(self):
+        with override_settings(SSQ_REQUEST_PROFILING=False), self.assertRaises(MiddlewareNotUsed):
+            RequestProfilingMiddleware(lambda request: HttpResponse())
+
+    def test_stats_view_requires_staff(self):
+        response = self.get(lambda request: HttpResponse())
+        request = self.factory.get('/stats/requests/', {'reset': '1'})
+        request.user = AnonymousUser()
+        self.assertEqual(request_stats(request).status_code, 302)
+        request.user = User(is_staff=True, is_active=True)
+        data = json.loads(request_stats(request).content)
+        self.assertEqual(data['views']['ssq:ssq_export']['requests'], 1)
+        self.assertEqual(get_request_stats(), {})
+        self.assertIn('Server-Timing', response)
@@ -7,4 +7,11 @@ urlpatterns = [
     path('create/', views.ssq_create, name='ssq_create'),
     path('update/<int:pk>/', views.ssq_update, name='ssq_update'),
     path('detail/<int:pk>/', views.ssq_detail, name='ssq_detail'),
+    path('api/hot/<str:period>/', views.ssq_hot_numbers, name='ssq_hot_numbers'),
+    path('api/similar/<str:period>/', views.ssq_similar_draws, name='ssq_similar_draws'),
+    path('api/omission/<str:period>/', views.ssq_omission, name='ssq_omission'),
+    path('api/cooccurrence/', views.ssq_cooccurrence, name='ssq_cooccurrence'),
+    path('api/blue/', views.ssq_blue, name='ssq_blue'),
+    path('api/combinations/', views.ssq_combinations, name='ssq_combinations'),
+    path('export/', views.ssq_export, name='ssq_export'),
 ]
\ No newline at end of file
@@ -0,0 +1,220 @@
+"""
+蓝球统计：窗口频次、遗漏、奇偶/大小分布和相邻两期的 16×16 转移矩阵
+
+- 频次保存按期累计的出现次数 (T+1, 16)，任意窗口 = 两行相减
+- 遗漏保存每期各号码最近一次出现的下标 (T, 16)，任意截至期的遗漏是一次查找
+- 转移保存按期累计的转移次数 (T+1, 256)，第 t 期记录 蓝球[t-1] -> 蓝球[t]，窗口同样两行相减
+- 奇偶、大小分布由窗口频次按号码分组求和，不单独保存
+- 开奖存储追加新一期后只处理新增的期，存储整体重新加载时才重建
+- 查询只通过不可变快照进行，同步时生成新快照并整体替换引用
+- 蓝球不在 1-16 范围内（如默认值0）的期不计入频次、遗漏和转移
+"""
+import threading
+
+import numpy as np
+
+from ssq.models import SsqDraw
+from ssq.utils.cooccurrence import _grow, _readonly
+from ssq.utils.store import get_draw_store
+
+BLUE_MAX = SsqDraw.BLUE_BALL_RANGE[1]
+BLUE_NUMBERS = np.arange(1, BLUE_MAX + 1)
+# 小号 1-8，大号 9-16
+BLUE_BIG_MIN = BLUE_MAX // 2 + 1
+_ODD = BLUE_NUMBERS % 2 == 1
+_BIG = BLUE_NUMBERS >= BLUE_BIG_MIN
+
+
+class BlueBallSnapshot:
+    """
+    蓝球统计某一时刻的不可变快照，数组均为只读视图
+    - _cumulative[t]：前 t 期各号码的累计出现次数，(T+1, 16)
+    - _last_seen[t]：截至第 t 期（含）各号码最近一次出现的下标，未出现为 -1，(T, 16)
+    - _transition_cumulative[t]：前 t 期的累计转移次数，[t, (a-1)*16 + (b-1)] 为 a -> b，(T+1, 256)
+    - _gaps[t]：第 t 期蓝球开出前的遗漏期数，蓝球无效的期为 -1，(T,)
+    """
+
+    def __init__(self, buffers: dict, blues: np.ndarray, periods: np.ndarray, size: int, generation: int):
+        self._cumulative = _readonly(buffers['cumulative'][:size + 1])
+        self._last_seen = _readonly(buffers['last_seen'][:size])
+        self._transition_cumulative = _readonly(buffers['transition_cumulative'][:size + 1])
+        self._gaps = _readonly(buffers['gaps'][:size])
+        self.blues = _readonly(blues[:size])
+        self.periods = _readonly(periods[:size])
+        self._size = size
+        # 对应的开奖存储加载代数
+        self.generation = generation
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _bounds(self, window: int = None, end=None) -> tuple:
+        """窗口对应的期下标 [lo, hi)：截至 end 期（含）的最近 window 期"""
+        hi = self._size if end is None else int(np.searchsorted(self.periods, int(end), side='right'))
+        lo = 0 if not window else max(0, hi - window)
+        return lo, hi
+
+    def gaps(self) -> np.ndarray:
+        """每期蓝球开出前的遗漏期数，与开奖存储下标对齐，蓝球无效的期为 -1"""
+        return self._gaps
+
+    def frequency(self, window: int = None, end=None) -> np.ndarray:
+        """
+        各号码出现次数，(16,)
+        :param window: 最近多少期，None 表示全部历史
+        :param end: 截至期号（含），None 表示最新一期
+        """
+        lo, hi = self._bounds(window, end)
+        return self._cumulative[hi] - self._cumulative[lo]
+
+    def omission(self, end=None) -> np.ndarray:
+        """截至 end 期（含）各号码的当前遗漏期数，从未出现时为全部期数，(16,)"""
+        _, hi = self._bounds(None, end)
+        if not hi:
+            return np.zeros(BLUE_MAX, dtype=np.int32)
+        return hi - 1 - self._last_seen[hi - 1]
+
+    def distribution(self, window: int = None, end=None) -> dict:
+        """窗口内奇偶、大小分布：{'odd', 'even', 'small', 'big'}"""
+        counts = self.frequency(window, end)
+        return {
+            'odd': int(counts[_ODD].sum()),
+            'even': int(counts[~_ODD].sum()),
+            'small': int(counts[~_BIG].sum()),
+            'big': int(counts[_BIG].sum()),
+        }
+
+    def transition_matrix(self, window: int = None, end=None) -> np.ndarray:
+        """
+        16×16 转移矩阵，[a-1, b-1] 为上一期蓝球 a、下一期蓝球 b 的次数，只统计两期都在窗口内的转移
+        """
+        lo, hi = self._bounds(window, end)
+        if hi <= lo:
+            return np.zeros((BLUE_MAX, BLUE_MAX), dtype=np.int32)
+        counts = self._transition_cumulative[hi] - self._transition_cumulative[lo + 1]
+        return counts.reshape(BLUE_MAX, BLUE_MAX)
+
+    def next_after(self, number: int, window: int = None, top: int = 5, end=None) -> list:
+        """
+        历史上蓝球 number 开出后，下一期开出次数最多的蓝球
+        :return: [{'number', 'count', 'probability'}]，次数降序，相同时号码升序，只返回出现过的
+        """
+        row = self.transition_matrix(window, end)[number - 1]
+        total = int(row.sum())
+        order = np.argsort(-row, kind='stable')[:top]
+        return [
+            {'number': int(i) + 1, 'count': int(row[i]), 'probability': round(int(row[i]) / total, 4)}
+            for i in order if row[i]
+        ]
+
+    def summary(self, end=None, window: int = None, top: int = 5) -> dict:
+        """
+        截至 end 期的蓝球统计，详情页使用
+        :return: {'blue_ball', 'numbers': [{'number', 'count', 'omission'}], 'distribution', 'next_after', 'window'}
+        """
+        _, hi = self._bounds(None, end)
+        counts = self.frequency(window, end)
+        omission = self.omission(end)
+        blue = int(self.blues[hi - 1]) if hi else None
+        return {
+            'blue_ball': blue,
+            'window': window,
+            'numbers': [
+                {'number': int(n), 'count': int(c), 'omission': int(o)}
+                for n, c, o in zip(BLUE_NUMBERS, counts, omission)
+            ],
+            'distribution': self.distribution(window, end),
+            'next_after': self.next_after(blue, window, top, end) if blue and blue <= BLUE_MAX else [],
+        }
+
+
+class BlueBallIndex:
+    """
+    进程内蓝球统计索引，与开奖存储同步
+    - 累计数组保存在可追加的缓冲区中，同步时只在持锁时写已发布快照之外的行，然后发布新快照
+    - 开奖存储重新加载时分配新的缓冲区重建，已取出的快照不受影响
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._buffers = None
+        self._snapshot = None
+
+    def snapshot(self) -> BlueBallSnapshot:
+        """与开奖存储同步后的快照：存储重新加载时重建，追加新期时只处理新增的期"""
+        store = get_draw_store()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.generation == store.generation and len(snapshot) == len(store):
+            return snapshot
+        with self._lock:
+            # 持锁后重新取存储快照，其他线程可能已经同步到更新的数据
+            store = get_draw_store()
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.generation != store.generation or len(snapshot) > len(store):
+                self._snapshot = self._build(store, 0)
+            elif len(snapshot) < len(store):
+                self._snapshot = self._build(store, len(snapshot))
+            return self._snapshot
+
+    def _build(self, store, start: int) -> BlueBallSnapshot:
+        """处理下标 [start, len(store)) 的新增期并生成快照，start 为 0 时分配新的缓冲区"""
+        stop = len(store)
+        if start == 0:
+            self._buffers = {
+                'cumulative': np.zeros((stop + 1, BLUE_MAX), dtype=np.int32),
+                'last_seen': np.zeros((stop, BLUE_MAX), dtype=np.int32),
+                'transition_cumulative': np.zeros((stop + 1, BLUE_MAX * BLUE_MAX), dtype=np.int32),
+                'gaps': np.zeros(stop, dtype=np.int32),
+            }
+        buffers = self._buffers
+        blues = store.column('blue_ball')
+        new = blues[start:stop].astype(np.intp) - 1
+        count = stop - start
+        index = np.arange(start, stop, dtype=np.int32)
+        # 蓝球无效（如默认值0）的期整行不计
+        valid = (new >= 0) & (new < BLUE_MAX)
+        rows = np.flatnonzero(valid)
+
+        hits = np.zeros((count, BLUE_MAX), dtype=np.int32)
+        hits[rows, new[rows]] = 1
+
+        # 最近出现下标：命中位置填下标，其余为 -1，与上一期的结果一起按列取累计最大值
+        seen = np.where(hits.astype(bool), index[:, None], -1).astype(np.int32)
+        if start:
+            np.maximum(seen[0], buffers['last_seen'][start - 1], out=seen[0])
+        np.maximum.accumulate(seen, axis=0, out=seen)
+
+        # 转移：第 t 期记录 蓝球[t-1] -> 蓝球[t]，第0期没有上一期，任一期蓝球无效时不计
+        transitions = np.zeros((count, BLUE_MAX * BLUE_MAX), dtype=np.int32)
+        rows = rows[index[rows] > 0]
+        previous = blues[index[rows] - 1].astype(np.intp) - 1
+        keep = (previous >= 0) & (previous < BLUE_MAX)
+        rows, previous = rows[keep], previous[keep]
+        transitions[rows, previous * BLUE_MAX + new[rows]] = 1
+
+        # 开出前的遗漏：本期下标 - 上一次出现的下标 - 1，此前从未出现时为此前的全部期数
+        before = np.empty((count, BLUE_MAX), dtype=np.int32)
+        if count:
+            before[0] = buffers['last_seen'][start - 1] if start else -1
+            before[1:] = seen[:-1]
+        gaps = np.full(count, -1, dtype=np.int32)
+        gaps[valid] = index[valid] - before[valid, new[valid]] - 1
+
+        for name, size in (('cumulative', stop + 1), ('last_seen', stop),
+                           ('transition_cumulative', stop + 1), ('gaps', stop)):
+            buffers[name] = _grow(buffers[name], size)
+        cumulative, transition_cumulative = buffers['cumulative'], buffers['transition_cumulative']
+        cumulative[start + 1:stop + 1] = cumulative[start] + np.cumsum(hits, axis=0)
+        buffers['last_seen'][start:stop] = seen
+        transition_cumulative[start + 1:stop + 1] = transition_cumulative[start] + np.cumsum(transitions, axis=0)
+        buffers['gaps'][start:stop] = gaps
+        return BlueBallSnapshot(buffers, blues, store.column('period'), stop, store.generation)
+
+
+# 进程级单例
+blue_ball_index = BlueBallIndex()
+
+
+def get_blue_stats() -> BlueBallSnapshot:
+    """获取与开奖存储同步的蓝球统计快照，调用方在一次计算中应只取一次"""
+    return blue_ball_index.snapshot()
@@ -0,0 +1,358 @@
+"""
+红球组合过滤引擎：在全部 1107568 个组合上按条件组合过滤
+
+索引随组合表一起由 ssq_build_combinations 生成为列式文件，各进程内存映射共享：
+- 取值较少的属性（AC值、奇数个数、质数个数、三区个数、特征组别）及每个号码：每个取值一个位图
+- 取值范围较大的属性（和值、跨度、尾数和）：按值排序的下标 + 各值的起始位置，范围查询是一段连续切片
+位图为 uint64 数组，第 i 个组合对应第 i // 64 个字的第 i % 64 位；多个条件用向量化按位与合并，
+计数用 popcount，分页只解包目标页所在的字。
+"""
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from ssq.utils.combinations import (
+    COMBINATION_COUNT, PICK_COUNT, RED_MAX, TABLE_VERSION, default_table_path, get_combination_table,
+)
+from ssq.utils.features import FEATURE_GROUPS, popcount
+from utils.columnar import read_columnar, write_columnar
+
+# 位图字数
+WORDS = (COMBINATION_COUNT + 63) // 64
+
+# 每个取值一个位图的属性
+BITMAP_ATTRIBUTES = (
+    'red_ac_value', 'red_odd_count', 'red_prime_count', 'zone_1_count', 'zone_2_count', 'zone_3_count',
+    'feature_group',
+)
+# 排序下标的属性
+SORTED_ATTRIBUTES = ('red_sum', 'red_span', 'red_tail_sum')
+
+# 与近期开奖比较重合数时最多使用的期数
+MAX_RECENT_DRAWS = 100
+
+# 流式导出时每次解包的字数（约26万个组合）
+STREAM_WORDS = 4096
+
+
+# ======================位图工具======================
+
+def to_bitmap(selected: np.ndarray) -> np.ndarray:
+    """(COMBINATION_COUNT,) 布尔数组 -> 位图"""
+    packed = np.zeros(WORDS * 8, dtype=np.uint8)
+    bits = np.packbits(selected, bitorder='little')
+    packed[:len(bits)] = bits
+    return packed.view('<u8')
+
+
+def indices_to_bitmap(indices: np.ndarray) -> np.ndarray:
+    """组合下标 -> 位图"""
+    selected = np.zeros(COMBINATION_COUNT, dtype=bool)
+    selected[indices] = True
+    return to_bitmap(selected)
+
+
+def bitmap_count(bitmap: np.ndarray) -> int:
+    """位图中置位的组合数"""
+    return int(popcount(bitmap).sum(dtype=np.int64))
+
+
+def _unpack(words: np.ndarray, first_word: int) -> np.ndarray:
+    """一段字中置位的组合下标"""
+    bits = np.unpackbits(np.ascontiguousarray(words).view(np.uint8), bitorder='little')
+    return np.flatnonzero(bits) + first_word * 64
+
+
+def bitmap_select(bitmap: np.ndarray, offset: int, limit: int) -> np.ndarray:
+    """
+    取位图中第 offset 个起的 limit 个组合下标（按字典序），只解包所在的字
+    :return: 组合下标数组
+    """
+    cumulative = np.cumsum(popcount(bitmap), dtype=np.int64)
+    if limit <= 0 or not len(cumulative) or offset >= cumulative[-1]:
+        return np.empty(0, dtype=np.int64)
+    first = int(np.searchsorted(cumulative, offset, side='right'))
+    last = int(np.searchsorted(cumulative, offset + limit, side='left')) + 1
+    skipped = int(cumulative[first - 1]) if first else 0
+    return _unpack(bitmap[first:last], first)[offset - skipped:offset - skipped + limit]
+
+
+def bitmap_iter(bitmap: np.ndarray, words: int = STREAM_WORDS):
+    """按字典序分块生成位图中的组合下标"""
+    for first in range(0, len(bitmap), words):
+        indices = _unpack(bitmap[first:first + words], first)
+        if len(indices):
+            yield indices
+
+
+# ======================查询条件======================
+
+@dataclass
+class CombinationQuery:
+    """组合过滤条件，未设置的条件不过滤；范围均为闭区间"""
+    sum_range: Optional[Tuple[int, int]] = None
+    span_range: Optional[Tuple[int, int]] = None
+    tail_sum_range: Optional[Tuple[int, int]] = None
+    ac_range: Optional[Tuple[int, int]] = None
+    odd_counts: Optional[List[int]] = None
+    prime_counts: Optional[List[int]] = None
+    zone_ratios: Optional[List[Tuple[int, int, int]]] = None  # 三区个数，如 [(2, 2, 2), (3, 2, 1)]
+    feature_groups: Optional[List[str]] = None
+    include: List[int] = field(default_factory=list)  # 必须包含的号码
+    exclude: List[int] = field(default_factory=list)  # 必须排除的号码
+    recent: int = 0  # 与最近 recent 期开奖比较
+    max_overlap: Optional[int] = None  # 与其中每一期的重合红球数不超过该值
+
+
+def _parse_range(value: str, name: str) -> Tuple[int, int]:
+    low, _, high = value.partition('-')
+    try:
+        low = int(low)
+        high = int(high) if high else low
+    except ValueError:
+        raise ValueError(f'{name} 格式应为 最小值-最大值 或单个数字：{value}')
+    if low > high:
+        raise ValueError(f'{name} 最小值不能大于最大值：{value}')
+    return low, high
+
+
+def _parse_int_list(value: str, name: str) -> List[int]:
+    try:
+        return [int(item) for item in value.split(',') if item.strip()]
+    except ValueError:
+        raise ValueError(f'{name} 必须是逗号分隔的数字：{value}')
+
+
+def _parse_numbers(value: str, name: str) -> List[int]:
+    numbers = _parse_int_list(value, name)
+    invalid = [number for number in numbers if not 1 <= number <= RED_MAX]
+    if invalid:
+        raise ValueError(f'{name} 号码必须在 1-{RED_MAX} 之间：{invalid}')
+    return sorted(set(numbers))
+
+
+def parse_query(params) -> CombinationQuery:
+    """
+    解析查询参数
+    sum/span/tail/ac=最小值-最大值，odd/prime=逗号分隔的个数，zones=2:2:2,3:2:1，
+    group=normal,random，include/exclude=逗号分隔的号码，recent=期数&max_overlap=最多重合个数
+    :param params: request.GET
+    :return: CombinationQuery
+    :raise ValueError: 参数不合法
+    """
+    query = CombinationQuery()
+    for param, attribute in (('sum', 'sum_range'), ('span', 'span_range'), ('tail', 'tail_sum_range'),
+                             ('ac', 'ac_range')):
+        if params.get(param):
+            setattr(query, attribute, _parse_range(params[param], param))
+    if params.get('odd'):
+        query.odd_counts = _parse_int_list(params['odd'], 'odd')
+    if params.get('prime'):
+        query.prime_counts = _parse_int_list(params['prime'], 'prime')
+    if params.get('zones'):
+        ratios = []
+        for ratio in params['zones'].split(','):
+            try:
+                counts = tuple(int(part) for part in ratio.split(':'))
+            except ValueError:
+                counts = ()
+            if len(counts) != 3 or sum(counts) != PICK_COUNT:
+                raise ValueError(f'zones 格式应为 一区:二区:三区 且合计 {PICK_COUNT} 个：{ratio}')
+            ratios.append(counts)
+        query.zone_ratios = ratios
+    if params.get('group'):
+        groups = [group.strip() for group in params['group'].split(',') if group.strip()]
+        invalid = [group for group in groups if group not in FEATURE_GROUPS]
+        if invalid:
+            raise ValueError(f'不支持的特征组别：{", ".join(invalid)}')
+        query.feature_groups = groups
+    if params.get('include'):
+        query.include = _parse_numbers(params['include'], 'include')
+    if params.get('exclude'):
+        query.exclude = _parse_numbers(params['exclude'], 'exclude')
+    if set(query.include) & set(query.exclude):
+        raise ValueError('同一个号码不能既包含又排除')
+    if len(query.include) > PICK_COUNT:
+        raise ValueError(f'最多包含 {PICK_COUNT} 个号码')
+    if params.get('max_overlap') not in (None, ''):
+        try:
+            query.recent = min(int(params.get('recent') or 1), MAX_RECENT_DRAWS)
+            query.max_overlap = int(params['max_overlap'])
+        except ValueError:
+            raise ValueError('recent 和 max_overlap 必须是数字')
+        if not 0 <= query.max_overlap <= PICK_COUNT or query.recent < 1:
+            raise ValueError(f'max_overlap 必须在 0-{PICK_COUNT} 之间，recent 必须大于0')
+    return query
+
+
+# ======================索引======================
+
+def default_index_path(table_path: str = None) -> str:
+    """过滤索引文件路径：与组合表同目录"""
+    root, extension = os.path.splitext(table_path or default_table_path())
+    return f'{root}_index{extension}'
+
+
+def build_filter_index(path: str = None, table_path: str = None) -> int:
+    """
+    由组合表生成过滤索引文件
+    :param path: 索引文件路径，默认 default_index_path()
+    :param table_path: 组合表路径，默认 default_table_path()
+    :return: 写入字节数
+    """
+    table = get_combination_table(table_path)
+    reds = table.red_balls()
+    columns = {
+        # 号码 n 的位图：组合包含 n
+        'number': np.stack([to_bitmap((reds == number).any(axis=1)) for number in range(1, RED_MAX + 1)]),
+    }
+    for name in BITMAP_ATTRIBUTES:
+        values = table.column(name)
+        columns[name] = np.stack([to_bitmap(values == value) for value in range(int(values.max()) + 1)])
+    for name in SORTED_ATTRIBUTES:
+        values = table.column(name)
+        order = np.argsort(values, kind='stable').astype(np.uint32)
+        columns[f'{name}_order'] = order
+        # bounds[v]：排序后第一个取值 >= v 的位置
+        columns[f'{name}_bounds'] = np.searchsorted(values[order], np.arange(int(values.max()) + 2)).astype(np.int64)
+
+    meta = {
+        'source': 'ssq_combination_filter_index',
+        'version': TABLE_VERSION,
+        'row_count': COMBINATION_COUNT,
+        'words': WORDS,
+    }
+    return write_columnar(path or default_index_path(table_path), columns, meta)
+
+
+class CombinationFilterIndex:
+    """内存映射的过滤索引"""
+
+    def __init__(self, path: str):
+        columns, meta = read_columnar(path)
+        if meta.get('version') != TABLE_VERSION or meta.get('words') != WORDS:
+            raise ValueError(f'过滤索引版本不匹配，请运行 ssq_build_combinations 重新生成：{path}')
+        self.path = path
+        self._columns = columns
+        self.all = to_bitmap(np.ones(COMBINATION_COUNT, dtype=bool))
+
+    def _values_bitmap(self, name: str, values) -> np.ndarray:
+        """属性取值在 values 中的组合"""
+        bitmaps = self._columns[name]
+        values = [value for value in set(values) if 0 <= value < len(bitmaps)]
+        if not values:
+            return np.zeros(WORDS, dtype=np.uint64)
+        return np.bitwise_or.reduce(bitmaps[values], axis=0)
+
+    def _range_bitmap(self, name: str, low: int, high: int) -> np.ndarray:
+        """属性取值在 [low, high] 内的组合，由排序下标切片得到"""
+        bounds = self._columns[f'{name}_bounds']
+        low = min(max(low, 0), len(bounds) - 1)
+        high = min(max(high + 1, 0), len(bounds) - 1)
+        return indices_to_bitmap(self._columns[f'{name}_order'][bounds[low]:bounds[max(low, high)]])
+
+    def _overlap_at_least(self, numbers, threshold: int) -> np.ndarray:
+        """
+        与给定号码重合不少于 threshold 个的组合：6个号码位图按位相加成3个位平面（位切片计数器），再按位比较
+        """
+        planes = [np.zeros(WORDS, dtype=np.uint64) for _ in range(3)]
+        for number in numbers:
+            carry = self._columns['number'][number - 1]
+            for plane in planes:
+                carry, plane[:] = plane & carry, plane ^ carry
+        result = np.zeros(WORDS, dtype=np.uint64)
+        equal = self.all.copy()
+        for bit in (2, 1, 0):
+            if (threshold >> bit) & 1:
+                equal &= planes[bit]
+            else:
+                result |= equal & planes[bit]
+                equal &= ~planes[bit]
+        return result | equal
+
+    def evaluate(self, query: CombinationQuery, recent_draws=None) -> np.ndarray:
+        """
+        按条件过滤，全部条件按位与
+        :param query: CombinationQuery
+        :param recent_draws: 最近各期的红球（重合数条件使用），形状 (K, 6)
+        :return: 结果位图
+        """
+        result = self.all.copy()
+        for name, value_range in (('red_sum', query.sum_range), ('red_span', query.span_range),
+                                  ('red_tail_sum', query.tail_sum_range)):
+            if value_range is not None:
+                result &= self._range_bitmap(name, *value_range)
+        if query.ac_range is not None:
+            result &= self._values_bitmap('red_ac_value', range(query.ac_range[0], query.ac_range[1] + 1))
+        if query.odd_counts is not None:
+            result &= self._values_bitmap('red_odd_count', query.odd_counts)
+        if query.prime_counts is not None:
+            result &= self._values_bitmap('red_prime_count', query.prime_counts)
+        if query.zone_ratios is not None:
+            zones = np.zeros(WORDS, dtype=np.uint64)
+            for ratio in query.zone_ratios:
+                zones |= (self._values_bitmap('zone_1_count', [ratio[0]])
+                          & self._values_bitmap('zone_2_count', [ratio[1]])
+                          & self._values_bitmap('zone_3_count', [ratio[2]]))
+            result &= zones
+        if query.feature_groups is not None:
+            codes = [int(np.flatnonzero(FEATURE_GROUPS == group)[0]) for group in query.feature_groups]
+            result &= self._values_bitmap('feature_group', codes)
+        for number in query.include:
+            result &= self._columns['number'][number - 1]
+        for number in query.exclude:
+            result &= ~self._columns['number'][number - 1]
+        if query.max_overlap is not None and recent_draws is not None:
+            for reds in np.asarray(recent_draws).reshape(-1, PICK_COUNT).tolist():
+                result &= ~self._overlap_at_least(reds, query.max_overlap + 1)
+            result &= self.all
+        return result
+
+
+_index = None
+_index_key = None
+_index_lock = threading.Lock()
+
+
+def get_filter_index(path: str = None) -> CombinationFilterIndex:
+    """
+    获取本进程的过滤索引：首次调用时映射文件，文件被重新生成后自动重新映射
+    :raise FileNotFoundError: 索引尚未生成
+    """
+    global _index, _index_key
+    path = path or default_index_path()
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f'组合过滤索引不存在，请先运行 ssq_build_combinations：{path}')
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if _index is not None and _index_key == key:
+        return _index
+    with _index_lock:
+        if _index is None or _index_key != key:
+            _index = CombinationFilterIndex(path)
+            _index_key = key
+        return _index
+
+
+def recent_red_balls(count: int) -> np.ndarray:
+    """最近 count 期开奖的红球，取自开奖存储"""
+    from ssq.utils.store import get_draw_store
+
+    store = get_draw_store()
+    if count <= 0 or not len(store):
+        return np.empty((0, PICK_COUNT), dtype=np.uint8)
+    return store.red_balls(slice(max(0, len(store) - count), len(store)))
+
+
+def filter_combinations(query: CombinationQuery) -> np.ndarray:
+    """
+    按条件过滤全部组合
+    :param query: CombinationQuery
+    :return: 结果位图，配合 bitmap_count / bitmap_select / bitmap_iter 使用
+    """
+    recent = recent_red_balls(query.recent) if query.max_overlap is not None else None
+    return get_filter_index().evaluate(query, recent)
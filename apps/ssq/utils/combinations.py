@@ -0,0 +1,195 @@
+"""
+全部红球组合表：C(33, 6) = 1107568 个组合按字典序排列，每个组合的衍生特征与 SsqDraw._calculate_features 规则一致
+
+表由 ssq_build_combinations 命令一次性生成为列式文件（utils.columnar），之后各进程只做内存映射：
+数据页在操作系统页缓存中，所有 Web/Celery 进程共享同一份物理内存，不各自构造副本。
+组合在表中的下标即字典序序号，可由红球直接算出（rank），无需查找。
+"""
+import itertools
+import os
+import threading
+from math import comb
+
+import numpy as np
+from django.conf import settings
+
+from ssq.models import SsqDraw
+from ssq.utils.features import FEATURE_GROUPS, calculate_features
+from utils.columnar import read_columnar, write_columnar
+
+RED_MAX = SsqDraw.RED_BALL_RANGE[1]
+PICK_COUNT = SsqDraw.RED_BALL_COUNT
+COMBINATION_COUNT = comb(RED_MAX, PICK_COUNT)
+
+# 特征规则变化时递增，旧表需要重新生成
+TABLE_VERSION = 1
+
+# 列定义：列名 -> dtype，每个组合合计 24 字节，整表约 26MB
+COLUMNS = {
+    'red_balls': np.uint8,  # (N, 6)
+    'red_mask': np.uint64,
+    'red_sum': np.uint8,
+    'red_span': np.uint8,
+    'red_ac_value': np.uint8,
+    'red_odd_count': np.uint8,
+    'red_prime_count': np.uint8,
+    'zone_1_count': np.uint8,
+    'zone_2_count': np.uint8,
+    'zone_3_count': np.uint8,
+    'red_tail_sum': np.uint8,
+    'feature_group': np.uint8,
+}
+
+# 生成时每块计算的组合数
+BUILD_CHUNK_SIZE = 200000
+
+# rank 用的组合数表：_BINOMIAL[n, k] = C(n, k)
+_BINOMIAL = np.array([[comb(n, k) for k in range(PICK_COUNT + 1)] for n in range(RED_MAX + 1)], dtype=np.int64)
+
+
+def default_table_path() -> str:
+    """组合表文件路径，通过 SSQ_COMBINATION_TABLE 配置"""
+    path = getattr(settings, 'SSQ_COMBINATION_TABLE', None)
+    return os.fspath(path or os.path.join(settings.MEDIA_ROOT, 'combinations', 'red_combinations.ssqcol'))
+
+
+def enumerate_combinations() -> np.ndarray:
+    """
+    按字典序枚举全部红球组合
+    :return: (1107568, 6) uint8 矩阵
+    """
+    flat = np.fromiter(
+        itertools.chain.from_iterable(itertools.combinations(range(1, RED_MAX + 1), PICK_COUNT)),
+        dtype=np.uint8, count=COMBINATION_COUNT * PICK_COUNT,
+    )
+    return flat.reshape(COMBINATION_COUNT, PICK_COUNT)
+
+
+def rank(red_balls) -> np.ndarray:
+    """
+    红球组合在表中的下标（字典序序号），向量化计算
+    :param red_balls: (N, 6) 或 (6,) 红球，无需排序
+    :return: (N,) int64 下标
+    """
+    reds = np.sort(np.asarray(red_balls, dtype=np.int64).reshape(-1, PICK_COUNT), axis=1)
+    if reds.size and (reds.min() < 1 or reds.max() > RED_MAX or (np.diff(reds, axis=1) == 0).any()):
+        raise ValueError(f'红球必须是 1-{RED_MAX} 中的 {PICK_COUNT} 个不同号码')
+    # 字典序序号 = 总数 - 1 - Σ C(33 - a_i, 6 - i)（a_i 为第 i 个号码，i 从0开始）
+    remaining = np.arange(PICK_COUNT, 0, -1)
+    return COMBINATION_COUNT - 1 - _BINOMIAL[RED_MAX - reds, remaining].sum(axis=1)
+
+
+def _feature_columns(reds: np.ndarray) -> dict:
+    features = calculate_features(reds)
+    zones = features['red_zones']
+    return {
+        'red_balls': reds,
+        'red_mask': features['red_mask'].view(np.uint64),
+        'red_sum': features['red_sum'],
+        'red_span': features['red_span'],
+        'red_ac_value': features['red_ac_value'],
+        'red_odd_count': features['red_odd_count'],
+        'red_prime_count': features['red_prime_count'],
+        'zone_1_count': zones[:, 0],
+        'zone_2_count': zones[:, 1],
+        'zone_3_count': zones[:, 2],
+        'red_tail_sum': features['red_tail_sum'],
+        'feature_group': features['feature_group_code'],
+    }
+
+
+def build_combination_columns(chunk_size: int = BUILD_CHUNK_SIZE) -> dict:
+    """
+    枚举全部组合并分块计算衍生特征
+    :param chunk_size: 每块组合数，限制中间数组的内存占用
+    :return: 列名 -> 数组
+    """
+    reds = enumerate_combinations()
+    columns = {
+        name: np.empty((COMBINATION_COUNT, PICK_COUNT) if name == 'red_balls' else COMBINATION_COUNT, dtype=dtype)
+        for name, dtype in COLUMNS.items()
+    }
+    for start in range(0, COMBINATION_COUNT, chunk_size):
+        stop = min(start + chunk_size, COMBINATION_COUNT)
+        for name, values in _feature_columns(reds[start:stop]).items():
+            columns[name][start:stop] = values
+    return columns
+
+
+def build_combination_table(path: str = None, chunk_size: int = BUILD_CHUNK_SIZE) -> int:
+    """
+    生成组合表文件（先写临时文件再替换，正在读取旧表的进程不受影响）
+    :param path: 文件路径，默认 default_table_path()
+    :param chunk_size: 每块组合数
+    :return: 写入字节数
+    """
+    path = path or default_table_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    meta = {
+        'source': 'ssq_red_combinations',
+        'version': TABLE_VERSION,
+        'row_count': COMBINATION_COUNT,
+        'feature_groups': FEATURE_GROUPS.tolist(),
+    }
+    return write_columnar(path, build_combination_columns(chunk_size), meta)
+
+
+class CombinationTable:
+    """内存映射的组合表，各列为只读视图，下标为组合的字典序序号"""
+
+    def __init__(self, path: str):
+        columns, meta = read_columnar(path)
+        if meta.get('version') != TABLE_VERSION or meta.get('row_count') != COMBINATION_COUNT:
+            raise ValueError(f'组合表版本不匹配，请运行 ssq_build_combinations 重新生成：{path}')
+        self.path = path
+        self.meta = meta
+        self._columns = columns
+
+    def __len__(self) -> int:
+        return COMBINATION_COUNT
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        只读列视图
+        :param name: 列名，见 COLUMNS
+        """
+        return self._columns[name]
+
+    def red_balls(self, index=slice(None)) -> np.ndarray:
+        """指定下标的红球矩阵"""
+        return self._columns['red_balls'][index]
+
+    def rows(self, index) -> dict:
+        """指定下标的全部列"""
+        return {name: array[index] for name, array in self._columns.items()}
+
+    def index_of(self, red_balls) -> np.ndarray:
+        """红球组合的下标，见 rank"""
+        return rank(red_balls)
+
+
+_table = None
+_table_key = None
+_table_lock = threading.Lock()
+
+
+def get_combination_table(path: str = None) -> CombinationTable:
+    """
+    获取本进程的组合表：首次调用时映射文件，文件被重新生成后自动重新映射
+    :param path: 文件路径，默认 default_table_path()
+    :raise FileNotFoundError: 组合表尚未生成
+    """
+    global _table, _table_key
+    path = path or default_table_path()
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f'组合表不存在，请先运行 ssq_build_combinations：{path}')
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if _table is not None and _table_key == key:
+        return _table
+    with _table_lock:
+        if _table is None or _table_key != key:
+            _table = CombinationTable(path)
+            _table_key = key
+        return _table
@@ -0,0 +1,218 @@
+"""
+红球共现统计：两两组合（33×33）和三个号码组合（C(33,3)=5456）在全部历史及任意滚动窗口内的共同出现次数
+
+- 每期6个红球产生15个号码对、20个三元组，由开奖存储的红球一次向量化算出编号
+- 号码对保存按期累计的计数（每期一行，只存上三角528列），任意窗口 = 两行相减，是数组查找
+- 三元组保存每期的20个编号，窗口计数用 bincount，全部历史的计数随新开奖累加
+- 开奖存储追加新一期后只处理新增的期，存储整体重新加载时才重建
+- 与开奖存储一样，查询只通过不可变快照进行：同步时生成新快照并整体替换引用，查询无需加锁
+"""
+import itertools
+import threading
+
+import numpy as np
+
+from ssq.models import SsqDraw
+from ssq.utils.store import get_draw_store
+
+RED_MAX = SsqDraw.RED_BALL_RANGE[1]
+PICK_COUNT = SsqDraw.RED_BALL_COUNT
+
+# 号码对编号：PAIR_INDEX[a-1, b-1]，a != b，对称
+_PAIR_I, _PAIR_J = np.triu_indices(RED_MAX, k=1)
+PAIR_COUNT = len(_PAIR_I)
+PAIR_INDEX = np.full((RED_MAX, RED_MAX), -1, dtype=np.int16)
+PAIR_INDEX[_PAIR_I, _PAIR_J] = PAIR_INDEX[_PAIR_J, _PAIR_I] = np.arange(PAIR_COUNT)
+
+# 三元组编号：TRIPLE_INDEX[a-1, b-1, c-1]（a < b < c），TRIPLES[编号] 为三个号码
+TRIPLES = np.array(list(itertools.combinations(range(1, RED_MAX + 1), 3)), dtype=np.uint8)
+TRIPLE_COUNT = len(TRIPLES)
+TRIPLE_INDEX = np.full((RED_MAX, RED_MAX, RED_MAX), -1, dtype=np.int16)
+TRIPLE_INDEX[TRIPLES[:, 0] - 1, TRIPLES[:, 1] - 1, TRIPLES[:, 2] - 1] = np.arange(TRIPLE_COUNT)
+
+# 一期红球中号码对、三元组的位置组合
+_PAIR_POSITIONS = np.array(list(itertools.combinations(range(PICK_COUNT), 2)))
+_TRIPLE_POSITIONS = np.array(list(itertools.combinations(range(PICK_COUNT), 3)))
+
+
+def pair_ids(reds: np.ndarray) -> np.ndarray:
+    """(N, 6) 排好序的红球 -> (N, 15) 号码对编号"""
+    reds = np.asarray(reds, dtype=np.intp) - 1
+    return PAIR_INDEX[reds[:, _PAIR_POSITIONS[:, 0]], reds[:, _PAIR_POSITIONS[:, 1]]]
+
+
+def triple_ids(reds: np.ndarray) -> np.ndarray:
+    """(N, 6) 排好序的红球 -> (N, 20) 三元组编号"""
+    reds = np.asarray(reds, dtype=np.intp) - 1
+    positions = _TRIPLE_POSITIONS
+    return TRIPLE_INDEX[reds[:, positions[:, 0]], reds[:, positions[:, 1]], reds[:, positions[:, 2]]]
+
+
+def _grow(array: np.ndarray, size: int) -> np.ndarray:
+    """容量不足时按倍数扩容（首维），返回新数组，已发布快照仍指向旧数组"""
+    if size <= len(array):
+        return array
+    grown = np.zeros((max(size, len(array) * 2, 64), *array.shape[1:]), dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+def _readonly(array: np.ndarray) -> np.ndarray:
+    """数组的只读视图"""
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+class CooccurrenceSnapshot:
+    """
+    共现索引某一时刻的不可变快照，数组均为只读视图
+    - _pair_cumulative[t]：前 t 期各号码对的累计出现次数，(T+1, 528)
+    - _number_cumulative[t]：前 t 期各号码的累计出现次数，(T+1, 33)
+    - _triples[t]：第 t 期的20个三元组编号，(T, 20)
+    - triple_totals：全部历史各三元组的出现次数
+    """
+
+    def __init__(self, buffers: dict, triple_totals: np.ndarray, periods: np.ndarray, size: int, generation: int):
+        self._pair_cumulative = _readonly(buffers['pair_cumulative'][:size + 1])
+        self._number_cumulative = _readonly(buffers['number_cumulative'][:size + 1])
+        self._triples = _readonly(buffers['triples'][:size])
+        self.triple_totals = _readonly(triple_totals)
+        self.periods = _readonly(periods[:size])
+        self._size = size
+        # 对应的开奖存储加载代数
+        self.generation = generation
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _bounds(self, window: int = None, end=None) -> tuple:
+        """窗口对应的期下标 [lo, hi)：截至 end 期（含）的最近 window 期"""
+        hi = self._size if end is None else int(np.searchsorted(self.periods, int(end), side='right'))
+        lo = 0 if not window else max(0, hi - window)
+        return lo, hi
+
+    def pair_counts(self, window: int = None, end=None) -> np.ndarray:
+        """
+        号码对共现次数（上三角展开，528个），两行累计值相减
+        :param window: 最近多少期，None 表示全部历史
+        :param end: 截至期号（含），None 表示最新一期
+        """
+        lo, hi = self._bounds(window, end)
+        return self._pair_cumulative[hi] - self._pair_cumulative[lo]
+
+    def pair_matrix(self, window: int = None, end=None) -> np.ndarray:
+        """
+        33×33 共现矩阵，[a-1, b-1] 为号码 a、b 同时出现的期数，对角线为号码自身出现的期数
+        """
+        lo, hi = self._bounds(window, end)
+        counts = self._pair_cumulative[hi] - self._pair_cumulative[lo]
+        matrix = np.zeros((RED_MAX, RED_MAX), dtype=np.int32)
+        matrix[_PAIR_I, _PAIR_J] = matrix[_PAIR_J, _PAIR_I] = counts
+        matrix[np.diag_indices(RED_MAX)] = self._number_cumulative[hi] - self._number_cumulative[lo]
+        return matrix
+
+    def top_partners(self, number: int, window: int = None, top: int = 10, end=None) -> list:
+        """
+        与号码 number 共同出现最多的号码
+        :return: [{'number', 'count'}]，次数降序，相同时号码升序
+        """
+        lo, hi = self._bounds(window, end)
+        others = np.delete(np.arange(RED_MAX), number - 1)
+        columns = PAIR_INDEX[number - 1, others]
+        counts = self._pair_cumulative[hi, columns] - self._pair_cumulative[lo, columns]
+        order = np.argsort(-counts, kind='stable')[:top]
+        return [{'number': int(others[i]) + 1, 'count': int(counts[i])} for i in order]
+
+    def triple_counts(self, window: int = None, end=None) -> np.ndarray:
+        """三元组出现次数（按 TRIPLES 编号），全部历史直接返回累加值，窗口内用 bincount 统计"""
+        lo, hi = self._bounds(window, end)
+        if lo == 0 and hi == self._size:
+            return self.triple_totals.copy()
+        return np.bincount(self._triples[lo:hi].ravel(), minlength=TRIPLE_COUNT)
+
+    def top_triples(self, number: int = None, window: int = None, top: int = 10, end=None) -> list:
+        """
+        出现次数最多的三元组，只返回出现过的（稀疏）
+        :param number: 只统计包含该号码的三元组
+        :return: [{'numbers', 'count'}]
+        """
+        counts = self.triple_counts(window, end)
+        candidates = np.flatnonzero(counts)
+        if number is not None:
+            candidates = candidates[(TRIPLES[candidates] == number).any(axis=1)]
+        order = candidates[np.argsort(-counts[candidates], kind='stable')][:top]
+        return [{'numbers': TRIPLES[i].tolist(), 'count': int(counts[i])} for i in order]
+
+
+class CooccurrenceIndex:
+    """
+    进程内红球共现索引，与开奖存储同步
+    - 累计数组保存在可追加的缓冲区中，同步时只在持锁时写已发布快照之外的行，然后发布新快照
+    - 开奖存储重新加载时分配新的缓冲区重建，已取出的快照不受影响
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._buffers = None
+        self._snapshot = None
+
+    def snapshot(self) -> CooccurrenceSnapshot:
+        """与开奖存储同步后的快照：存储重新加载时重建，追加新期时只处理新增的期"""
+        store = get_draw_store()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.generation == store.generation and len(snapshot) == len(store):
+            return snapshot
+        with self._lock:
+            # 持锁后重新取存储快照，其他线程可能已经同步到更新的数据
+            store = get_draw_store()
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.generation != store.generation or len(snapshot) > len(store):
+                self._snapshot = self._build(store, 0)
+            elif len(snapshot) < len(store):
+                self._snapshot = self._build(store, len(snapshot))
+            return self._snapshot
+
+    def _build(self, store, start: int) -> CooccurrenceSnapshot:
+        """处理下标 [start, len(store)) 的新增期并生成快照，start 为 0 时分配新的缓冲区"""
+        stop = len(store)
+        if start == 0:
+            self._buffers = {
+                'pair_cumulative': np.zeros((stop + 1, PAIR_COUNT), dtype=np.int32),
+                'number_cumulative': np.zeros((stop + 1, RED_MAX), dtype=np.int32),
+                'triples': np.zeros((stop, len(_TRIPLE_POSITIONS)), dtype=np.int16),
+            }
+            triple_totals = np.zeros(TRIPLE_COUNT, dtype=np.int32)
+        else:
+            triple_totals = self._snapshot.triple_totals
+
+        reds = store.red_balls(slice(start, stop))
+        pairs = pair_ids(reds)
+        triples = triple_ids(reds)
+        count = stop - start
+
+        # 新增各期的号码对、号码出现矩阵，累计到最后一行之后
+        pair_hits = np.zeros((count, PAIR_COUNT), dtype=np.int32)
+        np.put_along_axis(pair_hits, pairs.astype(np.intp), 1, axis=1)
+        number_hits = np.zeros((count, RED_MAX), dtype=np.int32)
+        np.put_along_axis(number_hits, reds.astype(np.intp) - 1, 1, axis=1)
+
+        buffers = self._buffers
+        for name, size in (('pair_cumulative', stop + 1), ('number_cumulative', stop + 1), ('triples', stop)):
+            buffers[name] = _grow(buffers[name], size)
+        pair_cumulative, number_cumulative = buffers['pair_cumulative'], buffers['number_cumulative']
+        pair_cumulative[start + 1:stop + 1] = pair_cumulative[start] + np.cumsum(pair_hits, axis=0)
+        number_cumulative[start + 1:stop + 1] = number_cumulative[start] + np.cumsum(number_hits, axis=0)
+        buffers['triples'][start:stop] = triples
+        # 全部历史的三元组计数生成新数组，旧快照的计数不变
+        triple_totals = triple_totals + np.bincount(triples.ravel(), minlength=TRIPLE_COUNT).astype(np.int32)
+        return CooccurrenceSnapshot(buffers, triple_totals, store.column('period'), stop, store.generation)
+
+
+# 进程级单例
+cooccurrence_index = CooccurrenceIndex()
+
+
+def get_cooccurrence() -> CooccurrenceSnapshot:
+    """获取与开奖存储同步的共现索引快照，调用方在一次计算中应只取一次"""
+    return cooccurrence_index.snapshot()
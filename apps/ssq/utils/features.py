@@ -0,0 +1,156 @@
+import numpy as np
+
+from ssq.models import SsqDraw
+
+# 特征组别编码，顺序即编码值
+FEATURE_GROUPS = np.array(['normal', 'anomaly', 'pattern', 'random'])
+GROUP_NORMAL, GROUP_ANOMALY, GROUP_PATTERN, GROUP_RANDOM = range(4)
+
+# 写回数据库的衍生字段
+FEATURE_FIELDS = [
+    'red_sum', 'red_odd_count', 'red_even_count', 'red_prime_count', 'red_zones',
+    'red_span', 'red_tail_sum', 'red_ac_value', 'red_mask', 'feature_group',
+]
+
+# 质数查找表，下标即号码
+_PRIME_LOOKUP = np.zeros(SsqDraw.RED_BALL_RANGE[1] + 1, dtype=bool)
+_PRIME_LOOKUP[sorted(SsqDraw.PRIME_SET)] = True
+
+# 每个字节的置位数查找表，用于不支持 np.bitwise_count 的旧版本 NumPy
+_BYTE_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+# 6个红球两两组合的下标（15对）
+_PAIR_I, _PAIR_J = np.triu_indices(SsqDraw.RED_BALL_COUNT, k=1)
+
+
+def as_red_matrix(red_balls) -> np.ndarray:
+    """
+    将红球列表转换为排好序的 (N, 6) 矩阵
+    :param red_balls: 红球二维列表或数组
+    :return: int16 矩阵
+    """
+    reds = np.asarray(red_balls, dtype=np.int16)
+    if reds.ndim == 1:
+        reds = reds.reshape(-1, SsqDraw.RED_BALL_COUNT)
+    if reds.shape[1:] != (SsqDraw.RED_BALL_COUNT,):
+        raise ValueError(f'红球矩阵形状必须是(N, {SsqDraw.RED_BALL_COUNT})，当前为{reds.shape}')
+    return np.sort(reds, axis=1)
+
+
+def calculate_ac_values(reds: np.ndarray) -> np.ndarray:
+    """
+    批量计算AC值：两两差值去重后的个数 - (红球个数 - 1)
+    :param reds: 已排序的 (N, 6) 红球矩阵
+    :return: (N,) AC值
+    """
+    diffs = np.sort(reds[:, _PAIR_J] - reds[:, _PAIR_I], axis=1)
+    distinct = 1 + np.count_nonzero(np.diff(diffs, axis=1), axis=1)
+    return np.maximum(distinct - (reds.shape[1] - 1), 0)
+
+
+def has_pattern(reds: np.ndarray) -> np.ndarray:
+    """
+    批量检测规律模式：3个及以上连续号码，或所有相邻差值相同（等差数列）
+    :param reds: 已排序的 (N, 6) 红球矩阵
+    :return: (N,) 布尔数组
+    """
+    steps = np.diff(reds, axis=1)
+    consecutive = ((steps[:, :-1] == 1) & (steps[:, 1:] == 1)).any(axis=1)
+    arithmetic = (steps == steps[:, :1]).all(axis=1)
+    return consecutive | arithmetic
+
+
+def red_masks(red_balls) -> np.ndarray:
+    """
+    批量计算红球位掩码，第 n-1 位表示号码 n 是否出现
+    :param red_balls: (N, 6) 红球矩阵
+    :return: (N,) uint64 数组
+    """
+    reds = np.asarray(red_balls, dtype=np.uint64)
+    return np.bitwise_or.reduce(np.left_shift(np.uint64(1), reds - np.uint64(1)), axis=1)
+
+
+def popcount(values: np.ndarray) -> np.ndarray:
+    """
+    向量化统计 uint64 数组每个元素的置位数
+    :param values: uint64 数组
+    :return: 同形状的 uint8 数组
+    """
+    values = np.ascontiguousarray(values, dtype=np.uint64)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    return _BYTE_POPCOUNT[values.view(np.uint8)].reshape(*values.shape, 8).sum(axis=-1, dtype=np.uint8)
+
+
+def masks_to_reds(masks) -> np.ndarray:
+    """
+    位掩码还原为排好序的 (N, 6) 红球矩阵，掩码必须恰好包含6个号码
+    :param masks: (N,) 位掩码数组
+    :return: (N, 6) uint8 矩阵
+    """
+    masks = np.asarray(masks, dtype=np.uint64).reshape(-1)
+    shifts = np.arange(SsqDraw.RED_BALL_RANGE[1], dtype=np.uint64)
+    bits = ((masks[:, None] >> shifts) & np.uint64(1)).astype(bool)
+    numbers = np.nonzero(bits)[1] + 1
+    return numbers.astype(np.uint8).reshape(-1, SsqDraw.RED_BALL_COUNT)
+
+
+def calculate_features(red_balls) -> dict:
+    """
+    一次性计算所有衍生特征，规则与 SsqDraw._calculate_features 保持一致
+    :param red_balls: (N, 6) 红球矩阵
+    :return: 字段名 -> numpy数组，red_zones 为 (N, 3)
+    """
+    reds = as_red_matrix(red_balls)
+    count = reds.shape[1]
+
+    odd_count = np.count_nonzero(reds & 1, axis=1)
+    even_count = count - odd_count
+    ac_value = calculate_ac_values(reds)
+
+    # 三区分布：1-11，12-22，23-33
+    zone_index = (reds - 1) // 11
+    red_zones = np.stack([np.count_nonzero(zone_index == z, axis=1) for z in range(3)], axis=1)
+
+    # 特征组别，按优先级从低到高覆盖
+    group = np.full(reds.shape[0], GROUP_NORMAL, dtype=np.int8)
+    group[(ac_value >= 5) & (ac_value <= 8)] = GROUP_RANDOM
+    group[has_pattern(reds)] = GROUP_PATTERN
+    group[(odd_count == 0) | (even_count == 0)] = GROUP_ANOMALY
+
+    return {
+        'red_sum': reds.sum(axis=1),
+        'red_odd_count': odd_count,
+        'red_even_count': even_count,
+        'red_prime_count': np.count_nonzero(_PRIME_LOOKUP[reds], axis=1),
+        'red_zones': red_zones,
+        'red_span': reds[:, -1] - reds[:, 0],
+        'red_tail_sum': (reds % 10).sum(axis=1),
+        'red_ac_value': ac_value,
+        'red_mask': red_masks(reds).astype(np.int64),
+        'feature_group_code': group,
+        'feature_group': FEATURE_GROUPS[group],
+    }
+
+
+def iter_feature_rows(features: dict):
+    """
+    将向量化结果逐行转换为可直接赋值给模型的Python值
+    :param features: calculate_features 的返回值
+    :return: 生成器，每行一个字段字典
+    """
+    columns = {name: features[name].tolist() for name in FEATURE_FIELDS}
+    for values in zip(*columns.values()):
+        yield dict(zip(columns.keys(), values))
+
+
+def one_hot_reds(red_balls) -> np.ndarray:
+    """
+    红球 one-hot 矩阵，第 n-1 列表示号码 n 是否出现
+    :param red_balls: (N, 6) 红球矩阵
+    :return: (N, 33) int32 矩阵
+    """
+    reds = np.asarray(red_balls, dtype=np.intp).reshape(-1, SsqDraw.RED_BALL_COUNT)
+    matrix = np.zeros((reds.shape[0], SsqDraw.RED_BALL_RANGE[1]), dtype=np.int32)
+    np.put_along_axis(matrix, reds - 1, 1, axis=1)
+    return matrix
@@ -0,0 +1,145 @@
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from ssq.models import SsqDraw, SsqRedFrequency
+from ssq.utils.features import one_hot_reds
+
+# 默认统计窗口，可在 settings.SSQ_HOT_WINDOWS 中覆盖
+DEFAULT_HOT_WINDOWS = [10, 30, 50, 100]
+DEFAULT_HOT_WINDOW = 30
+
+
+def hot_windows() -> list:
+    """已配置的统计窗口（升序去重）"""
+    return sorted(set(getattr(settings, 'SSQ_HOT_WINDOWS', DEFAULT_HOT_WINDOWS)))
+
+
+def default_hot_window() -> int:
+    """详情页默认使用的统计窗口"""
+    window = getattr(settings, 'SSQ_HOT_WINDOW', DEFAULT_HOT_WINDOW)
+    windows = hot_windows()
+    return window if window in windows else windows[0]
+
+
+def _valid_draws(queryset):
+    """只保留红球完整的记录，返回 (期号列表, 红球矩阵)"""
+    periods, reds = [], []
+    for period, red_balls in queryset.values_list('period', 'red_balls'):
+        if isinstance(red_balls, (list, tuple)) and len(red_balls) == SsqDraw.RED_BALL_COUNT:
+            periods.append(period)
+            reds.append(red_balls)
+    return periods, np.array(reds, dtype=np.int16).reshape(-1, SsqDraw.RED_BALL_COUNT)
+
+
+def rebuild_frequency_table(windows=None, batch_size: int = 2000) -> int:
+    """
+    基于前缀和向量化重建整张频次表
+    :param windows: 统计窗口，默认读取配置
+    :param batch_size: bulk_create 批大小
+    :return: 写入行数
+    """
+    windows = windows or hot_windows()
+    periods, reds = _valid_draws(SsqDraw.objects.order_by('period'))
+
+    # prefix[t] 为前 t 期的累计出现次数，窗口计数 = prefix[t+1] - prefix[t+1-w]
+    prefix = np.zeros((len(periods) + 1, SsqDraw.RED_BALL_RANGE[1]), dtype=np.int32)
+    np.cumsum(one_hot_reds(reds), axis=0, out=prefix[1:])
+    ends = np.arange(1, len(periods) + 1)
+
+    objs = []
+    for window in windows:
+        starts = np.maximum(ends - window, 0)
+        counts = (prefix[ends] - prefix[starts]).tolist()
+        draw_counts = (ends - starts).tolist()
+        objs.extend(
+            SsqRedFrequency(period=period, window=window, draw_count=n, counts=c)
+            for period, n, c in zip(periods, draw_counts, counts)
+        )
+
+    with transaction.atomic():
+        SsqRedFrequency.objects.all().delete()
+        SsqRedFrequency.objects.bulk_create(objs, batch_size=batch_size)
+    return len(objs)
+
+
+def update_frequency_for(draw: SsqDraw, windows=None):
+    """
+    新开奖记录保存后增量更新频次：上一期计数 + 本期号码 - 移出窗口那一期的号码
+    非最新一期（插入或修改历史）时后续各期都受影响，不做增量更新，由调用方安排整表重建
+    :param draw: 刚保存的开奖记录
+    :param windows: 统计窗口，默认读取配置
+    :return: 是否已增量更新，False 表示需要重建整表
+    """
+    windows = windows or hot_windows()
+    if SsqDraw.objects.filter(period__gt=draw.period).exists():
+        return False
+
+    # 取足够覆盖最大窗口的上一段历史（倒序），第一条即上一期
+    history_periods, history = _valid_draws(
+        SsqDraw.objects.filter(period__lt=draw.period).order_by('-period')[:max(windows)]
+    )
+    current = one_hot_reds([draw.red_balls])[0]
+    previous = {}
+    if history_periods:
+        previous = {
+            row.window: row for row in SsqRedFrequency.objects.filter(period=history_periods[0], window__in=windows)
+        }
+
+    for window in windows:
+        prev = previous.get(window)
+        if prev is None and len(history):
+            # 缺少上一期快照，退回到窗口内直接求和
+            counts = current + one_hot_reds(history[:window - 1]).sum(axis=0)
+            draw_count = 1 + min(len(history), window - 1)
+        else:
+            counts = current + np.asarray(prev.counts if prev else 0, dtype=np.int32)
+            draw_count = (prev.draw_count if prev else 0) + 1
+            if draw_count > window:
+                counts -= one_hot_reds(history[window - 1:window]).sum(axis=0)
+                draw_count = window
+        SsqRedFrequency.objects.update_or_create(
+            period=draw.period,
+            window=window,
+            defaults={'draw_count': draw_count, 'counts': counts.tolist()},
+        )
+    return True
+
+
+def get_hot_numbers(period, window: int = None, top: int = 10) -> dict:
+    """
+    读取某期开奖前的热号（即上一期的窗口频次），一次索引查询
+    :param period: 期号
+    :param window: 统计窗口
+    :param top: 返回热号个数
+    :return: {'window', 'draw_count', 'hot_numbers', 'hot_numbers_info'}
+    """
+    window = window or default_hot_window()
+    row = SsqRedFrequency.objects.filter(
+        window=window, period__lt=period
+    ).only('draw_count', 'counts').order_by('-period').first()
+
+    counts = np.asarray(row.counts if row else [], dtype=np.int32)
+    draw_count = row.draw_count if row else 0
+
+    info = []
+    if counts.size and counts.any():
+        # 次数降序，次数相同按号码升序
+        order = np.lexsort((np.arange(counts.size), -counts))[:top]
+        for index in order.tolist():
+            count = int(counts[index])
+            if count == 0:
+                break
+            info.append({
+                'number': index + 1,
+                'count': count,
+                'frequency': f'{count}/{window}',
+                'percentage': round(count / window * 100, 1),
+            })
+
+    return {
+        'window': window,
+        'draw_count': draw_count,
+        'hot_numbers': sorted(item['number'] for item in info),
+        'hot_numbers_info': info,
+    }
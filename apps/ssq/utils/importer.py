@@ -0,0 +1,171 @@
+import csv
+import json
+import datetime
+
+import numpy as np
+from django.db import connection, transaction
+
+from ssq.models import SsqDraw
+from ssq.signals import draws_imported
+from ssq.utils.features import FEATURE_FIELDS, calculate_features, iter_feature_rows
+
+# 支持的文件格式
+IMPORT_FORMATS = [('csv', 'CSV'), ('jsonl', 'JSON Lines')]
+
+# 冲突时需要覆盖的字段
+UPSERT_FIELDS = ['draw_date', 'red_balls', 'blue_ball', 'last_updated', *FEATURE_FIELDS]
+
+# 最多保留的错误明细条数，避免坏文件撑爆内存
+MAX_ERROR_DETAILS = 100
+
+
+def guess_format(filename: str) -> str:
+    """根据文件扩展名推断格式，默认CSV"""
+    name = (filename or '').lower()
+    if name.endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    return 'csv'
+
+
+def _parse_reds(record: dict) -> list:
+    """兼容 red_balls 单列（逗号/空格分隔或列表）与 red_1..red_6 多列两种写法"""
+    reds = record.get('red_balls')
+    if reds is None:
+        reds = [record.get(f'red_{i}', record.get(f'red{i}')) for i in range(1, SsqDraw.RED_BALL_COUNT + 1)]
+    elif isinstance(reds, str):
+        reds = reds.replace(',', ' ').split()
+    return [int(num) for num in reds]
+
+
+def _parse_date(value) -> datetime.date:
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value).strip())
+
+
+def iter_records(stream, fmt: str):
+    """
+    逐行读取文件，生成 (行号, 原始记录字典)
+    :param stream: 文本流
+    :param fmt: csv / jsonl
+    :return: 生成器
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+    elif fmt == 'jsonl':
+        for line_no, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except ValueError as e:
+                yield line_no, {'__error__': f'JSON解析失败：{e}'}
+    else:
+        raise ValueError(f'不支持的导入格式：{fmt}')
+
+
+class SsqDrawImporter:
+    """
+    双色球开奖记录批量导入
+    - 流式读取，按批校验、计算衍生特征
+    - bulk_create(update_conflicts=True) 按期号覆盖已有记录
+    - 内存占用只与批大小有关
+    """
+
+    def __init__(self, batch_size: int = 1000):
+        self.batch_size = max(1, batch_size)
+        self.total = 0
+        self.imported = 0
+        self.error_count = 0
+        self.errors = []
+        self._seen_periods = set()
+
+    def _add_error(self, line_no: int, message: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERROR_DETAILS:
+            self.errors.append(f'第{line_no}行：{message}')
+
+    def _clean(self, line_no: int, record: dict):
+        """校验单行，返回 (period, draw_date, reds, blue)，失败返回 None"""
+        if '__error__' in record:
+            self._add_error(line_no, record['__error__'])
+            return None
+        try:
+            period = str(record.get('period') or '').strip()
+            if not period:
+                raise ValueError('期号不能为空')
+            draw_date = _parse_date(record.get('draw_date'))
+            reds = _parse_reds(record)
+            blue = int(record.get('blue_ball'))
+        except (TypeError, ValueError) as e:
+            self._add_error(line_no, f'字段格式错误：{e}')
+            return None
+
+        red_min, red_max = SsqDraw.RED_BALL_RANGE
+        blue_min, blue_max = SsqDraw.BLUE_BALL_RANGE
+        if len(reds) != SsqDraw.RED_BALL_COUNT:
+            self._add_error(line_no, f'红球数量必须是{SsqDraw.RED_BALL_COUNT}个号码')
+        elif len(set(reds)) != len(reds):
+            self._add_error(line_no, '红球号码不能重复')
+        elif not all(red_min <= num <= red_max for num in reds):
+            self._add_error(line_no, f'红球号码必须在{SsqDraw.RED_BALL_RANGE}之间')
+        elif not blue_min <= blue <= blue_max:
+            self._add_error(line_no, f'蓝球必须在{SsqDraw.BLUE_BALL_RANGE}之间')
+        elif period in self._seen_periods:
+            self._add_error(line_no, f'期号{period}在文件中重复')
+        else:
+            self._seen_periods.add(period)
+            return period, draw_date, sorted(reds), blue
+        return None
+
+    def _flush(self, batch: list):
+        """计算一批记录的衍生特征并写库"""
+        if not batch:
+            return
+        features = calculate_features(np.array([reds for _, _, reds, _ in batch]))
+        objs = [
+            SsqDraw(period=period, draw_date=draw_date, red_balls=reds, blue_ball=blue, **values)
+            for (period, draw_date, reds, blue), values in zip(batch, iter_feature_rows(features))
+        ]
+        # MySQL 不支持指定冲突字段，依赖唯一索引自动匹配
+        unique_fields = ['period'] if connection.features.supports_update_conflicts_with_target else None
+        SsqDraw.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=UPSERT_FIELDS,
+        )
+        self.imported += len(objs)
+
+    def run(self, stream, fmt: str = 'csv') -> dict:
+        """
+        执行导入
+        :param stream: 文本流（文件、TextIOWrapper 等）
+        :param fmt: csv / jsonl
+        :return: 导入统计
+        """
+        batch = []
+        with transaction.atomic():
+            for line_no, record in iter_records(stream, fmt):
+                self.total += 1
+                cleaned = self._clean(line_no, record)
+                if cleaned is None:
+                    continue
+                batch.append(cleaned)
+                if len(batch) >= self.batch_size:
+                    self._flush(batch)
+                    batch = []
+            self._flush(batch)
+
+        if self.imported:
+            draws_imported.send(sender=self.__class__, count=self.imported)
+
+        return {
+            'total': self.total,
+            'imported': self.imported,
+            'error_count': self.error_count,
+            'errors': self.errors,
+        }
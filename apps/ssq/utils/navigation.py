@@ -0,0 +1,47 @@
+from ssq.models import SsqDraw, SsqOmission
+from utils.counting import smart_count
+
+
+def get_latest_period():
+    """最新一期期号，期号索引上取一行；无数据返回 None"""
+    return SsqDraw.objects.order_by('-period').values_list('period', flat=True).first()
+
+
+def get_total_count() -> int:
+    """总期数，读取计数缓存（开奖记录写入后失效）"""
+    return smart_count(SsqDraw.objects.all())
+
+
+def get_period_ordinal(period) -> int:
+    """
+    期号对应的序号（从1开始），读取号码遗漏索引中维护的序号，期号唯一索引上取一行；
+    遗漏索引中没有该期（红球不完整或统计尚未重建）时退回期号索引计数
+    :param period: 期号
+    """
+    ordinal = SsqOmission.objects.filter(period=str(period)).values_list('ordinal', flat=True).first()
+    if ordinal is not None:
+        return ordinal
+    return SsqDraw.objects.filter(period__lte=str(period)).count()
+
+
+def get_navigation(period) -> dict:
+    """
+    详情页导航：上一期/下一期/最新一期走期号索引的 keyset 查询，序号读遗漏索引，总期数读计数缓存
+    查询次数固定，与历史长度无关
+    :param period: 期号
+    :return: {'prev_period', 'prev_pk', 'next_period', 'next_pk', 'serial_number', 'total_count', 'latest_period'}
+    """
+    period = str(period)
+    prev_draw = SsqDraw.objects.filter(period__lt=period).order_by('-period').values_list('period', 'pk').first()
+    next_draw = SsqDraw.objects.filter(period__gt=period).order_by('period').values_list('period', 'pk').first()
+
+    return {
+        'prev_period': prev_draw[0] if prev_draw else None,
+        'prev_pk': prev_draw[1] if prev_draw else None,
+        'next_period': next_draw[0] if next_draw else None,
+        'next_pk': next_draw[1] if next_draw else None,
+        'serial_number': get_period_ordinal(period),
+        'total_count': get_total_count(),
+        # 没有下一期时当前即最新一期，省一次查询
+        'latest_period': get_latest_period() if next_draw else period,
+    }
@@ -0,0 +1,260 @@
+import numpy as np
+from django.db import transaction
+
+from ssq.models import SsqDraw, SsqOmission
+from ssq.utils.features import one_hot_reds
+
+RED_MAX = SsqDraw.RED_BALL_RANGE[1]
+BLUE_MAX = SsqDraw.BLUE_BALL_RANGE[1]
+
+
+def one_hot_blues(blue_balls) -> np.ndarray:
+    """
+    蓝球 one-hot 矩阵，超出范围的蓝球（如默认值0）整行为0
+    :param blue_balls: (N,) 蓝球数组
+    :return: (N, 16) int32 矩阵
+    """
+    blues = np.asarray(blue_balls, dtype=np.intp).reshape(-1)
+    matrix = np.zeros((blues.shape[0], BLUE_MAX), dtype=np.int32)
+    valid = (blues >= 1) & (blues <= BLUE_MAX)
+    matrix[np.flatnonzero(valid), blues[valid] - 1] = 1
+    return matrix
+
+
+def _load_draws():
+    """按期号升序读取红球完整的开奖记录，返回 (期号数组, 红球矩阵, 蓝球数组)"""
+    periods, reds, blues = [], [], []
+    for period, red_balls, blue_ball in SsqDraw.objects.order_by('period').values_list(
+            'period', 'red_balls', 'blue_ball'):
+        if isinstance(red_balls, (list, tuple)) and len(red_balls) == SsqDraw.RED_BALL_COUNT:
+            periods.append(period)
+            reds.append(red_balls)
+            blues.append(blue_ball)
+    return (
+        np.array(periods, dtype=object),
+        np.array(reds, dtype=np.int16).reshape(-1, SsqDraw.RED_BALL_COUNT),
+        np.array(blues, dtype=np.int16),
+    )
+
+
+def _last_seen(one_hot: np.ndarray) -> np.ndarray:
+    """每期截至当期（含）各号码最后出现的序号，序号从1开始，0表示从未出现"""
+    ordinals = np.arange(1, one_hot.shape[0] + 1, dtype=np.int32)[:, None]
+    return np.maximum.accumulate(one_hot * ordinals, axis=0)
+
+
+def _omission_stats(one_hot: np.ndarray) -> dict:
+    """
+    向量化计算每期截至当期（含）的遗漏统计，均为 (期数, 号码数) 矩阵
+    - last_ordinal：最后出现序号
+    - omission：当前遗漏 = 当期序号 - 最后出现序号（当期出现为0，从未出现为当期序号）
+    - appear_count：出现次数
+    - max_omission：最大遗漏（含正在进行的遗漏）
+    """
+    last_ordinal = _last_seen(one_hot)
+    ordinals = np.arange(1, one_hot.shape[0] + 1, dtype=np.int32)[:, None]
+    omission = ordinals - last_ordinal
+    return {
+        'last_ordinal': last_ordinal,
+        'omission': omission,
+        'appear_count': np.cumsum(one_hot, axis=0, dtype=np.int32),
+        'max_omission': np.maximum.accumulate(omission, axis=0),
+    }
+
+
+def average_omission(ordinal: int, appear_count) -> np.ndarray:
+    """
+    平均遗漏 = 总遗漏期数 / 遗漏段数，出现 n 次把其余期分成 n + 1 段
+    :param ordinal: 统计期数
+    :param appear_count: 各号码出现次数
+    :return: 各号码平均遗漏
+    """
+    appear_count = np.asarray(appear_count, dtype=np.float64)
+    return (ordinal - appear_count) / (appear_count + 1)
+
+
+def _ordinal_to_period(last_ordinal, periods) -> list:
+    """序号转期号，从未出现为 None"""
+    return [periods[o - 1] if o else None for o in last_ordinal]
+
+
+def rebuild_omission_index(batch_size: int = 2000) -> int:
+    """
+    向量化重建整张号码遗漏索引
+    :param batch_size: bulk_create 批大小
+    :return: 写入行数
+    """
+    periods, reds, blues = _load_draws()
+    red = {name: values.tolist() for name, values in _omission_stats(one_hot_reds(reds)).items()}
+    blue = {name: values.tolist() for name, values in _omission_stats(one_hot_blues(blues)).items()}
+    period_list = periods.tolist()
+
+    objs = [
+        SsqOmission(
+            period=period,
+            ordinal=index + 1,
+            red_last_ordinal=red['last_ordinal'][index],
+            red_last_period=_ordinal_to_period(red['last_ordinal'][index], period_list),
+            red_appear_count=red['appear_count'][index],
+            red_max_omission=red['max_omission'][index],
+            blue_last_ordinal=blue['last_ordinal'][index],
+            blue_last_period=_ordinal_to_period(blue['last_ordinal'][index], period_list),
+            blue_appear_count=blue['appear_count'][index],
+            blue_max_omission=blue['max_omission'][index],
+        )
+        for index, period in enumerate(period_list)
+    ]
+    with transaction.atomic():
+        SsqOmission.objects.all().delete()
+        SsqOmission.objects.bulk_create(objs, batch_size=batch_size)
+    return len(objs)
+
+
+def _advance(prev_last, prev_count, prev_max, ordinal: int, numbers, size: int) -> tuple:
+    """
+    由上一期快照推出本期快照，O(号码数)
+    :return: (最后出现序号, 出现次数, 最大遗漏)，均为列表
+    """
+    last = np.asarray(prev_last if prev_last else [0] * size, dtype=np.int32)
+    count = np.asarray(prev_count if prev_count else [0] * size, dtype=np.int32)
+    max_omission = np.asarray(prev_max if prev_max else [0] * size, dtype=np.int32)
+    index = [number - 1 for number in numbers]
+    last[index] = ordinal
+    count[index] += 1
+    max_omission = np.maximum(max_omission, ordinal - last)
+    return last.tolist(), count.tolist(), max_omission.tolist()
+
+
+def update_omission_for(draw: SsqDraw):
+    """
+    新开奖记录保存后 O(49) 增量更新：由上一期快照只改本期出现的号码，并更新出现次数和最大遗漏
+    非最新一期（插入或修改历史）时后续序号都会变化，不做增量更新，由调用方安排整表重建
+    :param draw: 刚保存的开奖记录
+    :return: 是否已增量更新，False 表示需要重建整表
+    """
+    if SsqDraw.objects.filter(period__gt=draw.period).exists():
+        return False
+
+    prev = SsqOmission.objects.filter(period__lt=draw.period).order_by('-period').first()
+    if prev is None and SsqDraw.objects.filter(period__lt=draw.period).exists():
+        # 索引尚未建立
+        return False
+    if prev is not None and not prev.red_appear_count:
+        # 旧版本索引没有出现次数和最大遗漏
+        return False
+
+    ordinal = prev.ordinal + 1 if prev else 1
+    red_period = list(prev.red_last_period) if prev else [None] * RED_MAX
+    blue_period = list(prev.blue_last_period) if prev else [None] * BLUE_MAX
+    blues = [draw.blue_ball] if 1 <= draw.blue_ball <= BLUE_MAX else []
+
+    red_ordinal, red_count, red_max = _advance(
+        prev and prev.red_last_ordinal, prev and prev.red_appear_count, prev and prev.red_max_omission,
+        ordinal, draw.red_balls, RED_MAX,
+    )
+    blue_ordinal, blue_count, blue_max = _advance(
+        prev and prev.blue_last_ordinal, prev and prev.blue_appear_count, prev and prev.blue_max_omission,
+        ordinal, blues, BLUE_MAX,
+    )
+    for number in draw.red_balls:
+        red_period[number - 1] = draw.period
+    for number in blues:
+        blue_period[number - 1] = draw.period
+
+    SsqOmission.objects.update_or_create(
+        period=draw.period,
+        defaults={
+            'ordinal': ordinal,
+            'red_last_ordinal': red_ordinal,
+            'red_last_period': red_period,
+            'red_appear_count': red_count,
+            'red_max_omission': red_max,
+            'blue_last_ordinal': blue_ordinal,
+            'blue_last_period': blue_period,
+            'blue_appear_count': blue_count,
+            'blue_max_omission': blue_max,
+        },
+    )
+    return True
+
+
+def get_last_seen(period):
+    """
+    某期开奖前的号码遗漏快照（即上一期的索引行），一次索引查询
+    :param period: 期号
+    :return: SsqOmission 或 None
+    """
+    return SsqOmission.objects.filter(period__lt=period).order_by('-period').first()
+
+
+def get_cold_numbers(period, recent: int = 20, top: int = 10) -> list:
+    """
+    冷号：最近 recent 期未出现的红球，按遗漏期数降序
+    :param period: 期号
+    :param recent: 冷号统计期数
+    :param top: 返回冷号个数
+    :return: [{'number', 'missing_periods', 'last_appear'}]
+    """
+    snapshot = get_last_seen(period)
+    if snapshot is None:
+        return []
+
+    # 当期序号 = 上一期序号 + 1，遗漏期数 = 当期序号 - 最后出现序号
+    current = snapshot.ordinal + 1
+    missing = current - np.asarray(snapshot.red_last_ordinal, dtype=np.int32)
+    cold = np.flatnonzero(missing > recent)
+    # 遗漏降序，相同遗漏按号码升序
+    cold = cold[np.argsort(-missing[cold], kind='stable')][:top]
+
+    return [
+        {
+            'number': index + 1,
+            'missing_periods': int(missing[index]),
+            'last_appear': snapshot.red_last_period[index] or '从未出现',
+        }
+        for index in cold.tolist()
+    ]
+
+
+def omission_snapshot(snapshot: SsqOmission) -> dict:
+    """
+    截至某期（含）的遗漏统计，供图表使用
+    :param snapshot: SsqOmission
+    :return: {'red': {...}, 'blue': {...}}，每种球含 numbers/current/max/average/count/last_period
+    """
+    result = {}
+    for color, size in (('red', RED_MAX), ('blue', BLUE_MAX)):
+        last_ordinal = np.asarray(getattr(snapshot, f'{color}_last_ordinal'), dtype=np.int32)
+        count = getattr(snapshot, f'{color}_appear_count')
+        result[color] = {
+            'numbers': list(range(1, size + 1)),
+            'current': (snapshot.ordinal - last_ordinal).tolist(),
+            'max': getattr(snapshot, f'{color}_max_omission'),
+            'average': np.round(average_omission(snapshot.ordinal, count), 2).tolist(),
+            'count': count,
+            'last_period': getattr(snapshot, f'{color}_last_period'),
+        }
+    return result
+
+
+def omission_matrix(end=None, limit: int = 100) -> dict:
+    """
+    期号 × 号码的当前遗漏矩阵（截至各期，含当期），由开奖存储向量化计算，不查询数据库
+    :param end: 结束期号（含），None 表示最新一期
+    :param limit: 返回最近多少期
+    :return: {'periods', 'red': (T, 33), 'blue': (T, 16)}
+    """
+    from ssq.utils.store import get_draw_store
+
+    store = get_draw_store()
+    # 遗漏依赖全部历史，从第一期算到结束期再截取
+    rows = store.period_slice(None, end)
+    red = _omission_stats(one_hot_reds(store.red_balls(rows)))
+    blue = _omission_stats(one_hot_blues(store.column('blue_ball')[rows]))
+    periods = store.column('period')[rows]
+    start = max(0, len(periods) - limit)
+    return {
+        'periods': periods[start:],
+        'red': red['omission'][start:],
+        'blue': blue['omission'][start:],
+    }
@@ -0,0 +1,84 @@
+import numpy as np
+
+from ssq.models import SsqDraw
+from ssq.utils.features import popcount, red_masks
+from ssq.utils.store import get_draw_store
+
+
+def load_masks(before_period=None):
+    """
+    从进程内开奖存储读取全部红球位掩码（按期号升序），不访问数据库
+    :param before_period: 只取该期之前的记录
+    :return: (期号数组, uint64 掩码数组)
+    """
+    store = get_draw_store()
+    periods, masks = store.column('period'), store.column('red_mask')
+    if before_period is not None:
+        end = int(np.searchsorted(periods, int(before_period)))
+        periods, masks = periods[:end], masks[:end]
+    return periods, masks
+
+
+def top_k_similar(target_mask: int, periods: np.ndarray, masks: np.ndarray, k: int = 10, threshold: int = 4):
+    """
+    在掩码数组中查找与目标共同红球最多的 k 期
+    :param target_mask: 目标红球位掩码
+    :param periods: 期号数组，与 masks 一一对应
+    :param masks: uint64 掩码数组
+    :param k: 返回条数
+    :param threshold: 最少共同红球个数
+    :return: [(期号, 共同红球个数)]，共同个数降序，相同时期号降序
+    """
+    if not len(masks) or k <= 0:
+        return []
+    common = popcount(masks & np.uint64(target_mask))
+    candidates = np.flatnonzero(common >= threshold)
+    # 排序键：共同个数优先，相同则越近的期越靠前（数组按期号升序，下标越大越近）
+    keys = common[candidates].astype(np.int64) * len(masks) + candidates
+    if len(candidates) > k:
+        # 先用 argpartition 取出前k大，再对这k个排序
+        top = np.argpartition(-keys, k - 1)[:k]
+        candidates, keys = candidates[top], keys[top]
+    candidates = candidates[np.argsort(-keys)]
+    return [(periods[i], int(common[i])) for i in candidates.tolist()]
+
+
+def find_similar_draws(draw: SsqDraw, k: int = 10, threshold: int = 4, history_only: bool = True) -> list:
+    """
+    在整个开奖历史中查找与指定期红球最相似的开奖记录
+    :param draw: 目标开奖记录
+    :param k: 返回条数
+    :param threshold: 最少共同红球个数
+    :param history_only: 只在该期之前的历史中查找
+    :return: [{'pk', 'period', 'draw_date', 'red_balls', 'blue_ball', 'similarity', 'common_count'}]
+    """
+    reds = draw.red_balls if isinstance(draw.red_balls, (list, tuple)) else []
+    if len(reds) != SsqDraw.RED_BALL_COUNT or not str(draw.period).isdigit():
+        return []
+    target_mask = int(red_masks([reds])[0])
+
+    periods, masks = load_masks(before_period=draw.period if history_only else None)
+    matches = top_k_similar(target_mask, periods, masks, k=k + (0 if history_only else 1), threshold=threshold)
+    matches = [(period, common) for period, common in matches if period != int(draw.period)][:k]
+    if not matches:
+        return []
+
+    # 命中记录的详情直接从存储还原
+    store = get_draw_store()
+    indexes = [store.index_of(period) for period, _ in matches]
+    pks = store.column('pk')[indexes].tolist()
+    blues = store.column('blue_ball')[indexes].tolist()
+    reds = store.red_balls(indexes).tolist()
+    dates = store.draw_dates(indexes)
+    return [
+        {
+            'pk': pks[i],
+            'period': str(period),
+            'draw_date': dates[i],
+            'red_balls': reds[i],
+            'blue_ball': blues[i],
+            'similarity': int(common / SsqDraw.RED_BALL_COUNT * 100),
+            'common_count': common,
+        }
+        for i, (period, common) in enumerate(matches)
+    ]
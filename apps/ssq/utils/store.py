@@ -0,0 +1,304 @@
+import datetime
+import threading
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+
+from ssq.models import SsqDraw
+from ssq.utils.features import FEATURE_GROUPS, calculate_features, masks_to_reds, popcount
+
+# 跨进程失效标记：任一进程修改开奖记录后递增，其他进程读取时发现版本变化即重新加载
+STORE_VERSION_CACHE_KEY = 'ssq:draw_store_version'
+
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+# 列定义：列名 -> dtype，每期合计约 35 字节
+COLUMNS = {
+    'pk': np.int64,
+    'period': np.int32,
+    'date_ordinal': np.int32,
+    'red_mask': np.uint64,
+    'blue_ball': np.uint8,
+    'red_sum': np.uint8,
+    'red_odd_count': np.uint8,
+    'red_prime_count': np.uint8,
+    'red_span': np.uint8,
+    'red_ac_value': np.uint8,
+    'red_tail_sum': np.uint8,
+    'zone_1_count': np.uint8,
+    'zone_2_count': np.uint8,
+    'zone_3_count': np.uint8,
+    'feature_group': np.uint8,
+}
+
+
+def _bump_shared_version():
+    """递增跨进程版本号，返回新版本"""
+    try:
+        return cache.incr(STORE_VERSION_CACHE_KEY)
+    except ValueError:
+        cache.add(STORE_VERSION_CACHE_KEY, 1, None)
+        return cache.get(STORE_VERSION_CACHE_KEY)
+
+
+def _derived_columns(masks: np.ndarray) -> dict:
+    """根据红球位掩码计算衍生列"""
+    features = calculate_features(masks_to_reds(masks))
+    zones = features['red_zones']
+    return {
+        'red_sum': features['red_sum'],
+        'red_odd_count': features['red_odd_count'],
+        'red_prime_count': features['red_prime_count'],
+        'red_span': features['red_span'],
+        'red_ac_value': features['red_ac_value'],
+        'red_tail_sum': features['red_tail_sum'],
+        'zone_1_count': zones[:, 0],
+        'zone_2_count': zones[:, 1],
+        'zone_3_count': zones[:, 2],
+        'feature_group': features['feature_group_code'],
+    }
+
+
+class DrawSnapshot:
+    """
+    开奖存储某一时刻的不可变快照：各列长度一致的只读视图
+    读取方每次取一个快照后只通过它访问数据，存储随后的追加、失效都不影响已取出的快照
+    """
+
+    def __init__(self, columns: dict, size: int, generation: int, version: int):
+        self._columns = {}
+        for name, array in columns.items():
+            view = array[:size]
+            view.flags.writeable = False
+            self._columns[name] = view
+        self._size = size
+        # generation：整体重新加载的次数；version：任意变更（加载或追加）的次数
+        self.generation = generation
+        self.version = version
+
+    def __len__(self) -> int:
+        return self._size
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        只读列视图（按期号升序）
+        :param name: 列名，见 COLUMNS
+        """
+        return self._columns[name]
+
+    def index_of(self, period) -> int:
+        """期号在存储中的下标，不存在返回 -1"""
+        try:
+            period = int(period)
+        except (TypeError, ValueError):
+            return -1
+        periods = self.column('period')
+        index = int(np.searchsorted(periods, period))
+        return index if index < len(periods) and periods[index] == period else -1
+
+    def period_slice(self, start=None, end=None) -> slice:
+        """
+        期号闭区间 [start, end] 对应的下标切片
+        :param start: 开始期号，None 表示不限
+        :param end: 结束期号，None 表示不限
+        """
+        periods = self.column('period')
+        lo = int(np.searchsorted(periods, int(start), side='left')) if start is not None else 0
+        hi = int(np.searchsorted(periods, int(end), side='right')) if end is not None else len(periods)
+        return slice(lo, max(lo, hi))
+
+    def red_balls(self, index=slice(None)) -> np.ndarray:
+        """指定下标的红球矩阵（由位掩码还原）"""
+        return masks_to_reds(np.atleast_1d(self.column('red_mask')[index]))
+
+    def draw_dates(self, index=slice(None)) -> list:
+        """指定下标的开奖日期"""
+        return [datetime.date.fromordinal(o) for o in np.atleast_1d(self.column('date_ordinal')[index]).tolist()]
+
+    def to_columns(self, index=slice(None)) -> dict:
+        """
+        导出用的列字典：红球为 (N, 6) uint8 矩阵，开奖日期为 datetime64[D]，其余列原样
+        :param index: 下标切片
+        """
+        columns = {
+            'period': self.column('period')[index],
+            'draw_date': (self.column('date_ordinal')[index].astype(np.int64) - _EPOCH_ORDINAL).astype('datetime64[D]'),
+            'red_balls': self.red_balls(index),
+            'blue_ball': self.column('blue_ball')[index],
+        }
+        columns.update({name: self.column(name)[index] for name in COLUMNS if name not in ('period', 'date_ordinal', 'blue_ball')})
+        return columns
+
+    @property
+    def nbytes(self) -> int:
+        """快照数据占用字节数"""
+        return sum(array.nbytes for array in self._columns.values())
+
+
+class DrawStore:
+    """
+    进程内开奖记录列式存储
+    - 按期号升序保存全部开奖记录的紧凑列（位掩码、蓝球、期号、日期序数、衍生特征）
+    - 首次访问时从数据库加载一次，之后分析代码无需访问ORM
+    - 新增最新一期时原地追加，其他修改整体失效后懒加载
+    - 读取方通过 snapshot() 取不可变快照：加载、追加时生成新快照并整体替换引用，读取方无需加锁
+
+    跨进程失效依赖共享缓存（CACHES 需配置为 Redis/Memcached 等），
+    默认的 LocMemCache 只在本进程内可见，多进程部署时其他进程不会重新加载（见 ssq.W001 检查）
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # 可追加的列缓冲区，容量按倍数增长；只在持锁时写入已发布快照之外的位置
+        self._buffers = None
+        self._size = 0
+        self._snapshot = None
+        self._shared_version = None
+        self.generation = 0
+        self.version = 0
+
+    # ======================加载与失效======================
+
+    @property
+    def loaded(self) -> bool:
+        return self._snapshot is not None
+
+    def snapshot(self) -> DrawSnapshot:
+        """当前数据的不可变快照，未加载或其他进程已修改数据时先重新加载"""
+        shared_version = cache.get(STORE_VERSION_CACHE_KEY)
+        snapshot = self._snapshot
+        if snapshot is not None and shared_version == self._shared_version:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or shared_version != self._shared_version:
+                self._load(shared_version)
+            return self._snapshot
+
+    def _load(self, shared_version):
+        rows = SsqDraw.objects.exclude(red_mask=0).order_by('period').values_list(
+            'pk', 'period', 'draw_date', 'red_mask', 'blue_ball'
+        )
+        pks, periods, dates, masks, blues = [], [], [], [], []
+        for pk, period, draw_date, red_mask, blue_ball in rows:
+            if not period.isdigit():
+                continue
+            pks.append(pk)
+            periods.append(int(period))
+            dates.append(draw_date.toordinal())
+            masks.append(red_mask)
+            blues.append(blue_ball)
+
+        masks = np.array(masks, dtype=np.int64).view(np.uint64)
+        # 只保留恰好6个红球的记录
+        valid = popcount(masks) == SsqDraw.RED_BALL_COUNT
+        columns = {
+            'pk': np.array(pks, dtype=np.int64)[valid],
+            'period': np.array(periods, dtype=np.int32)[valid],
+            'date_ordinal': np.array(dates, dtype=np.int32)[valid],
+            'red_mask': masks[valid],
+            'blue_ball': np.array(blues, dtype=np.uint8)[valid],
+        }
+        columns.update(_derived_columns(columns['red_mask']))
+
+        self._buffers = {name: np.ascontiguousarray(columns[name], dtype=dtype) for name, dtype in COLUMNS.items()}
+        self._size = len(self._buffers['period'])
+        self._shared_version = shared_version
+        self.generation += 1
+        self._publish_snapshot()
+
+    def _publish_snapshot(self):
+        # 替换引用是原子操作，读取方要么拿到旧快照，要么拿到新快照
+        self.version += 1
+        self._snapshot = DrawSnapshot(self._buffers, self._size, self.generation, self.version)
+
+    def invalidate(self):
+        """丢弃本进程数据，并在事务提交后通知其他进程重新加载；已取出的快照仍可继续使用"""
+        with self._lock:
+            self._snapshot = None
+            self._buffers = None
+            self._size = 0
+        self._publish()
+
+    def _publish(self):
+        """事务提交后递增跨进程版本号；本进程数据已是最新，同步记下新版本避免重复加载"""
+        def _bump():
+            version = _bump_shared_version()
+            with self._lock:
+                if self._snapshot is not None:
+                    self._shared_version = version
+
+        transaction.on_commit(_bump)
+
+    def append(self, draw: SsqDraw):
+        """
+        保存开奖记录后调用：新的最新一期原地追加，其他情况整体失效
+        :param draw: 刚保存的开奖记录
+        """
+        with self._lock:
+            if self._snapshot is None:
+                self._publish()
+                return
+            mask = int(draw.red_mask or 0)
+            periods = self._snapshot.column('period')
+            is_latest = (
+                str(draw.period).isdigit()
+                and (not len(periods) or int(draw.period) > periods[-1])
+                and popcount(np.array([mask], dtype=np.uint64))[0] == SsqDraw.RED_BALL_COUNT
+            )
+            if not is_latest:
+                self.invalidate()
+                return
+
+            row = {
+                'pk': [draw.pk],
+                'period': [int(draw.period)],
+                'date_ordinal': [SsqDraw._meta.get_field('draw_date').to_python(draw.draw_date).toordinal()],
+                'red_mask': np.array([mask], dtype=np.uint64),
+                'blue_ball': [draw.blue_ball],
+            }
+            row.update(_derived_columns(row['red_mask']))
+            # 新行写在已发布快照的范围之外，旧快照看不到它
+            self._grow(self._size + 1)
+            for name, dtype in COLUMNS.items():
+                self._buffers[name][self._size] = np.asarray(row[name], dtype=dtype)[0]
+            self._size += 1
+            self._publish_snapshot()
+        self._publish()
+
+    def _grow(self, size: int):
+        """容量不足时按倍数扩容，已取出的快照仍指向旧数组，不受影响"""
+        capacity = len(self._buffers['period'])
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 2, 64)
+        for name, array in self._buffers.items():
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:self._size] = array[:self._size]
+            self._buffers[name] = grown
+
+
+# 进程级单例
+draw_store = DrawStore()
+
+
+def get_draw_store() -> DrawSnapshot:
+    """获取已加载且为最新的开奖存储快照，调用方在一次计算中应只取一次"""
+    return draw_store.snapshot()
+
+
+def export_draw_columns(start=None, end=None) -> tuple:
+    """
+    期号范围内的开奖记录列及列式文件元数据，直接取自开奖存储
+    :param start: 开始期号，None 表示不限
+    :param end: 结束期号，None 表示不限
+    :return: (列字典, 元数据)
+    """
+    store = get_draw_store()
+    columns = store.to_columns(store.period_slice(start, end))
+    meta = {
+        'source': 'ssq_draw',
+        'row_count': len(columns['period']),
+        'feature_groups': FEATURE_GROUPS.tolist(),
+    }
+    return columns, meta
@@ -1,11 +1,42 @@
+import time
+
 from django.shortcuts import render, redirect, get_object_or_404, reverse
 from django.contrib import messages
 from django.conf import settings
-from ssq.models import SsqDraw
+from django.http import JsonResponse
+from ssq.models import SsqDraw, SsqOmission
 from ssq.forms import SsqDrawForm
-from utils.paginations import Bootstrap5Pagination
-
-from collections import Counter
+from ssq.utils.blue import get_blue_stats
+from ssq.utils.combination_filter import (
+    bitmap_count, bitmap_iter, bitmap_select, filter_combinations, parse_query,
+)
+from ssq.utils.combinations import get_combination_table
+from ssq.utils.cooccurrence import get_cooccurrence
+from ssq.utils.features import FEATURE_GROUPS
+from ssq.utils.frequency import default_hot_window, get_hot_numbers, hot_windows
+from ssq.utils.navigation import get_latest_period, get_navigation, get_total_count
+from ssq.utils.omission import get_cold_numbers, omission_matrix, omission_snapshot
+from ssq.utils.similarity import find_similar_draws
+from ssq.utils.store import export_draw_columns
+from utils.paginations import Bootstrap5KeysetPagination
+from utils.columnar import columnar_response
+from utils.streaming import EXPORT_FORMATS, parse_columns, streaming_export
+
+# 可导出的开奖记录列
+EXPORT_COLUMNS = [
+    'period', 'draw_date', 'red_balls', 'blue_ball', 'red_sum', 'red_odd_count', 'red_even_count',
+    'red_prime_count', 'red_zones', 'red_span', 'red_ac_value', 'red_tail_sum', 'feature_group',
+]
+DEFAULT_EXPORT_COLUMNS = ['period', 'draw_date', 'red_balls', 'blue_ball']
+
+
+def _get_hot_window(request):
+    """从请求参数读取热号统计窗口，非法值回退到默认窗口"""
+    try:
+        window = int(request.GET.get('hot_window', 0))
+    except (TypeError, ValueError):
+        window = 0
+    return window if window in hot_windows() else default_hot_window()
 
 
 def ssq_list(request):
@@ -14,33 +45,32 @@ def ssq_list(request):
     :param request:
     :return:
     """
-    ssq_objs = SsqDraw.objects.all().order_by('-period')
+    ssq_objs = SsqDraw.objects.all()
 
-    all_count = ssq_objs.count()
+    # 总期数读计数缓存，最新一期走期号索引
+    all_count = get_total_count()
+    latest_period = get_latest_period()
     base_url = request.path_info
-    current_page = request.GET.get('page', 1)
     query_params = request.GET.copy()
     per_page = settings.PAGE_SIZE
 
-    pager = Bootstrap5Pagination(
-        current_page=current_page,
-        all_count=all_count,
+    # 期号唯一，按期号倒序 keyset 分页，翻到多深都只查一页
+    pager = Bootstrap5KeysetPagination(
+        queryset=ssq_objs,
+        ordering=('-period',),
+        cursor=request.GET.get('cursor'),
         base_url=base_url,
         query_params=query_params,
         per_page=per_page,
-        pager_page_count=7,
+        all_count=all_count,
         show_info=True,
         size='sm',
         justify='center',
         aria_label='分页导航'
     )
 
-    # 获取最新一期
-    latest_ssq = SsqDraw.objects.order_by('-period').first()
-    latest_period = latest_ssq.period if latest_ssq else None
-
     context = {
-        'ssq_objs': ssq_objs[pager.page_slice],
+        'ssq_objs': pager.object_list,
         'pager': pager,
         'all_count': all_count,
         'per_page': per_page,
@@ -132,175 +162,269 @@ def ssq_detail(request, pk):
         # 期数不存在返回404
         return render(request, '404.html', {'message': f'未找到{period}期双色球开奖记录'}, status=404)
 
-    # 一次性查询所有期数并排序
-    all_periods = SsqDraw.objects.values_list('period', flat=True).order_by('-period')
-    periods_list = list(all_periods)
-    total_count = len(periods_list)
-
-    # 计算当期期数的索引
-    try:
-        current_index = periods_list.index(period_int)
-    except ValueError:
-        # 当期数不存在，默认 -1
-        current_index = -1
-
-    # 获取前后期数
-    prev_period = None
-    next_period = None
-    if current_index != -1:
-        # 当前期数：当前索引+1
-        if current_index + 1 < total_count:
-            prev_period = periods_list[current_index + 1]
-
-        # 后期数
-        if current_index - 1 >= 0:
-            next_period = periods_list[current_index - 1]
+    # 上一期/下一期走期号索引，序号和总期数读缓存，查询次数与历史长度无关
+    navigation = get_navigation(ssq.period)
 
     # =====优化热号和冷号逻辑
     # 自定义统计范围
     HOT_NUMBERS_COUNT = 10  # 显示的热号数量
     COLD_NUMBERS_COUNT = 10 # 显示冷号数量
-    RECENT_FOR_HOT = 30 # 热号统计最近期数
     RECENT_FOR_COLD = 20 # 冷号统计最近期数
 
-    #获取历史数据
-    history_draws = SsqDraw.objects.filter(period__lt=period_int)
-    history_draws = history_draws.only('period', 'red_balls').order_by('-period')
-
-    # 热号统计 最近50期 出现频率最高的红球
-    recent_for_hot = history_draws[:RECENT_FOR_HOT]
-
-    red_balls_counter = Counter()
-    for draw in recent_for_hot:
-        if isinstance(draw.red_balls, (list, tuple)):
-            red_balls_counter.update(draw.red_balls)
-
-    # 获取出现频率最高的号码，并带上出现次数的信息
-    hot_number_with_count = red_balls_counter.most_common(HOT_NUMBERS_COUNT)
-    hot_numbers = [num for num, count in hot_number_with_count]
-    hot_numbers = sorted(hot_numbers)
-    hot_numbers_info = [
-        {
-            'number': num,
-            'count': count,
-            'frequency': f'{count}/{RECENT_FOR_HOT}',
-            'percentage': round(count/RECENT_FOR_HOT * 100, 1), # 添加百分比
-        }
-        for num, count in hot_number_with_count
-    ]
-
-    # 冷号统计，最近30期未出现的红球
-    recent_for_cold = history_draws[:RECENT_FOR_COLD]
-
-    # 收集最近30期出现的所有红球
-    recent_numbers_set = set()
-
-    for draw in recent_for_cold:
-        if isinstance(draw.red_balls, (list, tuple)):
-            recent_numbers_set.update(draw.red_balls)
-
-    # 所有可能的红球号码[1-33]
-    all_red_numbers = set(range(1, 34))
-    # 冷号码
-    cold_numbers_set = all_red_numbers - recent_numbers_set
-
-    # 冷号处理，按缺失期数排序，缺失越久，越冷
-    cold_numbers_info = []
-    if cold_numbers_set:
-        # 对于每个冷号，计算它已经多少期没有出现
-        for number in sorted(cold_numbers_set):
-            # 找到这个号码最后一次出现的期数
-            last_appear = None
-            for draw in history_draws:
-                if isinstance(draw.red_balls, (list, tuple)) and number in draw.red_balls:
-                    last_appear = draw.period
-                    break
-
-            if last_appear:
-                # 计算缺失期数
-                missing_periods = period_int - int(last_appear)
-                cold_numbers_info.append(
-                    {
-                        'number': number,
-                        'missing_periods': missing_periods,
-                        'last_appear': last_appear,
-                    }
-                )
-            else:
-                # 如果从未出现过
-                cold_numbers_info.append({
-                    'number': number,
-                    'missing_periods': period_int,
-                    'last_appear': '从未出现',
-                })
-        #按照缺失期数降序排序，缺失越久越靠前
-        cold_numbers_info.sort(key=lambda x: x['missing_periods'], reverse=True)
-
-        # 只取N个最冷号码
-        cold_numbers_info = cold_numbers_info[:COLD_NUMBERS_COUNT]
-        cold_numbers = [info['number'] for info in cold_numbers_info]
-    else:
-        cold_numbers = []
-        cold_numbers_info = []
+    # 热号统计：读取上一期的滚动频次物化表，统计窗口可通过 ?hot_window= 切换
+    hot_window = _get_hot_window(request)
+    hot = get_hot_numbers(period_int, window=hot_window, top=HOT_NUMBERS_COUNT)
+    hot_numbers = hot['hot_numbers']
+    hot_numbers_info = hot['hot_numbers_info']
 
-    # 获取相似期数（红球相似度高的）
-    similar_draws = []
-    try:
-        # 防呆：确保当前红球数据有效,计算当前红球集合
-        current_reds = set(ssq.red_balls) if isinstance(ssq.red_balls, (list, tuple)) else set()
-        if current_reds:
-            raise ValueError("当前红球数据为空")
-
-        # 获取其他50期数（排除当前期数）
-        other_draws = SsqDraw.objects.filter(period__lt=period_int) # 只对历史期数
-        other_draws = other_draws.exclude(period=period).only(
-            'period', 'draw_date', 'red_balls', 'blue_ball'
-        ).order_by('-period')[:50]
-
-        for draw in other_draws:
-            # 计算相似的(共同号码数)
-            other_reds = set(draw.red_balls) if isinstance(draw.red_balls, (list, tuple)) else set()
-            if not other_reds:
-                continue  # 跳过红球数据异常
-            # 计算共同号码数和相似度（避免除0）
-            common_count = len(current_reds.intersection(other_reds))
-            similarity = int((common_count / 6) * 100)
-
-            # 帅选相似度超过50% 只显示相似度较高的
-            if similarity >= 50:
-                similar_draws.append({
-                    'period': draw.period,
-                    'draw_date': draw.draw_date,
-                    'red_balls': draw.red_balls,
-                    'blue_ball': draw.blue_ball,
-                    'similarity': similarity,
-                    'common_count': common_count,
-                })
-        # 按照相似度降序排序，取前10条
-        similar_draws = sorted(similar_draws, key=lambda x: x['similarity'], reverse=True)[:10]
-    except Exception as e:
-        # 出错时，使用空列表
-        similar_draws = []
+    # 冷号统计：读取上一期的号码遗漏索引，按遗漏期数降序取前N个
+    cold_numbers_info = get_cold_numbers(period_int, recent=RECENT_FOR_COLD, top=COLD_NUMBERS_COUNT)
+    cold_numbers = [info['number'] for info in cold_numbers_info]
+
+    # 获取相似期数：在全部历史期数中按位掩码统计共同红球，取共同3个（50%）以上的前10条
+    similar_draws = find_similar_draws(ssq, k=10, threshold=SsqDraw.RED_BALL_COUNT // 2)
+
+    # 蓝球统计：读取进程内蓝球索引，窗口与热号统计一致
+    blue_stats = get_blue_stats().summary(end=period_int, window=hot_window)
 
     context = {
-        'latest_period': periods_list[0] if periods_list else None,  # 优化：从列表取，避免重复查询
+        'latest_period': navigation['latest_period'],
         'title': f'{period_int}期 双色球详情',
         'ssq': ssq,
         'hot_numbers': hot_numbers or [],
         'hot_numbers_info': hot_numbers_info,
         'cold_numbers': cold_numbers or [],
         'cold_numbers_info': cold_numbers_info,
-        'prev_period': prev_period,
-        'next_period': next_period,
-        'current_index': current_index,
-        'total_count': total_count,
-        'current_serial_number': total_count - current_index if current_index != -1 else 0,
+        'prev_period': navigation['prev_period'],
+        'prev_pk': navigation['prev_pk'],
+        'next_period': navigation['next_period'],
+        'next_pk': navigation['next_pk'],
+        'total_count': navigation['total_count'],
+        'current_serial_number': navigation['serial_number'],
         'similar_draws': similar_draws,
-        'periods_list': periods_list[:20],  # 最近20期
+        'blue_stats': blue_stats,
         'current_period': period_int,
-        'hot_start_range': RECENT_FOR_HOT,
-        'cold_start_range': RECENT_FOR_COLD,
+        'hot_stat_range': hot_window,
+        'hot_windows': hot_windows(),
+        'cold_stat_range': RECENT_FOR_COLD,
 
     }
 
     return render(request, 'ssq/ssq_detail.html', context)
+
+
+def _get_int_param(request, name, default, min_value, max_value):
+    """读取整数查询参数并限制在范围内，非法值使用默认值"""
+    try:
+        value = int(request.GET.get(name, default))
+    except (TypeError, ValueError):
+        value = default
+    return max(min_value, min(value, max_value))
+
+
+def ssq_hot_numbers(request, period):
+    """
+    热号接口：返回某期开奖前指定窗口内的红球频次
+    :param request:
+    :param period: 期号
+    :return:
+    """
+    top = _get_int_param(request, 'top', 10, 1, SsqDraw.RED_BALL_RANGE[1])
+    hot = get_hot_numbers(period, window=_get_hot_window(request), top=top)
+    return JsonResponse({'status': 'success', 'period': period, **hot})
+
+
+def ssq_similar_draws(request, period):
+    """
+    相似开奖接口：在全部历史中查找共同红球不少于 threshold 个的前 k 期
+    :param request:
+    :param period: 期号
+    :return:
+    """
+    ssq = SsqDraw.objects.filter(period=period).only('period', 'red_balls').first()
+    if ssq is None:
+        return JsonResponse({'status': 'error', 'message': f'未找到{period}期双色球开奖记录'}, status=404)
+
+    k = _get_int_param(request, 'k', 10, 1, 100)
+    threshold = _get_int_param(request, 'threshold', 4, 0, SsqDraw.RED_BALL_COUNT)
+    # 默认检索全部期数（排除自身），history=1 时只检索该期之前
+    history_only = request.GET.get('history') in ('1', 'true')
+
+    similar_draws = find_similar_draws(ssq, k=k, threshold=threshold, history_only=history_only)
+    for draw in similar_draws:
+        draw['draw_date'] = draw['draw_date'].isoformat()
+    return JsonResponse({
+        'status': 'success',
+        'period': period,
+        'k': k,
+        'threshold': threshold,
+        'history_only': history_only,
+        'results': similar_draws,
+    })
+
+
+def ssq_export(request):
+    """
+    开奖记录流式导出（CSV / NDJSON），逐批读取数据库，内存占用与记录数无关
+    format=columnar 时从开奖存储导出全部列的列式二进制文件，用 utils.columnar.read_columnar 读取
+    参数：format=csv|ndjson|columnar，columns=逗号分隔列名，start/end=期号范围（含）
+    :param request:
+    :return:
+    """
+    fmt = request.GET.get('format', 'csv')
+    start, end = request.GET.get('start'), request.GET.get('end')
+    if fmt == 'columnar':
+        try:
+            columns, meta = export_draw_columns(start or None, end or None)
+        except ValueError:
+            return JsonResponse({'status': 'error', 'message': '期号必须是数字'}, status=400)
+        return columnar_response(columns, meta, filename=f'ssq_{start or "first"}_{end or "latest"}')
+    if fmt not in EXPORT_FORMATS:
+        return JsonResponse({'status': 'error', 'message': f'不支持的导出格式：{fmt}'}, status=400)
+    try:
+        columns = parse_columns(request.GET.get('columns'), EXPORT_COLUMNS, DEFAULT_EXPORT_COLUMNS)
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    queryset = SsqDraw.objects.order_by('period')
+    if start:
+        queryset = queryset.filter(period__gte=start)
+    if end:
+        queryset = queryset.filter(period__lte=end)
+
+    rows = queryset.values_list(*columns).iterator(chunk_size=2000)
+    return streaming_export(columns, rows, fmt, filename=f'ssq_{start or "first"}_{end or "latest"}')
+
+
+def ssq_omission(request, period):
+    """
+    号码遗漏接口：截至某期（含）各红球、蓝球的当前遗漏、最大遗漏、平均遗漏和出现次数，
+    history=N 时另外返回最近 N 期的期号 × 号码遗漏矩阵（用于走势图）
+    :param request:
+    :param period: 期号
+    :return:
+    """
+    snapshot = SsqOmission.objects.filter(period=period).first()
+    if snapshot is None:
+        return JsonResponse({'status': 'error', 'message': f'未找到{period}期号码遗漏统计'}, status=404)
+    if not snapshot.red_appear_count:
+        # 旧版本快照没有出现次数和最大遗漏
+        return JsonResponse({'status': 'error', 'message': '号码遗漏统计尚未重建，请执行 ssq_rebuild_stats'}, status=409)
+
+    data = {'status': 'success', 'period': period, 'ordinal': snapshot.ordinal, **omission_snapshot(snapshot)}
+    history = _get_int_param(request, 'history', 0, 0, 500)
+    if history:
+        matrix = omission_matrix(period, limit=history)
+        data['history'] = {
+            'periods': [str(p) for p in matrix['periods'].tolist()],
+            'red': matrix['red'].tolist(),
+            'blue': matrix['blue'].tolist(),
+        }
+    return JsonResponse(data)
+
+
+def ssq_cooccurrence(request):
+    """
+    红球共现接口：number=号码 时返回其最常同时出现的号码和三元组，否则返回33×33共现矩阵和最常见的三元组
+    参数：window=最近多少期（默认全部历史），end=截至期号（含），top=返回个数
+    :param request:
+    :return:
+    """
+    red_max = SsqDraw.RED_BALL_RANGE[1]
+    window = _get_int_param(request, 'window', 0, 0, 100000) or None
+    top = _get_int_param(request, 'top', 10, 1, 100)
+    end = request.GET.get('end') or None
+    if end is not None and not end.isdigit():
+        return JsonResponse({'status': 'error', 'message': '期号必须是数字'}, status=400)
+
+    index = get_cooccurrence()
+    data = {'status': 'success', 'window': window, 'end': end}
+    if request.GET.get('number'):
+        number = _get_int_param(request, 'number', 1, 1, red_max)
+        data['number'] = number
+        data['partners'] = index.top_partners(number, window=window, top=top, end=end)
+        data['triples'] = index.top_triples(number, window=window, top=top, end=end)
+    else:
+        data['matrix'] = index.pair_matrix(window=window, end=end).tolist()
+        data['triples'] = index.top_triples(window=window, top=top, end=end)
+    return JsonResponse(data)
+
+
+def ssq_blue(request):
+    """
+    蓝球统计接口：各号码窗口频次和遗漏、奇偶/大小分布、16×16转移矩阵
+    参数：window=最近多少期（默认全部历史），end=截至期号（含），top=返回的下一期蓝球个数
+    :param request:
+    :return:
+    """
+    window = _get_int_param(request, 'window', 0, 0, 100000) or None
+    top = _get_int_param(request, 'top', 5, 1, SsqDraw.BLUE_BALL_RANGE[1])
+    end = request.GET.get('end') or None
+    if end is not None and not end.isdigit():
+        return JsonResponse({'status': 'error', 'message': '期号必须是数字'}, status=400)
+
+    index = get_blue_stats()
+    data = {'status': 'success', 'end': end, **index.summary(end=end, window=window, top=top)}
+    data['transition_matrix'] = index.transition_matrix(window=window, end=end).tolist()
+    return JsonResponse(data)
+
+
+# 组合过滤结果的列
+COMBINATION_COLUMNS = [
+    'index', 'red_balls', 'red_sum', 'red_span', 'red_ac_value', 'red_odd_count', 'red_prime_count',
+    'zone_1_count', 'zone_2_count', 'zone_3_count', 'red_tail_sum', 'feature_group',
+]
+
+
+def _combination_rows(table, indices):
+    """组合下标 -> 结果行（与 COMBINATION_COLUMNS 对应）"""
+    columns = table.rows(indices)
+    values = [indices.tolist(), columns['red_balls'].tolist()]
+    values += [columns[name].tolist() for name in COMBINATION_COLUMNS[2:-1]]
+    values.append(FEATURE_GROUPS[columns['feature_group']].tolist())
+    return zip(*values)
+
+
+def ssq_combinations(request):
+    """
+    红球组合过滤接口：在全部红球组合上按条件过滤，位图按位与求交，返回总数和分页结果
+    条件参数见 ssq.utils.combination_filter.parse_query；page/per_page 分页，
+    format=csv|ndjson 时流式导出全部结果
+    :param request:
+    :return:
+    """
+    try:
+        query = parse_query(request.GET)
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    fmt = request.GET.get('format')
+    if fmt and fmt not in EXPORT_FORMATS:
+        return JsonResponse({'status': 'error', 'message': f'不支持的导出格式：{fmt}'}, status=400)
+
+    started = time.perf_counter()
+    try:
+        table = get_combination_table()
+        bitmap = filter_combinations(query)
+    except FileNotFoundError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=503)
+
+    if fmt:
+        rows = (row for indices in bitmap_iter(bitmap) for row in _combination_rows(table, indices))
+        return streaming_export(COMBINATION_COLUMNS, rows, fmt, filename='ssq_combinations')
+
+    count = bitmap_count(bitmap)
+    per_page = _get_int_param(request, 'per_page', 50, 1, 500)
+    total_pages = max(1, (count + per_page - 1) // per_page)
+    page = _get_int_param(request, 'page', 1, 1, total_pages)
+    indices = bitmap_select(bitmap, (page - 1) * per_page, per_page)
+    results = [dict(zip(COMBINATION_COLUMNS, row)) for row in _combination_rows(table, indices)]
+
+    return JsonResponse({
+        'status': 'success',
+        'count': count,
+        'page': page,
+        'per_page': per_page,
+        'total_pages': total_pages,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 3),
+        'results': results,
+    })
@@ -1,5 +1,6 @@
 import os
 from celery import Celery
+from celery.signals import worker_process_init
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pyssqv2.settings')
 
@@ -13,4 +14,12 @@ app.autodiscover_tasks()
 
 @app.task(bind=True)
 def debug_task(self):
-    print('Request: {0!r}'.format(self.request))
\ No newline at end of file
+    print('Request: {0!r}'.format(self.request))
+
+
+@worker_process_init.connect
+def preload_models(**kwargs):
+    """每个 worker 子进程启动后在后台预热激活模型（需开启 SSQ_MODEL_PRELOAD）"""
+    from ai_models.utils.preload import preload_enabled, start_preload
+    if preload_enabled():
+        start_preload()
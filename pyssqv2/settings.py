@@ -41,6 +41,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # 请求性能统计，需放在最前面；SSQ_REQUEST_PROFILING 关闭时不加载
+    'utils.middleware.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -132,11 +134,50 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = BASE_DIR / 'static_collect' # 补充收集路径，方便测试collectstatic
 
+# 上传文件及生成的数据文件（模型文件、特征矩阵等）
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# ==============双色球统计配置=====================
+# 热号滚动频次统计窗口（期数），修改后执行 ssq_rebuild_stats 重建
+SSQ_HOT_WINDOWS = [10, 30, 50, 100]
+# 详情页默认热号统计窗口
+SSQ_HOT_WINDOW = 30
+# 全部红球组合表文件（ssq_build_combinations 生成），各进程内存映射共享
+SSQ_COMBINATION_TABLE = MEDIA_ROOT / 'combinations' / 'red_combinations.ssqcol'
+
+# ==============预测模型配置=====================
+# 每个进程缓存已加载模型的内存预算（字节），超出后按最近最少使用淘汰
+SSQ_MODEL_CACHE_BYTES = 512 * 1024 * 1024
+# 进程启动时（Web 进程、Celery worker 子进程）在后台预热全部激活模型及其集成组件
+SSQ_MODEL_PRELOAD = False
+# 预热失败或部分模型加载失败后的重试间隔（秒），部分失败时进程仍视为就绪
+SSQ_MODEL_PRELOAD_RETRY = 60
+# 集成模型推理线程池大小，None 表示 min(4, CPU核数)
+SSQ_INFERENCE_WORKERS = None
+# 回测进程池大小，None 表示 CPU 核数；期数较少时始终在当前进程计算
+SSQ_BACKTEST_WORKERS = None
+
+# ==============分页计数配置=====================
+# 使用数据库估算行数分页的大表（无过滤条件时），其余模型使用缓存的精确计数
+# 例如为登录历史增加列表页时加入 'accounts.UserLoginHistory'
+PAGINATION_ESTIMATED_COUNT_MODELS = []
+# 估算行数达到该值才采用估算，小表仍然精确计数
+PAGINATION_ESTIMATE_THRESHOLD = 100000
+
+# ==============请求性能统计配置=====================
+# 记录每个请求的SQL次数/耗时、模板渲染耗时和总耗时，写入 Server-Timing 响应头并按视图汇总
+SSQ_REQUEST_PROFILING = False
+# 每个请求及每个视图汇总保留的最慢SQL条数
+SSQ_PROFILING_SLOW_QUERIES = 5
+# 单个请求查询次数超过该值时记录警告日志，None 表示不检查
+SSQ_PROFILING_QUERY_WARNING = 50
+
 # ==============Local_settings配置=====================
 # 引入本地配置，覆盖上面通用配置
 try:
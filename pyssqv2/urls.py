@@ -19,11 +19,15 @@ from django.conf.urls.static import static
 from django.conf import settings
 from django.urls import path, include
 
+from utils.middleware import request_stats
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('accounts/', include('accounts.urls', namespace='accounts')),
     path('ssq/', include('ssq.urls', namespace='ssq')),
     path('ai_models/', include('ai_models.urls', namespace='ai_models')),
+    # 请求性能汇总（需开启 SSQ_REQUEST_PROFILING）
+    path('stats/requests/', request_stats, name='request_stats'),
 
 
 ]
@@ -0,0 +1,121 @@
+"""
+列式二进制文件格式（只依赖 NumPy，可直接内存映射）
+
+    [0:8)    魔数 b'PYSSQCOL'
+    [8:12)   格式版本 uint32（小端）
+    [12:16)  头部长度 uint32（小端）
+    [16:..)  JSON 头部：{"columns": [{"name", "dtype", "shape", "offset"}], "meta": {...}}
+    之后     数据区从 64 字节对齐处开始，各列按 C 顺序连续存放；offset 相对数据区起点，同样 64 字节对齐
+
+读取时整个文件只映射一次，各列是映射内存上的只读视图，不解析、不复制。
+"""
+import io
+import json
+import mmap
+import os
+import struct
+from typing import Dict, Tuple, Union
+
+import numpy as np
+from django.http import HttpResponse
+
+from utils.streaming import safe_filename
+
+MAGIC = b'PYSSQCOL'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+EXTENSION = 'ssqcol'
+_PREFIX = struct.Struct('<8sII')
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_columnar(target: Union[str, os.PathLike, io.IOBase], columns: Dict[str, np.ndarray], meta: dict = None) -> int:
+    """
+    写入列式文件；写入路径时先写临时文件再替换，读者不会看到半个文件
+    :param target: 文件路径或可写的二进制文件对象
+    :param columns: 列名 -> 数组（可为多维，如 (N, 6) 的红球矩阵）
+    :param meta: 附加元数据，写入头部
+    :return: 写入字节数
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in columns.items()}
+    for name, array in arrays.items():
+        if array.dtype.hasobject:
+            raise ValueError(f'列 {name} 不能是 object 类型')
+
+    specs, offset = [], 0
+    for name, array in arrays.items():
+        specs.append({'name': name, 'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset})
+        offset = _align(offset + array.nbytes)
+    header_bytes = json.dumps({'columns': specs, 'meta': meta or {}}, ensure_ascii=False).encode()
+
+    if isinstance(target, (str, os.PathLike)):
+        tmp = f'{os.fspath(target)}.tmp'
+        with open(tmp, 'wb') as f:
+            size = _write(f, header_bytes, specs, arrays.values())
+        os.replace(tmp, target)
+        return size
+    return _write(target, header_bytes, specs, arrays.values())
+
+
+def _write(f, header_bytes: bytes, specs: list, arrays) -> int:
+    f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+    f.write(header_bytes)
+    position = _PREFIX.size + len(header_bytes)
+    data_start = _align(position)
+    for spec, array in zip(specs, arrays):
+        start = data_start + spec['offset']
+        f.write(b'\0' * (start - position))
+        f.write(array.reshape(-1).view(np.uint8).data)
+        position = start + array.nbytes
+    return position
+
+
+def _parse(buffer) -> Tuple[Dict[str, np.ndarray], dict]:
+    magic, version, header_length = _PREFIX.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError('不是列式数据文件')
+    if version != FORMAT_VERSION:
+        raise ValueError(f'不支持的格式版本：{version}')
+    header = json.loads(bytes(buffer[_PREFIX.size:_PREFIX.size + header_length]))
+    data_start = _align(_PREFIX.size + header_length)
+
+    columns = {}
+    for spec in header['columns']:
+        dtype = np.dtype(spec['dtype'])
+        shape = tuple(spec['shape'])
+        count = int(np.prod(shape, dtype=np.int64))
+        offset = data_start + spec['offset']
+        columns[spec['name']] = np.frombuffer(buffer, dtype=dtype, count=count, offset=offset).reshape(shape)
+    return columns, header['meta']
+
+
+def read_columnar(source: Union[str, os.PathLike, bytes]) -> Tuple[Dict[str, np.ndarray], dict]:
+    """
+    读取列式文件：路径以只读方式整体内存映射，各列为映射上的零拷贝视图
+    :param source: 文件路径，或已在内存中的字节串（如 HTTP 下载内容）
+    :return: (列名 -> 只读数组, 元数据)
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return _parse(source)
+    with open(source, 'rb') as f:
+        # 映射在数组存活期间保持有效，文件句柄可以立即关闭
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return _parse(buffer)
+
+
+def columnar_response(columns: Dict[str, np.ndarray], meta: dict, filename: str) -> HttpResponse:
+    """
+    列式文件下载响应
+    :param columns: 列名 -> 数组
+    :param meta: 元数据
+    :param filename: 下载文件名（不含扩展名）
+    :return: HttpResponse
+    """
+    buffer = io.BytesIO()
+    write_columnar(buffer, columns, meta)
+    response = HttpResponse(buffer.getvalue(), content_type='application/octet-stream')
+    response['Content-Disposition'] = f'attachment; filename="{safe_filename(filename)}.{EXTENSION}"'
+    return response
@@ -0,0 +1,153 @@
+import functools
+import hashlib
+from typing import Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+
+# 精确计数缓存时间，写入后通过版本号立即失效，超时只是兜底
+COUNT_CACHE_TIMEOUT = 60 * 60 * 24
+# 估算计数缓存时间，估算值本身就不精确，短时间缓存即可
+ESTIMATED_COUNT_CACHE_TIMEOUT = 60
+
+
+def _version_key(model) -> str:
+    return f'count:version:{model._meta.label_lower}'
+
+
+def _get_version(model) -> int:
+    """模型当前计数版本，首次访问时初始化为1"""
+    key = _version_key(model)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, None)
+        version = cache.get(key, 1)
+    return version
+
+
+def _bump_version(key: str):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+def invalidate_count(model):
+    """
+    事务提交后递增模型计数版本，该模型所有已缓存的计数随之失效
+    同一事务内多次调用只登记一次提交回调
+    :param model: 模型类
+    """
+    key = _version_key(model)
+    connection = transaction.get_connection()
+    for entry in connection.run_on_commit:
+        callback = entry[1]
+        if isinstance(callback, functools.partial) and callback.func is _bump_version and callback.args == (key,):
+            return
+    transaction.on_commit(functools.partial(_bump_version, key))
+
+
+def _on_counted_model_changed(sender, **kwargs):
+    invalidate_count(sender)
+
+
+def track_counts(*models):
+    """
+    为使用计数缓存的模型注册写入失效，在 AppConfig.ready() 中调用
+    只监听传入的模型，其余模型保存时不产生缓存读写
+    :param models: 模型类
+    """
+    for model in models:
+        uid = f'count_cache_invalidate:{model._meta.label_lower}'
+        post_save.connect(_on_counted_model_changed, sender=model, dispatch_uid=uid)
+        post_delete.connect(_on_counted_model_changed, sender=model, dispatch_uid=uid)
+
+
+def _query_signature(queryset: QuerySet) -> Optional[str]:
+    """查询条件签名（SQL + 参数摘要），条件恒为空时返回 None"""
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return None
+    return hashlib.md5(f'{queryset.db}|{sql}|{params!r}'.encode()).hexdigest()
+
+
+def cached_count(queryset: QuerySet, timeout: int = COUNT_CACHE_TIMEOUT) -> int:
+    """
+    按 (模型, 查询条件) 缓存精确计数，模型写入后失效
+    :param queryset: 查询集
+    :param timeout: 缓存时间（秒）
+    :return: 记录数
+    """
+    signature = _query_signature(queryset)
+    if signature is None:
+        return 0
+
+    model = queryset.model
+    key = f'count:{model._meta.label_lower}:{_get_version(model)}:{signature}'
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, timeout)
+    return count
+
+
+def estimated_count(model, using: str = 'default') -> Optional[int]:
+    """
+    读取数据库统计信息中的表行数估算值，不扫描表
+    - PostgreSQL：pg_class.reltuples
+    - MySQL：information_schema.TABLES.TABLE_ROWS
+    :param model: 模型类
+    :param using: 数据库别名
+    :return: 估算行数，数据库不支持或尚无统计信息时返回 None
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)'
+        params = [connection.ops.quote_name(table)]
+    elif connection.vendor == 'mysql':
+        sql = 'SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s'
+        params = [table]
+    else:
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    # PostgreSQL 从未 ANALYZE 过的表 reltuples 为 -1
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def _uses_estimate(model) -> bool:
+    labels = getattr(settings, 'PAGINATION_ESTIMATED_COUNT_MODELS', [])
+    return any(apps.get_model(label) is model for label in labels)
+
+
+def smart_count(queryset: QuerySet) -> int:
+    """
+    分页用计数：
+    - 配置为大表的模型且查询无过滤条件时，使用数据库估算值（超过阈值才采用）
+    - 其他情况使用缓存的精确计数
+    :param queryset: 查询集
+    :return: 记录数
+    """
+    model = queryset.model
+    if not queryset.query.where and _uses_estimate(model):
+        key = f'count:estimate:{queryset.db}:{model._meta.label_lower}'
+        count = cache.get(key)
+        if count is None:
+            count = estimated_count(model, using=queryset.db)
+            if count is not None:
+                cache.set(key, count, ESTIMATED_COUNT_CACHE_TIMEOUT)
+        threshold = getattr(settings, 'PAGINATION_ESTIMATE_THRESHOLD', 100000)
+        if count is not None and count >= threshold:
+            return count
+    return cached_count(queryset)
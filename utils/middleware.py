@@ -0,0 +1,271 @@
+"""
+请求性能统计中间件：记录每个请求的SQL查询次数、数据库总耗时、最慢的几条SQL、模板渲染耗时和总耗时
+
+- 通过 SSQ_REQUEST_PROFILING 开启，未开启时中间件不加载，没有任何开销
+- SQL 通过 connection.execute_wrapper 计时，不依赖 DEBUG 的 connection.queries
+- 结果写入 Server-Timing 响应头（浏览器开发者工具可直接查看），并按视图名在进程内存中汇总
+- 流式响应在输出内容时继续计时，流关闭后才汇总；响应头此时已发出，不写 Server-Timing
+- 汇总数据只在当前进程内，多进程部署时每个进程各自统计
+"""
+import contextlib
+import contextvars
+import functools
+import heapq
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import JsonResponse
+
+logger = logging.getLogger(__name__)
+
+# 记录的SQL最大长度，超出截断；不记录参数，避免把用户数据写进统计
+SQL_MAX_LENGTH = 500
+
+# 当前请求的统计，线程、协程各自独立
+_current_profile = contextvars.ContextVar('ssq_request_profile', default=None)
+
+
+class RequestProfile:
+    """单个请求的统计"""
+
+    def __init__(self, slow_query_count: int):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self._slow_query_count = slow_query_count
+        # 最小堆，只保留耗时最长的几条：(耗时, 序号, SQL)
+        self._slow_queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        """connection.execute_wrapper 回调"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.query_count += 1
+            self.db_time += duration
+            item = (duration, self.query_count, sql[:SQL_MAX_LENGTH])
+            if len(self._slow_queries) < self._slow_query_count:
+                heapq.heappush(self._slow_queries, item)
+            elif self._slow_queries and duration > self._slow_queries[0][0]:
+                heapq.heapreplace(self._slow_queries, item)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def slow_queries(self) -> list:
+        """耗时降序的最慢SQL：[{'sql', 'ms'}]"""
+        return [
+            {'sql': sql, 'ms': round(duration * 1000, 3)}
+            for duration, _, sql in sorted(self._slow_queries, reverse=True)
+        ]
+
+    def server_timing(self, total: float) -> str:
+        """Server-Timing 响应头"""
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.query_count} queries"',
+            f'tpl;dur={self.template_time * 1000:.2f};desc="template"',
+            f'total;dur={total * 1000:.2f}',
+        ])
+
+
+class _ViewStats:
+    """单个视图的汇总"""
+
+    def __init__(self):
+        self.requests = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.queries = 0
+        self.max_queries = 0
+        self.slow_queries = []
+
+    def add(self, profile: RequestProfile, total: float, slow_query_count: int):
+        self.requests += 1
+        self.total_time += total
+        self.max_time = max(self.max_time, total)
+        self.db_time += profile.db_time
+        self.template_time += profile.template_time
+        self.queries += profile.query_count
+        self.max_queries = max(self.max_queries, profile.query_count)
+        merged = self.slow_queries + profile.slow_queries()
+        self.slow_queries = sorted(merged, key=lambda query: query['ms'], reverse=True)[:slow_query_count]
+
+    def as_dict(self) -> dict:
+        requests = self.requests or 1
+        return {
+            'requests': self.requests,
+            'avg_ms': round(self.total_time * 1000 / requests, 3),
+            'max_ms': round(self.max_time * 1000, 3),
+            'avg_db_ms': round(self.db_time * 1000 / requests, 3),
+            'avg_template_ms': round(self.template_time * 1000 / requests, 3),
+            'avg_queries': round(self.queries / requests, 2),
+            'max_queries': self.max_queries,
+            'slow_queries': self.slow_queries,
+        }
+
+
+_view_stats = {}
+_stats_lock = threading.Lock()
+
+
+def record_request(view_name: str, profile: RequestProfile, total: float, slow_query_count: int):
+    """把一个请求的统计累加到视图汇总"""
+    with _stats_lock:
+        stats = _view_stats.get(view_name)
+        if stats is None:
+            stats = _view_stats[view_name] = _ViewStats()
+        stats.add(profile, total, slow_query_count)
+
+
+def get_request_stats() -> dict:
+    """
+    当前进程各视图的汇总
+    :return: 视图名 -> {'requests', 'avg_ms', 'max_ms', 'avg_db_ms', 'avg_template_ms', 'avg_queries', 'max_queries', 'slow_queries'}
+    """
+    with _stats_lock:
+        return {name: stats.as_dict() for name, stats in sorted(_view_stats.items())}
+
+
+def reset_request_stats():
+    """清空当前进程的汇总"""
+    with _stats_lock:
+        _view_stats.clear()
+
+
+def _instrument_templates():
+    """给 Django 模板后端的 render 计时，嵌套渲染只计最外层；只替换一次"""
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, 'ssq_profiled', False):
+        return
+    original = Template.render
+
+    @functools.wraps(original)
+    def render(self, context=None, request=None):
+        profile = _current_profile.get()
+        if profile is None or profile.template_depth:
+            return original(self, context, request)
+        profile.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            profile.template_depth -= 1
+            profile.template_time += time.perf_counter() - start
+
+    render.ssq_profiled = True
+    Template.render = render
+
+
+@contextlib.contextmanager
+def _profiling(profile: RequestProfile):
+    """在当前线程的所有数据库连接上统计SQL，并设置当前请求的统计"""
+    token = _current_profile.set(profile)
+    try:
+        with contextlib.ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile))
+            yield
+    finally:
+        _current_profile.reset(token)
+
+
+def _view_name(request) -> str:
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name or match._func_path
+
+
+class RequestProfilingMiddleware:
+    """
+    请求性能统计中间件，放在 MIDDLEWARE 最前面，总耗时包含其余中间件
+    配置：
+    - SSQ_REQUEST_PROFILING：是否开启
+    - SSQ_PROFILING_SLOW_QUERIES：每个请求/视图保留的最慢SQL条数
+    - SSQ_PROFILING_QUERY_WARNING：单个请求查询次数超过该值时记录警告日志（排查 N+1 查询）
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SSQ_REQUEST_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_query_count = getattr(settings, 'SSQ_PROFILING_SLOW_QUERIES', 5)
+        self.query_warning = getattr(settings, 'SSQ_PROFILING_QUERY_WARNING', None)
+        _instrument_templates()
+
+    def __call__(self, request):
+        profile = RequestProfile(self.slow_query_count)
+        with _profiling(profile):
+            response = self.get_response(request)
+
+        if response.streaming:
+            # 查询在迭代输出时才执行，包装输出内容，流关闭时再汇总
+            if response.is_async:
+                response.streaming_content = self._profile_async_stream(request, profile, response.streaming_content)
+            else:
+                response.streaming_content = self._profile_stream(request, profile, response.streaming_content)
+            return response
+
+        total = self._finish(request, profile)
+        response['Server-Timing'] = profile.server_timing(total)
+        return response
+
+    def _profile_stream(self, request, profile: RequestProfile, content):
+        """
+        逐块输出流式内容，每次取下一块时在当前线程的连接上统计SQL
+        每块单独进入、退出统计，块之间不持有连接包装和上下文变量
+        """
+        iterator = iter(content)
+        try:
+            while True:
+                with _profiling(profile):
+                    try:
+                        chunk = next(iterator)
+                    except StopIteration:
+                        break
+                yield chunk
+        finally:
+            self._finish(request, profile)
+
+    async def _profile_async_stream(self, request, profile: RequestProfile, content):
+        """异步流式内容只统计总耗时，查询在其他线程执行，不计入"""
+        try:
+            async for chunk in content:
+                yield chunk
+        finally:
+            self._finish(request, profile)
+
+    def _finish(self, request, profile: RequestProfile) -> float:
+        """请求结束：累加到视图汇总，查询次数过多时记录警告；返回总耗时"""
+        total = profile.elapsed
+        record_request(_view_name(request), profile, total, self.slow_query_count)
+        if self.query_warning and profile.query_count > self.query_warning:
+            logger.warning('%s %s 执行了 %s 次查询（数据库耗时 %.1fms，总耗时 %.1fms）',
+                           request.method, request.path, profile.query_count, profile.db_time * 1000, total * 1000)
+        return total
+
+
+@staff_member_required
+def request_stats(request):
+    """
+    当前进程各视图的性能汇总，仅管理员可访问；reset=1 时返回后清空
+    :param request:
+    :return:
+    """
+    data = {'status': 'success', 'views': get_request_stats()}
+    if request.GET.get('reset') == '1':
+        reset_request_stats()
+    return JsonResponse(data)
@@ -1,5 +1,12 @@
+import json
+import base64
+import datetime
+from decimal import Decimal
+from functools import cached_property
 from urllib.parse import urlencode
-from typing import Optional, Dict, List, Union
+from typing import Optional, Dict, List, Union, Sequence
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q, QuerySet
 from django.http import QueryDict
 
 
@@ -76,9 +83,6 @@ class Bootstrap5Pagination:
         self.half_pager_page_count = self.pager_page_count // 2
         self.start, self.end = self._calculate_record_range()
 
-        # 生成HTML
-        self.html = self.generate_html()
-
     # ======================基础计算======================
 
     def _validate_current_page(self, current_page: Union[str, int]) -> int:
@@ -122,10 +126,14 @@ class Bootstrap5Pagination:
         params.pop(self.page_param, None)
         return params
 
+    @cached_property
+    def _url_prefix(self) -> str:
+        """所有页码链接共用的前缀，查询参数只编码一次"""
+        query = urlencode(self.query_params)
+        return f'{self.base_url}?{query}&{self.page_param}=' if query else f'{self.base_url}?{self.page_param}='
+
     def get_page_url(self, page: int) -> str:
-        params = self.query_params.copy()
-        params[self.page_param] = page
-        return f'{self.base_url}?{urlencode(params)}'
+        return f'{self._url_prefix}{page}'
 
     # ================Bootstrap5 样式==============
 
@@ -272,7 +280,7 @@ class Bootstrap5Pagination:
         # 下一页按钮
         html.append(
             self.build_li(
-                self.pager_count + 1,
+                self.current_page + 1,
                 '下一页 »',
                 disabled=self.current_page == self.pager_count
             )
@@ -290,6 +298,40 @@ class Bootstrap5Pagination:
 
     # ===============Django友好端口===================
 
+    @cached_property
+    def html(self) -> str:
+        """分页HTML，首次访问时生成并缓存，只取 page_slice / to_dict 的调用方不产生渲染开销"""
+        return self.generate_html()
+
+    def to_dict(self) -> dict:
+        """
+        结构化分页信息，供 JSON/AJAX 接口使用
+        :return: 可直接传给 JsonResponse 的字典，pages 中 None 表示省略号
+        """
+        pages = []
+        last_page = 0
+        for page in self.get_display_page_range():
+            if last_page and last_page + 1 < page:
+                pages.append(None)
+            pages.append({'page': page, 'url': self.get_page_url(page), 'active': page == self.current_page})
+            last_page = page
+
+        has_previous = self.current_page > 1
+        has_next = self.current_page < self.pager_count
+        return {
+            'all_count': self.all_count,
+            'per_page': self.per_page,
+            'current_page': self.current_page,
+            'total_pages': self.pager_count,
+            'start': self.start,
+            'end': self.end,
+            'has_previous': has_previous,
+            'has_next': has_next,
+            'previous_url': self.get_page_url(self.current_page - 1) if has_previous else None,
+            'next_url': self.get_page_url(self.current_page + 1) if has_next else None,
+            'pages': pages,
+        }
+
     @property
     def page_slice(self):
         """
@@ -310,3 +352,228 @@ class Bootstrap5Pagination:
             f"total_pages={self.pager_count} "
             f"total_records={self.all_count}>"
         )
+
+
+class Bootstrap5KeysetPagination(Bootstrap5Pagination):
+    """
+    Django + Bootstrap 5 keyset（seek）分页组件
+    - 按唯一有序键（如 period，或 created_at + id）定位，翻到任意深度都只查询 per_page + 1 行
+    - 上一页/下一页使用不透明游标，不暴露 OFFSET
+    - 总数可选，不传则不执行 COUNT
+    - 与 Bootstrap5Pagination 输出相同的 Bootstrap 5 结构
+    """
+
+    def __init__(
+            self,
+            queryset: QuerySet,
+            ordering: Sequence[str],
+            cursor: Optional[str],
+            base_url: str,
+            query_params: Union[Dict, QueryDict],
+            per_page: int = 10,
+            all_count: Optional[int] = None,
+            show_info: bool = True,
+            size: Optional[str] = 'sm',  # sm, lg, None
+            justify: str = 'start',  # start, center, end
+            aria_label: str = "分页导航",
+            cursor_param: str = "cursor",
+    ):
+        """
+        Bootstrap5样式 keyset分页组件
+        :param queryset: 待分页的查询集
+        :param ordering: 排序键，组合后必须唯一，如 ('-period',) 或 ('-created_at', '-id')
+        :param cursor: 当前游标（请求参数原值），为空表示第一页
+        :param base_url: 基础url
+        :param query_params: 查询参数字典
+        :param per_page: 每页记录数量
+        :param all_count: 总记录数量，可选
+        :param show_info: 是否显示统计信息
+        :param size: 分页尺寸 （sm/lg/none）
+        :param justify: 对齐方式 (start/center/end)
+        :param aria_label: ARIAL标签，无障碍支持
+        :param cursor_param: 游标参数名
+        """
+        # 基础设置、样式和查询参数沿用父类；keyset分页没有页码，current_page 固定为 1
+        super().__init__(
+            current_page=1,
+            all_count=all_count or 0,
+            base_url=base_url,
+            query_params=query_params,
+            per_page=per_page,
+            show_info=show_info,
+            size=size,
+            justify=justify,
+            aria_label=aria_label,
+            page_param=cursor_param,
+        )
+        self.all_count = None if all_count is None else max(0, all_count)
+
+        # 排序键：[(字段名, 是否降序)]
+        self.model = queryset.model
+        self.keys = [(key.lstrip('-'), key.startswith('-')) for key in ordering]
+        self.cursor = cursor or None
+
+        # 查询当前页；start/end/page_slice 为当前页在 object_list 中的范围
+        self.object_list = self._fetch(queryset, self._decode_cursor(cursor))
+        self.start, self.end = 0, len(self.object_list)
+
+    # ======================游标======================
+
+    @staticmethod
+    def _encode_value(value):
+        """键值转为可JSON序列化的值，日期时间保留完整精度"""
+        if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        return value
+
+    def _encode_cursor(self, obj, direction: str) -> str:
+        """
+        生成不透明游标
+        :param obj: 边界记录（模型实例或字典）
+        :param direction: next 取其之后的记录，prev 取其之前的记录
+        """
+        values = [self._encode_value(self._get_key_value(obj, field)) for field, _ in self.keys]
+        raw = json.dumps({'d': direction, 'v': values}, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def _decode_cursor(self, cursor: Optional[str]) -> Optional[dict]:
+        """解析游标，键值按字段类型转换，格式或取值不合法时视为第一页"""
+        if not cursor:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            data = json.loads(raw)
+            values = data['v']
+            if data['d'] not in ('next', 'prev') or not isinstance(values, list) or len(values) != len(self.keys):
+                raise ValueError
+            data['v'] = [
+                self.model._meta.get_field(field).to_python(value)
+                for (field, _), value in zip(self.keys, values)
+            ]
+            if None in data['v']:
+                raise ValueError
+            return data
+        except (ValueError, TypeError, KeyError, ValidationError, FieldDoesNotExist):
+            self.cursor = None
+            return None
+
+    @staticmethod
+    def _get_key_value(obj, field: str):
+        return obj[field] if isinstance(obj, dict) else getattr(obj, field)
+
+    # ======================查询======================
+
+    def _seek_filter(self, values: list, backward: bool) -> Q:
+        """
+        构造 (k1, k2, ...) 在排序方向上位于游标之后的条件：
+        k1 > v1 OR (k1 = v1 AND k2 > v2) OR ...，降序键使用 <
+        """
+        condition = Q()
+        for i, (field, desc) in enumerate(self.keys):
+            lookup = 'lt' if desc != backward else 'gt'
+            term = Q(**{f'{field}__{lookup}': values[i]})
+            for (prev_field, _), prev_value in zip(self.keys[:i], values[:i]):
+                term &= Q(**{prev_field: prev_value})
+            condition |= term
+        return condition
+
+    def _fetch(self, queryset: QuerySet, cursor: Optional[dict]) -> list:
+        """按游标取当前页，多取一行用于判断是否还有下一页（或上一页）"""
+        backward = bool(cursor) and cursor['d'] == 'prev'
+        ordering = [f'{"-" if desc != backward else ""}{field}' for field, desc in self.keys]
+        queryset = queryset.order_by(*ordering)
+        if cursor:
+            queryset = queryset.filter(self._seek_filter(cursor['v'], backward))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if backward:
+            # 反向查询后恢复正常顺序；既然是从后一页返回的，后面必然还有数据
+            rows.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = bool(cursor), has_more
+
+        self.previous_cursor = self._encode_cursor(rows[0], 'prev') if rows and self.has_previous else None
+        self.next_cursor = self._encode_cursor(rows[-1], 'next') if rows and self.has_next else None
+        return rows
+
+    # ======================HTML======================
+
+    @cached_property
+    def _first_page_url(self) -> str:
+        query = urlencode(self.query_params)
+        return f'{self.base_url}?{query}' if query else self.base_url
+
+    def get_page_url(self, cursor: Optional[str]) -> str:
+        # 游标是 base64url 编码，本身就是URL安全的，无需再次编码
+        return f'{self._url_prefix}{cursor}' if cursor else self._first_page_url
+
+    def _build_info_item(self) -> str:
+        """构建统计信息项（Bootstrap 5 样式）"""
+        if not self.show_info:
+            return ''
+
+        info_text = f'每页 {self.per_page} 条'
+        if self.all_count is not None:
+            info_text = f'共 {self.all_count} 条记录 · {info_text}'
+
+        return (
+            f'<li class="{self.DEFAULT_CLASSES["item"]} {self.DEFAULT_CLASSES["disabled"]}">'
+            f'<span class="{self.DEFAULT_CLASSES["link"]}">{info_text}</span>'
+            f'</li>'
+        )
+
+    def generate_html(self) -> str:
+        """生成完整的 Bootstrap 5 分页HTML"""
+        # 第一页就没有记录，返回空
+        if not self.object_list and not self.cursor:
+            return '<div class="text-muted">暂无数据</div>'
+
+        html = [
+            f'<nav aria-label="{self.aria_label}">',
+            f'<ul class="{self._get_nav_classes()}">',
+            self.build_li(None, '首页', disabled=not self.cursor),
+            self.build_li(self.previous_cursor, '« 上一页', disabled=not self.previous_cursor),
+            self.build_li(self.next_cursor, '下一页 »', disabled=not self.next_cursor),
+        ]
+
+        # 添加统计信息
+        info_html = self._build_info_item()
+        if info_html:
+            html.append(info_html)
+
+        html.extend(['</ul>', '</nav>'])
+        return ''.join(html)
+
+    # ===============Django友好端口===================
+
+    def to_dict(self) -> dict:
+        """
+        结构化分页信息，供 JSON/AJAX 接口使用
+        :return: 可直接传给 JsonResponse 的字典
+        """
+        return {
+            'all_count': self.all_count,
+            'per_page': self.per_page,
+            'has_previous': bool(self.previous_cursor),
+            'has_next': bool(self.next_cursor),
+            'previous_cursor': self.previous_cursor,
+            'next_cursor': self.next_cursor,
+            'first_url': self._first_page_url,
+            'previous_url': self.get_page_url(self.previous_cursor) if self.previous_cursor else None,
+            'next_url': self.get_page_url(self.next_cursor) if self.next_cursor else None,
+        }
+
+    def __repr__(self) -> str:
+        """返回调试信息"""
+        return (
+            f"<Bootstrap5KeysetPagination "
+            f"keys={self.keys} "
+            f"has_previous={self.has_previous} "
+            f"has_next={self.has_next}>"
+        )
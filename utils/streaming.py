@@ -0,0 +1,119 @@
+import csv
+import json
+import datetime
+import re
+from typing import Iterable, List, Sequence
+
+from django.http import StreamingHttpResponse
+
+# 支持的导出格式：格式 -> (Content-Type, 扩展名)
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson; charset=utf-8', 'ndjson'),
+}
+
+# 下载文件名中允许的字符，其余替换为下划线（文件名可能来自请求参数）
+_UNSAFE_FILENAME_CHARS = re.compile(r'[^0-9A-Za-z_.-]+')
+
+# 每次向客户端输出的行数，太小会产生大量小块，太大会增加内存占用
+STREAM_BATCH_ROWS = 500
+
+
+class Echo:
+    """csv.writer 的伪文件对象，write 直接返回写入内容"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    """CSV单元格：列表用空格连接（与导入格式一致），日期转ISO格式"""
+    if isinstance(value, (list, tuple)):
+        return ' '.join(str(v) for v in value)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if hasattr(value, 'tolist'):
+        # NumPy 标量
+        return value.tolist()
+    raise TypeError(f'无法序列化类型：{type(value).__name__}')
+
+
+def iter_csv(columns: Sequence[str], rows: Iterable[Sequence]):
+    """
+    逐批生成CSV文本（首行为表头）
+    :param columns: 列名
+    :param rows: 行迭代器，每行与 columns 一一对应
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    batch = []
+    for row in rows:
+        batch.append(writer.writerow([_csv_value(value) for value in row]))
+        if len(batch) >= STREAM_BATCH_ROWS:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def iter_ndjson(columns: Sequence[str], rows: Iterable[Sequence]):
+    """
+    逐批生成 NDJSON 文本，每行一个 JSON 对象
+    :param columns: 列名（对象的键）
+    :param rows: 行迭代器，每行与 columns 一一对应
+    """
+    batch = []
+    for row in rows:
+        batch.append(json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=_json_default) + '\n')
+        if len(batch) >= STREAM_BATCH_ROWS:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def parse_columns(value: str, allowed: Sequence[str], default: Sequence[str] = None) -> List[str]:
+    """
+    解析逗号分隔的列选择参数
+    :param value: 请求参数原值，为空（或只有逗号、空白）时返回默认列
+    :param allowed: 允许导出的列
+    :param default: 默认列，不传则为全部允许的列
+    :return: 列名列表
+    :raise ValueError: 包含不支持的列
+    """
+    columns = [column.strip() for column in (value or '').split(',') if column.strip()]
+    if not columns:
+        return list(default or allowed)
+    invalid = [column for column in columns if column not in allowed]
+    if invalid:
+        raise ValueError(f'不支持的列：{", ".join(invalid)}')
+    return columns
+
+
+def safe_filename(filename: str) -> str:
+    """下载文件名只保留字母、数字和 _.-，避免请求参数破坏 Content-Disposition 响应头"""
+    return _UNSAFE_FILENAME_CHARS.sub('_', filename)
+
+
+def streaming_export(columns: Sequence[str], rows: Iterable[Sequence], fmt: str, filename: str) -> StreamingHttpResponse:
+    """
+    构造流式导出响应，内存占用与总行数无关
+    :param columns: 列名
+    :param rows: 行迭代器（如 values_list(...).iterator(chunk_size=...)）
+    :param fmt: csv / ndjson
+    :param filename: 下载文件名（不含扩展名）
+    :return: StreamingHttpResponse
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'不支持的导出格式：{fmt}')
+    content_type, extension = EXPORT_FORMATS[fmt]
+    content = iter_csv(columns, rows) if fmt == 'csv' else iter_ndjson(columns, rows)
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{safe_filename(filename)}.{extension}"'
+    return response